@@ -0,0 +1,92 @@
+'''
+Account data of the signed-in user in one response (GET /api/auth/me/).
+
+The profile page called the profile, address and payment card endpoints and
+the order history page the booking list, each authenticating and querying
+on its own. build() loads the profile and whatever else is asked for with
+select_related / prefetch_related: one query, plus one per included list.
+
+    include=address            joined to the user query
+    include=cards              one query
+    include=upcoming_bookings  one query on booking_summaries (user, start_time)
+
+The response is cached per user and include list under the user's version
+(authentication.versioned_key), so profile, address, card and booking
+changes drop it. Bookings whose showing has started since the response was
+cached are left out when it is served.
+'''
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Prefetch
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import authentication
+from .models import BookingSummary, PaymentCard
+from .serializers import AddressSerializer, BookingSummarySerializer, PaymentCardSerializer, UserDetailSerializer
+
+INCLUDES = ('address', 'cards', 'upcoming_bookings')
+
+
+def parse_include(value):
+    '''
+    "cards,address" -> ('address', 'cards')
+
+    Raises:
+        ValueError: for names not in INCLUDES
+    '''
+    names = {name.strip() for name in (value or '').split(',') if name.strip()}
+    unknown = names - set(INCLUDES)
+    if unknown:
+        raise ValueError(f"include can only name {', '.join(INCLUDES)} (got {', '.join(sorted(unknown))})")
+    return tuple(name for name in INCLUDES if name in names)
+
+
+def build(user_id, include=()):
+    '''the account data, read with one query plus one per included list'''
+    users = User.objects.select_related('profile')
+    if 'address' in include:
+        users = users.select_related('address')
+    if 'cards' in include:
+        users = users.prefetch_related(
+            Prefetch('paymentcard_set', queryset=PaymentCard.objects.order_by('id'), to_attr='cards')
+        )
+    if 'upcoming_bookings' in include:
+        users = users.prefetch_related(Prefetch(
+            'booking_summaries',
+            queryset=BookingSummary.objects.filter(start_time__gte=timezone.now()).order_by('start_time'),
+            to_attr='upcoming_bookings',
+        ))
+    user = users.get(pk=user_id)
+
+    data = {
+        'id': user.id,
+        'is_staff': user.is_staff,
+        'profile': UserDetailSerializer(user.profile).data,
+    }
+    if 'address' in include:
+        address = getattr(user, 'address', None)
+        data['address'] = AddressSerializer(address).data if address else None
+    if 'cards' in include:
+        data['cards'] = PaymentCardSerializer(user.cards, many=True).data
+    if 'upcoming_bookings' in include:
+        data['upcoming_bookings'] = BookingSummarySerializer(user.upcoming_bookings, many=True).data
+    return data
+
+
+def get(user_id, include=()):
+    '''build() from the cache'''
+    key = authentication.versioned_key(user_id, f"me:{','.join(include) or '-'}")
+    data = cache.get(key)
+    if data is None:
+        data = build(user_id, include)
+        cache.set(key, data, authentication.CACHE_TIMEOUT)
+
+    if 'upcoming_bookings' in data:
+        now = timezone.now()
+        data['upcoming_bookings'] = [
+            booking for booking in data['upcoming_bookings']
+            if parse_datetime(booking['start_time']) >= now
+        ]
+    return data
@@ -0,0 +1,252 @@
+'''
+Admission control (virtual waiting room) for high-demand showings.
+
+When a premiere opens everybody hits the seat map and booking endpoints at the
+same time. For showings that have admission control turned on (ShowingAdmission
+row with enabled=True) ShowingAdmissionMiddleware sends every request through
+an AdmissionController first:
+
+- users holding a valid admission pass go straight through
+- everybody else takes a place in the queue. The queue is served by a token
+  bucket: the first `burst` places are admitted right away and after that
+  `admits_per_minute` places are called every minute
+- users whose place has not been called yet get a signed queue ticket with
+  their position and an estimated wait. They send it back (X-Queue-Ticket
+  header) when they retry, so they keep their place in line
+
+Passes and queue tickets are bound to whoever they were granted to: the user
+of the request's access token and the client address. They are accepted for
+that user from anywhere, or from that address (the seat map is loaded without
+a token), so they can't be handed around as bearer tokens. A called place is
+exchanged for a pass only once; presenting its ticket again goes to the back
+of the line.
+
+All state lives in the Django cache (two counters per showing), so the waiting
+room itself never touches the database. The per-showing config is cached too
+and invalidated when an admin changes it.
+'''
+
+import math
+import time
+import uuid
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+
+from .models import ShowingAdmission
+
+QUEUE_TICKET_SALT = 'cinema.admission.queue-ticket'
+ADMISSION_PASS_SALT = 'cinema.admission.pass'
+
+# how long a queue ticket keeps its place in line
+QUEUE_TICKET_MAX_AGE = getattr(settings, 'ADMISSION_QUEUE_TICKET_MAX_AGE', 30 * 60)
+# how long the per-showing config stays cached before it is re-read
+CONFIG_CACHE_TIMEOUT = getattr(settings, 'ADMISSION_CONFIG_CACHE_TIMEOUT', 60)
+# queue counters are dropped after this much inactivity
+STATE_TIMEOUT = 24 * 60 * 60
+
+
+@dataclass
+class AdmissionDecision:
+    """Result of asking the controller to let a request in"""
+    admitted: bool
+    admission_pass: str = None
+    queue_ticket: str = None
+    position: int = None
+    people_ahead: int = 0
+    estimated_wait_seconds: int = 0
+
+
+def _held_by(data, holder):
+    '''a pass / ticket is good for the user it was granted to, or at the address it was granted at'''
+    return (data.get('u') is not None and data.get('u') == holder['u']) or data.get('a') == holder['a']
+
+
+class AdmissionController:
+    '''
+    Token bucket + FIFO queue for a single showing.
+
+    Cache keys (per showing):
+    - admission:<id>:gen    random id of the current queue, stamped into tickets
+    - admission:<id>:epoch  time the bucket started filling
+    - admission:<id>:issued number of queue places handed out so far
+    - admission:<id>:<gen>:<position>:used  a called place was exchanged for a pass
+
+    The number of places called by time t is
+        burst + rate * (t - epoch)
+    so the bucket refills continuously without a background job. When the queue
+    sits idle the epoch is moved forward so at most `burst` places can pile up.
+    Handing out a place is a single atomic cache.incr, so concurrent requests
+    never get the same position.
+    '''
+
+    def __init__(self, showing_id, admits_per_minute, burst, pass_ttl_minutes):
+        self.showing_id = int(showing_id)
+        self.rate = max(admits_per_minute, 1) / 60.0  # places per second
+        self.burst = max(burst, 1)
+        self.pass_ttl = pass_ttl_minutes * 60
+
+    # --- config ---
+
+    @staticmethod
+    def _config_key(showing_id):
+        return f'admission:config:{showing_id}'
+
+    @classmethod
+    def for_showing(cls, showing_id):
+        '''
+        returns the controller for a showing, or None if admission control is
+        off for it. the config is read from the cache so unprotected showings
+        cost no database queries either.
+        '''
+        key = cls._config_key(showing_id)
+        config = cache.get(key)
+
+        if config is None:
+            config = (
+                ShowingAdmission.objects.filter(showing_id=showing_id, enabled=True)
+                .values('admits_per_minute', 'burst', 'pass_ttl_minutes')
+                .first()
+            ) or {}
+            # cache misses too ({} = not protected)
+            cache.set(key, config, CONFIG_CACHE_TIMEOUT)
+
+        if not config:
+            return None
+
+        return cls(showing_id, **config)
+
+    @classmethod
+    def invalidate_config(cls, showing_id):
+        """call after an admin changes the admission settings of a showing"""
+        cache.delete(cls._config_key(showing_id))
+
+    # --- queue state ---
+
+    def _key(self, name):
+        return f'admission:{self.showing_id}:{name}'
+
+    def _generation(self):
+        cache.add(self._key('gen'), uuid.uuid4().hex, STATE_TIMEOUT)
+        return cache.get(self._key('gen'))
+
+    def _called_places(self, now):
+        '''number of queue places that have been called so far'''
+        cache.add(self._key('epoch'), now, STATE_TIMEOUT)
+        epoch = cache.get(self._key('epoch'), now)
+        issued = cache.get(self._key('issued'), 0)
+
+        called = self.burst + self.rate * (now - epoch)
+
+        # idle queue: don't let more than `burst` unused places build up
+        if called > issued + self.burst:
+            cache.set(self._key('epoch'), now - issued / self.rate, STATE_TIMEOUT)
+            called = issued + self.burst
+
+        return int(math.floor(called))
+
+    def _take_place(self):
+        cache.add(self._key('issued'), 0, STATE_TIMEOUT)
+        return cache.incr(self._key('issued'))
+
+    def _use_place(self, generation, position):
+        '''mark a called place as exchanged for a pass, False if it already was'''
+        return cache.add(self._key(f'{generation}:{position}:used'), True, QUEUE_TICKET_MAX_AGE)
+
+    def _read_ticket(self, queue_ticket, generation, holder):
+        '''returns the queue position stored in a ticket, or None if the ticket is unusable'''
+        if not queue_ticket:
+            return None
+        try:
+            data = signing.loads(queue_ticket, salt=QUEUE_TICKET_SALT, max_age=QUEUE_TICKET_MAX_AGE)
+        except signing.BadSignature:
+            return None
+        if data.get('s') != self.showing_id or data.get('g') != generation:
+            return None
+        if not _held_by(data, holder):
+            return None
+        return data.get('p')
+
+    # --- public API ---
+
+    def has_valid_pass(self, admission_pass, holder):
+        '''
+        check an admission pass handed out earlier for this showing.
+
+        Args:
+            holder: {'u': user id or None, 'a': client address} of the request
+        '''
+        if not admission_pass:
+            return False
+        try:
+            data = signing.loads(admission_pass, salt=ADMISSION_PASS_SALT, max_age=self.pass_ttl)
+        except signing.BadSignature:
+            return False
+        if data.get('s') != self.showing_id:
+            return False
+        return _held_by(data, holder)
+
+    def admit(self, queue_tickets=(), holder=None):
+        '''
+        let a request in if its place in line has been called.
+
+        Args:
+            queue_tickets: tickets from earlier attempts, the one for this
+                showing keeps the place in line (tickets of other showings are ignored)
+            holder: {'u': user id or None, 'a': client address}, the pass or
+                ticket is bound to it and only its own tickets are accepted
+
+        Returns:
+            AdmissionDecision with either an admission pass or a queue ticket
+        '''
+        holder = holder or {'u': None, 'a': None}
+        now = time.time()
+        generation = self._generation()
+
+        position = next(
+            (p for p in (self._read_ticket(t, generation, holder) for t in queue_tickets) if p is not None),
+            None
+        )
+        if (
+            position is not None
+            and position <= self._called_places(now)
+            and not self._use_place(generation, position)
+        ):
+            # this place already got its pass, back of the line
+            position = None
+        if position is None:
+            position = self._take_place()
+
+        called = self._called_places(now)
+
+        if position <= called:
+            admission_pass = signing.dumps(
+                {'s': self.showing_id, 'u': holder['u'], 'a': holder['a']},
+                salt=ADMISSION_PASS_SALT
+            )
+            return AdmissionDecision(admitted=True, admission_pass=admission_pass, position=position)
+
+        people_ahead = position - called
+        ticket = signing.dumps(
+            {'s': self.showing_id, 'g': generation, 'p': position, 'u': holder['u'], 'a': holder['a']},
+            salt=QUEUE_TICKET_SALT
+        )
+        return AdmissionDecision(
+            admitted=False,
+            queue_ticket=ticket,
+            position=position,
+            people_ahead=people_ahead,
+            estimated_wait_seconds=int(math.ceil(people_ahead / self.rate))
+        )
+
+    def stats(self):
+        '''queue counters for the admin screen'''
+        issued = cache.get(self._key('issued'), 0)
+        called = self._called_places(time.time())
+        return {
+            'places_issued': issued,
+            'places_called': min(called, issued),
+            'waiting': max(issued - called, 0),
+        }
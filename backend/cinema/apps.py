@@ -7,3 +7,14 @@ class CinemaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'cinema'
     #can add more app-specific configurations here
+
+    def ready(self):
+        # compile the email templates once at startup (cinema/emails.py)
+        from . import emails
+        emails.load()
+        # connects the signals that keep the user cache fresh
+        from . import authentication  # noqa: F401
+        # and the ones that refresh the admin dashboard snapshot
+        from . import dashboard  # noqa: F401
+        # warns when the cache isn't shared between processes
+        from . import checks  # noqa: F401
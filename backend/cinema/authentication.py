@@ -0,0 +1,124 @@
+'''
+JWT authentication with a user cache.
+
+simplejwt's JWTAuthentication loads the user from auth_user on every
+authenticated request, and most views then load request.user.profile with a
+second query. CachedJWTAuthentication resolves the user, with its profile
+already attached, from the Django cache instead:
+
+    auth:user:<user id>:<version>  ->  User (profile loaded)
+
+Each user has a version (random id) under auth:user:<user id>:version.
+Saving or deleting the user or its profile sets a new version once the
+transaction commits, so a password change, deactivation or profile edit is
+seen by the next request. Other per-user cache entries (the account data of
+/api/auth/me/, cinema/account.py) use versioned_key() and go with the same
+version, which address, card and booking changes also replace. A request that loaded the user before the change
+can only write the old version, which nobody reads any more. Entries live
+AUTH_USER_CACHE_TIMEOUT seconds, which also bounds changes made behind the
+ORM's back (QuerySet.update, raw SQL): call invalidate() after those.
+
+This needs a cache shared by every process (CACHES). With a process-local
+cache one process would never see another one's new version and keep serving
+a deactivated user or an old password hash, so users are then loaded from the
+database on every request instead.
+
+The token checks are the same as JWTAuthentication's.
+'''
+
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .checks import cache_is_shared
+from .models import Address, BookingSummary, PaymentCard, Profile
+
+CACHE_TIMEOUT = getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 5 * 60)
+
+
+def _version_key(user_id):
+    return f'auth:user:{user_id}:version'
+
+
+def _version(user_id):
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def versioned_key(user_id, name):
+    '''cache key of something cached per user, dropped with the user's version'''
+    return f'auth:{name}:{user_id}:{_version(user_id)}'
+
+
+def get_user(user_id):
+    '''the user with its profile loaded, from the cache or one query; None if there is no such user'''
+    if not cache_is_shared():
+        return User.objects.select_related('profile').filter(pk=user_id).first()
+
+    key = versioned_key(user_id, 'user')
+    user = cache.get(key)
+    if user is None:
+        user = User.objects.select_related('profile').filter(pk=user_id).first()
+        if user is None:
+            return None
+        cache.set(key, user, CACHE_TIMEOUT)
+    return user
+
+
+def invalidate(user_id):
+    '''drop the cached user once the current transaction commits'''
+    transaction.on_commit(lambda: cache.set(_version_key(user_id), uuid.uuid4().hex, None))
+
+
+@receiver([post_save, post_delete], sender=User)
+def _user_changed(sender, instance, **kwargs):
+    invalidate(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Profile)
+@receiver([post_save, post_delete], sender=Address)
+@receiver([post_save, post_delete], sender=PaymentCard)
+@receiver(post_save, sender=BookingSummary)
+def _profile_changed(sender, instance, **kwargs):
+    # bulk summary rebuilds (cinema/bulk_changes.py) invalidate their users themselves
+    invalidate(instance.user_id)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    '''JWTAuthentication that reads the user from the user cache'''
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        user = get_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if getattr(api_settings, 'CHECK_USER_IS_ACTIVE', True) and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if getattr(api_settings, 'CHECK_REVOKE_TOKEN', False):
+            from rest_framework_simplejwt.utils import get_md5_hash_password
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        return user
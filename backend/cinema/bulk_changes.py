@@ -0,0 +1,381 @@
+'''
+Bulk cancel / reschedule of every booking of a showing.
+
+Used when an admin cancels a showing or moves its audience to another showing
+(projector broke, movie pulled, showroom change). BulkShowingChange walks the
+bookings of the showing in chunks; every chunk is its own transaction, so a
+failure only rolls back that chunk and users can keep booking other showings
+in between.
+
+- cancel: the showing's tickets are deleted. Bookings left without tickets are
+  deleted, bookings that also cover other showings (cart checkouts) keep
+  those tickets and get their total reduced; their receipt gets an amendment
+- move: the showing's tickets are moved to the target showing. New seats are
+  picked by a seat strategy (Strategy pattern, see SEAT_STRATEGIES). A booking
+  is moved completely or not at all, and its receipt gets an amendment with
+  the new showing and seats
+
+run() is a generator of progress events so the admin view can stream them;
+the last event carries the per-booking report.
+'''
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .models import Booking, Seat, SeatReservation, Showing, Ticket
+from . import authentication, pricing, redemptions
+from .receipts import amend_receipts
+from .summaries import rebuild_summaries
+
+
+# --- Seat remapping strategies --- #
+
+class SameSeatStrategy:
+    """
+    keep everybody in the same seat (same row and number) in the new showroom.
+    fails the booking if one of its seats doesn't exist there or is taken
+    """
+    name = 'same_seat'
+
+    def assign(self, seats, free_seats):
+        '''
+        Args:
+            seats: the booking's current Seat objects
+            free_seats: {(row_label, seat_number): seat_id} still free in the target
+
+        Returns:
+            dict: old seat_id -> new seat_id, or None if the booking can't be placed
+        '''
+        mapping = {}
+        for seat in seats:
+            new_seat_id = free_seats.get((seat.row_label, seat.seat_number))
+            if new_seat_id is None:
+                return None
+            mapping[seat.seat_id] = new_seat_id
+        return mapping
+
+
+class BestAvailableStrategy:
+    """
+    same seat when it's free, otherwise keep the party together: the first row
+    with enough free seats next to each other, then any free seats front to back
+    """
+    name = 'best_available'
+
+    def assign(self, seats, free_seats):
+        same = SameSeatStrategy().assign(seats, free_seats)
+        if same is not None:
+            return same
+
+        if len(free_seats) < len(seats):
+            return None
+
+        rows = defaultdict(list)
+        for (row_label, seat_number), seat_id in sorted(free_seats.items()):
+            rows[row_label].append((seat_number, seat_id))
+
+        chosen = None
+        for row in rows.values():
+            # look for len(seats) consecutive seat numbers
+            for i in range(len(row) - len(seats) + 1):
+                block = row[i:i + len(seats)]
+                if block[-1][0] - block[0][0] == len(seats) - 1:
+                    chosen = [seat_id for _, seat_id in block]
+                    break
+            if chosen:
+                break
+
+        if chosen is None:
+            chosen = [seat_id for _, seat_id in sorted(free_seats.items())[:len(seats)]]
+
+        return {seat.seat_id: new_seat_id for seat, new_seat_id in zip(seats, chosen)}
+
+
+SEAT_STRATEGIES = {
+    SameSeatStrategy.name: SameSeatStrategy,
+    BestAvailableStrategy.name: BestAvailableStrategy,
+}
+
+
+class BulkChangeError(Exception):
+    """the requested change can't be started (bad target showing etc.)"""
+
+
+class BulkShowingChange:
+    '''
+    cancel or move every booking of a showing.
+
+    Args:
+        showing_id: showing whose bookings change
+        action: 'cancel' or 'move'
+        target_showing_id: where to move the bookings (action='move')
+        seat_strategy: key of SEAT_STRATEGIES (action='move')
+        chunk_size: bookings per transaction
+    '''
+
+    def __init__(self, showing_id, action, target_showing_id=None, seat_strategy='best_available', chunk_size=50):
+        self.showing_id = showing_id
+        self.action = action
+        self.target_showing_id = target_showing_id
+        self.chunk_size = max(int(chunk_size), 1)
+        self.report = []
+        self.counts = {'cancelled': 0, 'moved': 0, 'failed': 0}
+
+        if action not in ('cancel', 'move'):
+            raise BulkChangeError("action must be 'cancel' or 'move'")
+
+        try:
+            self.showing = Showing.objects.select_related('showroom').get(showing_id=showing_id)
+        except Showing.DoesNotExist:
+            raise BulkChangeError("Showing not found")
+
+        if action == 'move':
+            if seat_strategy not in SEAT_STRATEGIES:
+                raise BulkChangeError(f"seat_strategy must be one of: {', '.join(SEAT_STRATEGIES)}")
+            self.strategy = SEAT_STRATEGIES[seat_strategy]()
+
+            try:
+                self.target = Showing.objects.select_related('movie', 'showroom').get(showing_id=target_showing_id)
+            except Showing.DoesNotExist:
+                raise BulkChangeError("Target showing not found")
+            if self.target.showing_id == self.showing.showing_id:
+                raise BulkChangeError("Target showing must be a different showing")
+            if self.target.start_time < timezone.now():
+                raise BulkChangeError("Cannot move bookings to a past showing")
+
+    def booking_ids(self):
+        return list(
+            Ticket.objects.filter(showing_id=self.showing_id)
+            .values_list('booking_id', flat=True).distinct().order_by('booking_id')
+        )
+
+    def run(self):
+        '''
+        process all bookings, yields progress events:
+
+        {"event": "start", "total": 120}
+        {"event": "booking", "booking_id": 7, "outcome": "moved", ...}   (one per booking)
+        {"event": "progress", "processed": 50, "total": 120, "cancelled": 0, "moved": 48, "failed": 2}
+        {"event": "done", ..., "report": [...]}
+        '''
+        booking_ids = self.booking_ids()
+        total = len(booking_ids)
+        yield {'event': 'start', 'showing_id': self.showing_id, 'action': self.action, 'total': total}
+
+        for start in range(0, total, self.chunk_size):
+            chunk = booking_ids[start:start + self.chunk_size]
+
+            try:
+                with transaction.atomic():
+                    if self.action == 'cancel':
+                        outcomes = self._cancel_chunk(chunk)
+                    else:
+                        outcomes = self._move_chunk(chunk)
+                    # cached account data lists upcoming bookings (cinema/account.py)
+                    for user_id in {outcome['user_id'] for outcome in outcomes} - {None}:
+                        authentication.invalidate(user_id)
+            except Exception as e:
+                # the chunk was rolled back, nothing in it changed
+                outcomes = [
+                    {'booking_id': booking_id, 'outcome': 'failed', 'reason': str(e)}
+                    for booking_id in chunk
+                ]
+
+            for outcome in outcomes:
+                self.counts[outcome['outcome']] += 1
+                self.report.append(outcome)
+                yield dict(outcome, event='booking')
+
+            yield dict(self.counts, event='progress', processed=start + len(chunk), total=total)
+
+        yield dict(self.counts, event='done', total=total, report=self.report)
+
+    def run_all(self):
+        '''run to the end without streaming, returns the final event'''
+        event = None
+        for event in self.run():
+            pass
+        return event
+
+    # --- chunk processing --- #
+
+    def _lock_showings(self):
+        showing_ids = [self.showing_id]
+        if self.action == 'move':
+            showing_ids.append(self.target_showing_id)
+        # same lock BookingFacade takes, nobody books these showings meanwhile
+        list(
+            Showing.objects.select_for_update().filter(showing_id__in=showing_ids)
+            .order_by('showing_id').values_list('showing_id', flat=True)
+        )
+
+    def _chunk_tickets(self, chunk):
+        '''the showing's tickets of these bookings, grouped by booking'''
+        tickets_by_booking = defaultdict(list)
+        tickets = Ticket.objects.select_related('seat').filter(
+            showing_id=self.showing_id, booking_id__in=chunk
+        ).order_by('ticket_id')
+        for ticket in tickets:
+            tickets_by_booking[ticket.booking_id].append(ticket)
+        return tickets_by_booking
+
+    def _cancel_chunk(self, chunk):
+        self._lock_showings()
+        tickets_by_booking = self._chunk_tickets(chunk)
+        bookings = Booking.objects.in_bulk(chunk)
+
+        # bookings that also have tickets for other showings (cart checkouts)
+        other_tickets = set(
+            Ticket.objects.filter(booking_id__in=chunk).exclude(showing_id=self.showing_id)
+            .values_list('booking_id', flat=True)
+        )
+
+        outcomes = []
+        partial = []
+        amendments = {}
+        for booking_id in chunk:
+            booking = bookings[booking_id]
+            tickets = tickets_by_booking.get(booking_id, [])
+
+            if booking_id in other_tickets:
+                refund = self._partial_refund(booking, tickets)
+                booking.total_price = booking.total_price - refund
+                partial.append(booking)
+                amendments[booking_id] = {
+                    'change': 'cancelled',
+                    'showing_id': self.showing_id,
+                    'seats': [str(ticket.seat) for ticket in tickets],
+                    'refund': f"${refund:.2f}",
+                    'total_price': round(float(booking.total_price), 2),
+                }
+            else:
+                refund = booking.total_price
+
+            outcomes.append({
+                'booking_id': booking_id,
+                'user_id': booking.user_id,
+                'outcome': 'cancelled',
+                'seats': [str(ticket.seat) for ticket in tickets],
+                'refund': f"${refund:.2f}",
+            })
+
+        # the receipt keeps what was sold, the change is appended (cinema/receipts.py)
+        amend_receipts(amendments)
+        Ticket.objects.filter(showing_id=self.showing_id, booking_id__in=chunk).delete()
+        # fully refunded bookings give their promo code use back
+        redemptions.release(set(chunk) - other_tickets)
+        Booking.objects.filter(booking_id__in=set(chunk) - other_tickets).delete()
+        if partial:
+            Booking.objects.bulk_update(partial, ['total_price'])
+            rebuild_summaries([booking.booking_id for booking in partial])
+
+        return outcomes
+
+    def _partial_refund(self, booking, tickets):
+        '''share of the amount paid that belongs to the cancelled tickets'''
+        # priced with the same table BookingFacade charges from
+        all_tickets = Ticket.objects.filter(booking_id=booking.booking_id).values_list(
+            'showing__showroom_id', 'showing__start_time', 'age_category'
+        )
+        full = sum(pricing.quote(all_tickets), Decimal('0.00'))
+        cancelled = sum(pricing.quote(
+            (self.showing.showroom_id, self.showing.start_time, ticket.age_category) for ticket in tickets
+        ), Decimal('0.00'))
+        if not full:
+            return Decimal('0.00')
+        return (booking.total_price * cancelled / full).quantize(Decimal('0.01'))
+
+    def _free_target_seats(self):
+        '''{(row, number): seat_id} of target seats that are not sold or held'''
+        taken = set(Ticket.objects.filter(showing_id=self.target_showing_id).values_list('seat_id', flat=True))
+        taken |= set(
+            SeatReservation.objects.filter(
+                showing_id=self.target_showing_id,
+                is_confirmed=False,
+                expires_at__gt=timezone.now()
+            ).values_list('seat_id', flat=True)
+        )
+        return {
+            (row_label, seat_number): seat_id
+            for seat_id, row_label, seat_number in Seat.objects.filter(
+                showroom_id=self.target.showroom_id
+            ).values_list('seat_id', 'row_label', 'seat_number')
+            if seat_id not in taken
+        }
+
+    def _move_chunk(self, chunk):
+        self._lock_showings()
+        tickets_by_booking = self._chunk_tickets(chunk)
+        user_ids = dict(Booking.objects.filter(booking_id__in=chunk).values_list('booking_id', 'user_id'))
+        free_seats = self._free_target_seats()
+        seat_labels = {seat_id: f"{row}{number}" for (row, number), seat_id in free_seats.items()}
+
+        outcomes = []
+        moved_tickets = []
+        amendments = {}
+        for booking_id in chunk:
+            tickets = tickets_by_booking.get(booking_id, [])
+            mapping = self.strategy.assign([ticket.seat for ticket in tickets], free_seats)
+
+            if mapping is None:
+                outcomes.append({
+                    'booking_id': booking_id,
+                    'user_id': user_ids.get(booking_id),
+                    'outcome': 'failed',
+                    'seats': [str(ticket.seat) for ticket in tickets],
+                    'reason': f"Not enough free seats ({self.strategy.name}) for {len(tickets)} tickets in the target showing",
+                })
+                continue
+
+            # seats given to this booking are no longer free for the rest of the chunk
+            taken = set(mapping.values())
+            free_seats = {key: seat_id for key, seat_id in free_seats.items() if seat_id not in taken}
+
+            outcomes.append({
+                'booking_id': booking_id,
+                'user_id': user_ids.get(booking_id),
+                'outcome': 'moved',
+                'seats': {str(ticket.seat): seat_labels[mapping[ticket.seat_id]] for ticket in tickets},
+                'target_showing_id': self.target_showing_id,
+            })
+            amendments[booking_id] = {
+                'change': 'moved',
+                'showing_id': self.showing_id,
+                'target_showing_id': self.target_showing_id,
+                'movie_title': self.target.movie.movie_title,
+                'showroom_name': self.target.showroom.showroom_name,
+                'start_time': self.target.start_time,
+                'seats': outcomes[-1]['seats'],
+            }
+
+            for ticket in tickets:
+                ticket.seat_id = mapping[ticket.seat_id]
+                ticket.showing_id = self.target_showing_id
+                moved_tickets.append(ticket)
+
+        if moved_tickets:
+            # the receipt keeps what was sold, the change is appended (cinema/receipts.py)
+            amend_receipts(amendments)
+            Ticket.objects.bulk_update(moved_tickets, ['showing_id', 'seat_id'])
+            moved_booking_ids = {ticket.booking_id for ticket in moved_tickets}
+            rebuild_summaries(moved_booking_ids)
+
+        return outcomes
+
+
+def booking_totals(showing_id):
+    '''number of bookings, tickets and revenue of a showing, shown before starting a bulk change'''
+    booking_ids = Ticket.objects.filter(showing_id=showing_id).values('booking_id')
+    totals = Booking.objects.filter(booking_id__in=booking_ids).aggregate(
+        bookings=Count('booking_id'),
+        revenue=Sum('total_price')
+    )
+    return {
+        'bookings': totals['bookings'],
+        'tickets': Ticket.objects.filter(showing_id=showing_id).count(),
+        'revenue': f"${totals['revenue'] or 0:.2f}",
+    }
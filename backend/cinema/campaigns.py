@@ -0,0 +1,268 @@
+'''
+Promotion email campaigns.
+
+Emailing a promotion to every subscribed user used to happen inside the admin
+request, one send_mail (and one SMTP connection) per user, which times out
+long before 50k subscribers are done. Now the admin request only creates a
+PromotionCampaign and the sending happens in the background:
+
+- recipients are streamed in user id order with .iterator(), never loaded
+  into memory at once
+- the email is rendered once per campaign (cinema/emails.py), it has nothing
+  per recipient
+- every chunk of CHUNK_SIZE emails goes out over one SMTP connection
+- every send is paced to EMAILS_PER_SECOND so the mail provider doesn't
+  start rejecting us
+- after every chunk the campaign is checkpointed (last_user_id, counters,
+  heartbeat). A campaign whose worker died is picked up again from the
+  checkpoint by the run_promotion_campaigns command, so nobody gets the
+  email twice (at most the chunk in flight is repeated)
+- cancelling flips the status, the worker stops at its next checkpoint
+
+Campaigns are sent by the run_promotion_campaigns command, run from cron
+(e.g. every minute). A thread in the web process dies with its worker on
+every restart, so PROMOTION_CAMPAIGN_BACKGROUND (start sending in a thread
+right away) is off by default and only meant for development.
+'''
+
+import logging
+import threading
+import time
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import connections, transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import emails
+from .models import PromotionCampaign
+
+logger = logging.getLogger(__name__)
+
+# emails per SMTP connection and per checkpoint
+CHUNK_SIZE = getattr(settings, 'PROMOTION_CAMPAIGN_CHUNK_SIZE', 200)
+# send rate limit
+EMAILS_PER_SECOND = getattr(settings, 'PROMOTION_EMAILS_PER_SECOND', 10)
+# a running campaign without a checkpoint for this long is considered dead
+STALE_AFTER = getattr(settings, 'PROMOTION_CAMPAIGN_STALE_AFTER', 5 * 60)
+# start campaigns in a thread of the web process instead of waiting for the command
+RUN_IN_BACKGROUND = getattr(settings, 'PROMOTION_CAMPAIGN_BACKGROUND', False)
+
+
+def subscribers():
+    '''users who get promotion emails'''
+    return User.objects.filter(
+        profile__subscribed=True,
+        is_active=True
+    ).exclude(email='')
+
+
+def build_email(promotion):
+    '''
+    subject, text and html of a promotion email. nothing in it depends on the
+    recipient, so a campaign renders it once and sends it to everyone.
+    '''
+    if promotion.discount_type == 'percentage':
+        discount_text = f"{promotion.discount_value:.0f}% OFF"
+    else:
+        discount_text = f"${promotion.discount_value:.2f} OFF"
+
+    return emails.render('promotion', {
+        'promo_code': promotion.promo_code,
+        'discount_text': discount_text,
+        'start_date': promotion.start_date,
+        'end_date': promotion.end_date,
+    })
+
+
+def start_campaign(promotion, created_by=None):
+    '''
+    queue a campaign for a promotion and, if enabled, start sending in the
+    background once the surrounding transaction commits
+
+    Returns:
+        PromotionCampaign
+    '''
+    campaign = PromotionCampaign.objects.create(
+        promotion=promotion,
+        created_by=created_by,
+        total_recipients=subscribers().count()
+    )
+
+    if RUN_IN_BACKGROUND:
+        transaction.on_commit(lambda: threading.Thread(
+            target=_run_in_thread,
+            args=(campaign.campaign_id,),
+            name=f'promotion-campaign-{campaign.campaign_id}',
+            daemon=True
+        ).start())
+
+    return campaign
+
+
+def _run_in_thread(campaign_id):
+    try:
+        run_campaign(campaign_id)
+    finally:
+        # the thread has its own database connection
+        connections.close_all()
+
+
+def claim(campaign_id):
+    '''
+    mark a campaign as running by this worker. only queued campaigns and
+    running ones that stopped checkpointing can be claimed, so two workers
+    never send the same campaign
+
+    Returns:
+        bool: True if this worker should run it
+    '''
+    now = timezone.now()
+    return bool(
+        PromotionCampaign.objects.filter(pk=campaign_id).filter(
+            Q(status='queued') |
+            Q(status='running', heartbeat_at__lt=now - timedelta(seconds=STALE_AFTER))
+        ).update(status='running', heartbeat_at=now, started_at=Coalesce('started_at', Value(now)))
+    )
+
+
+def pending_campaign_ids():
+    '''queued campaigns and running ones whose worker died'''
+    stale = timezone.now() - timedelta(seconds=STALE_AFTER)
+    return list(
+        PromotionCampaign.objects.filter(
+            Q(status='queued') | Q(status='running', heartbeat_at__lt=stale)
+        ).order_by('campaign_id').values_list('campaign_id', flat=True)
+    )
+
+
+def run_campaign(campaign_id):
+    '''
+    send (or resume) a campaign from its checkpoint
+
+    Returns:
+        PromotionCampaign after the run, or None if another worker has it
+    '''
+    if not claim(campaign_id):
+        return None
+
+    campaign = PromotionCampaign.objects.select_related('promotion').get(pk=campaign_id)
+    # rendered once for the whole campaign
+    subject, message, html_message = build_email(campaign.promotion)
+    from_email = settings.DEFAULT_FROM_EMAIL
+
+    logger.info(
+        f"Campaign #{campaign_id} for {campaign.promotion.promo_code} running "
+        f"from user #{campaign.last_user_id} ({campaign.sent_count} sent so far)"
+    )
+
+    recipients = (
+        subscribers()
+        .filter(id__gt=campaign.last_user_id)
+        .order_by('id')
+        .values_list('id', 'email')
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+    throttle = _Throttle(EMAILS_PER_SECOND)
+    try:
+        while True:
+            chunk = list(islice(recipients, CHUNK_SIZE))
+            if not chunk:
+                break
+
+            sent, failed, error = _send_chunk(chunk, subject, message, html_message, from_email, throttle)
+
+            # checkpoint, also notices a cancel
+            updates = {
+                'sent_count': F('sent_count') + sent,
+                'failed_count': F('failed_count') + failed,
+                'last_user_id': chunk[-1][0],
+                'heartbeat_at': timezone.now(),
+            }
+            if error:
+                updates['last_error'] = error
+            if not PromotionCampaign.objects.filter(pk=campaign_id, status='running').update(**updates):
+                logger.info(f"Campaign #{campaign_id} stopped at user #{chunk[-1][0]} (cancelled)")
+                return PromotionCampaign.objects.get(pk=campaign_id)
+
+        PromotionCampaign.objects.filter(pk=campaign_id, status='running').update(
+            status='completed',
+            finished_at=timezone.now()
+        )
+    except Exception as e:
+        logger.error(f"Campaign #{campaign_id} failed: {e}")
+        PromotionCampaign.objects.filter(pk=campaign_id, status='running').update(
+            status='failed',
+            last_error=str(e),
+            finished_at=timezone.now()
+        )
+
+    campaign = PromotionCampaign.objects.get(pk=campaign_id)
+    logger.info(
+        f"Campaign #{campaign_id} {campaign.status}: {campaign.sent_count} sent, "
+        f"{campaign.failed_count} failed"
+    )
+    return campaign
+
+
+def _send_chunk(chunk, subject, message, html_message, from_email, throttle):
+    '''
+    send one chunk over a single SMTP connection, paced by throttle
+
+    Returns:
+        (sent, failed, last error message or '')
+    '''
+    sent = failed = 0
+    error = ''
+    with get_connection() as connection:
+        for user_id, email in chunk:
+            throttle.wait()
+            try:
+                email_message = EmailMultiAlternatives(subject, message, from_email, [email], connection=connection)
+                email_message.attach_alternative(html_message, 'text/html')
+                email_message.send()
+                sent += 1
+            except Exception as e:
+                failed += 1
+                error = f"user #{user_id}: {e}"
+                logger.error(f"Failed to send promotion email to {email}: {e}")
+                # the server may have dropped us, go on with a fresh connection
+                connection.close()
+                try:
+                    connection.open()
+                except Exception:
+                    # next send opens its own connection (and reports the error)
+                    pass
+    return sent, failed, error
+
+
+class _Throttle:
+    '''spaces sends at least 1 / per_second apart, 0 = no limit'''
+
+    def __init__(self, per_second):
+        self.interval = 1 / per_second if per_second > 0 else 0
+        self.next_at = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if self.next_at > now:
+            time.sleep(self.next_at - now)
+            now = self.next_at
+        self.next_at = now + self.interval
+
+
+def cancel_campaign(campaign_id):
+    '''stop a queued or running campaign, returns False if it already finished'''
+    return bool(
+        PromotionCampaign.objects.filter(
+            pk=campaign_id, status__in=['queued', 'running']
+        ).update(status='cancelled', finished_at=timezone.now())
+    )
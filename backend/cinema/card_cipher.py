@@ -0,0 +1,73 @@
+'''
+Encryption of payment card numbers.
+
+PaymentCard.set_card_number / get_card_number built a new Fernet from the
+settings on every call. The cipher is now built once per key list and
+reused. It is a MultiFernet: CARD_ENCRYPTION_KEYS lists the keys newest
+first, numbers are encrypted with the first one and decrypted with whichever
+key they were encrypted with, so a new key can be put in front of the old
+ones without breaking stored cards. CARD_ENCRYPTION_KEY (one key) still
+works when CARD_ENCRYPTION_KEYS isn't set.
+
+Stored values are the Fernet token, base64 encoded once more (the format of
+the existing rows).
+
+Rotating the key:
+
+1. put the new key in front: CARD_ENCRYPTION_KEYS=<new>,<old>
+2. python manage.py rotate_card_keys, re-encrypts every card with <new>
+3. drop the old key: CARD_ENCRYPTION_KEYS=<new>
+'''
+
+import base64
+import hashlib
+from functools import lru_cache
+
+from cryptography.fernet import Fernet, MultiFernet
+from django.conf import settings
+
+
+def keys():
+    '''configured keys, newest (the one that encrypts) first'''
+    configured = getattr(settings, 'CARD_ENCRYPTION_KEYS', None) or [settings.CARD_ENCRYPTION_KEY]
+    return tuple(key.strip() for key in configured if key and key.strip())
+
+
+@lru_cache(maxsize=4)
+def _cipher(key_list):
+    return MultiFernet([Fernet(key.encode()) for key in key_list])
+
+
+def get_cipher():
+    '''MultiFernet of the configured keys, built once per key list'''
+    return _cipher(keys())
+
+
+def encrypt(card_number):
+    token = get_cipher().encrypt(card_number.encode())
+    return base64.urlsafe_b64encode(token).decode()
+
+
+def decrypt(value):
+    '''
+    Raises:
+        InvalidToken: not encrypted with any configured key
+    '''
+    return get_cipher().decrypt(base64.urlsafe_b64decode(value.encode())).decode()
+
+
+
+def rotate(value):
+    '''
+    the stored value re-encrypted with the newest key
+
+    Raises:
+        InvalidToken: not encrypted with any configured key
+    '''
+    token = get_cipher().rotate(base64.urlsafe_b64decode(value.encode()))
+    return base64.urlsafe_b64encode(token).decode()
+
+
+def fingerprint():
+    '''short id of the newest key, safe to log or store'''
+    return hashlib.sha256(keys()[0].encode()).hexdigest()[:12]
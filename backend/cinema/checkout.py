@@ -0,0 +1,281 @@
+'''
+Server-side checkout sessions.
+
+Instead of the frontend carrying the seat selection from page to page and
+re-posting the whole order at every step, the booking flow opens a
+CheckoutSession once:
+
+- POST   creates the session: validates and prices the order, puts the seats on
+  hold (seat_reservation rows) and stores seats, promo code and quote
+- PATCH  applies a delta (seats added/removed, age categories changed, promo
+  code changed). Only the added seats are checked against the database, the
+  rest of the order was validated when it was added
+- confirm books the stored quote through BookingFacade, so checkout only
+  re-checks seat occupancy
+
+Holds and the session expire together after CHECKOUT_SESSION_TTL seconds. An
+expired hold stops blocking the seat, it doesn't have to be cleaned up first;
+purge_seat_holds deletes the expired ones in batches.
+
+Every function that changes holds locks the showing row first, the same lock
+BookingFacade takes, so holds and bookings for a showing never race.
+'''
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from .models import CheckoutSession, SeatReservation, Seat, Showing
+from .quotes import quoted_showing
+from .serializers import BookingFacade
+
+# seconds seats stay on hold while the user checks out
+SESSION_TTL = getattr(settings, 'CHECKOUT_SESSION_TTL', 10 * 60)
+
+VALID_CATEGORIES = ['Child', 'Adult', 'Senior']
+
+
+class CheckoutExpired(Exception):
+    """the session ran out of time, its seats are no longer held"""
+
+
+def _lock(user, session_id):
+    '''
+    lock the session's showing, then the session itself (always in that order,
+    BookingFacade locks showings too).
+    raises CheckoutSession.DoesNotExist for unknown or other users' sessions
+    '''
+    showing_id = CheckoutSession.objects.filter(
+        session_id=session_id, user=user
+    ).values_list('showing_id', flat=True).get()
+    list(Showing.objects.select_for_update().filter(showing_id=showing_id).values_list('showing_id', flat=True))
+
+    return CheckoutSession.objects.select_for_update().get(session_id=session_id, user=user)
+
+
+def _seats_data(session_seats):
+    return [{'seat_id': s['seat_id'], 'age_category': s['age_category']} for s in session_seats]
+
+
+def _price(session, user, seats, promo_code):
+    '''
+    re-price the session from stored data, no seat or showing queries.
+    returns the facade (promotion result in promotion_applied) and the new quote
+    '''
+    facade = BookingFacade(user=user, showing_id=session.showing_id, promo_code=promo_code)
+    quote = facade.price(
+        {session.showing_id: quoted_showing(session.quote['showings'][str(session.showing_id)])},
+        [dict(s, showing_id=session.showing_id) for s in seats]
+    )
+    return facade, quote
+
+
+def _hold(user, showing_id, seat_ids, expires_at):
+    SeatReservation.objects.bulk_create([
+        SeatReservation(showing_id=showing_id, seat_id=seat_id, user=user, expires_at=expires_at)
+        for seat_id in seat_ids
+    ])
+
+
+def expired_holds():
+    '''holds of checkouts that ran out of time, for purge_seat_holds'''
+    return SeatReservation.objects.filter(is_confirmed=False, expires_at__lte=timezone.now())
+
+
+def get_session(user, session_id):
+    '''
+    the user's session, raises CheckoutSession.DoesNotExist for other users' sessions
+    '''
+    return CheckoutSession.objects.get(session_id=session_id, user=user)
+
+
+def open_session(user, showing_id, seats_data, promo_code=None):
+    '''
+    validate and price the order and put its seats on hold.
+
+    A user has one open checkout per showing, opening a new one cancels the
+    previous one and releases its seats.
+
+    Raises:
+        serializers.ValidationError: invalid order or seats not available
+    '''
+    with transaction.atomic():
+        facade = BookingFacade(user=user, showing_id=showing_id, seats_data=seats_data, promo_code=promo_code)
+        # locks the showing, rejects sold seats and seats held by other users
+        quote = facade.preview(lock=True)
+
+        CheckoutSession.objects.filter(user=user, showing_id=showing_id, status='open').update(status='cancelled')
+        SeatReservation.objects.filter(user=user, showing_id=showing_id, is_confirmed=False).delete()
+
+        expires_at = timezone.now() + timedelta(seconds=SESSION_TTL)
+        _hold(user, showing_id, [seat_info['seat_id'] for seat_info in facade.seats], expires_at)
+
+        return CheckoutSession.objects.create(
+            user=user,
+            showing_id=showing_id,
+            seats=[
+                {
+                    'seat_id': seat_info['seat_id'],
+                    'seat_display': seat_info['seat_display'],
+                    'age_category': seat_info['age_category'],
+                }
+                for seat_info in facade.seats
+            ],
+            promo_code=facade.promotion_applied,
+            quote=quote,
+            expires_at=expires_at
+        )
+
+
+def update_session(user, session_id, add_seats=None, remove_seat_ids=None, change_seats=None,
+                   promo_code=None, promo_changed=False):
+    '''
+    apply a delta to an open session.
+
+    Args:
+        user, session_id: the session to change
+        add_seats: [{"seat_id", "age_category"}] to add and hold
+        remove_seat_ids: seat ids to drop and release
+        change_seats: [{"seat_id", "age_category"}] for seats already in the session
+        promo_code: new promo code (None/"" removes it), only used if promo_changed
+
+    Raises:
+        CheckoutExpired, serializers.ValidationError
+    '''
+    add_seats = add_seats or []
+    remove_seat_ids = set(remove_seat_ids or [])
+    change_seats = {s['seat_id']: s['age_category'] for s in (change_seats or [])}
+
+    with transaction.atomic():
+        session = _lock(user, session_id)
+        _check_open(session)
+
+        for category in [s['age_category'] for s in add_seats] + list(change_seats.values()):
+            if category not in VALID_CATEGORIES:
+                raise serializers.ValidationError(
+                    f"Age category must be one of: {', '.join(VALID_CATEGORIES)}"
+                )
+
+        current_ids = {s['seat_id'] for s in session.seats}
+        unknown = (remove_seat_ids | set(change_seats)) - current_ids
+        if unknown:
+            raise serializers.ValidationError(f"Seats {sorted(unknown)} are not in this checkout")
+
+        seats = [
+            dict(s, age_category=change_seats.get(s['seat_id'], s['age_category']))
+            for s in session.seats
+            if s['seat_id'] not in remove_seat_ids
+        ]
+
+        added = _validate_added_seats(user, session, seats, add_seats)
+        seats.extend(added)
+
+        if not seats:
+            raise serializers.ValidationError("A checkout needs at least one seat, cancel it instead")
+        if len(seats) > 10:
+            raise serializers.ValidationError("Cannot book more than 10 seats at once")
+
+        if not promo_changed:
+            promo_code = session.promo_code
+        facade, quote = _price(session, user, seats, promo_code or None)
+
+        if remove_seat_ids:
+            SeatReservation.objects.filter(
+                user=user, showing_id=session.showing_id, seat_id__in=remove_seat_ids, is_confirmed=False
+            ).delete()
+        if added:
+            _hold(user, session.showing_id, [s['seat_id'] for s in added], session.expires_at)
+
+        session.seats = seats
+        session.promo_code = facade.promotion_applied
+        session.quote = quote
+        session.save(update_fields=['seats', 'promo_code', 'quote', 'updated_at'])
+        return session
+
+
+def _validate_added_seats(user, session, seats, add_seats):
+    '''check only the new seats: they exist, are in the showroom and are free'''
+    if not add_seats:
+        return []
+
+    seat_ids = [s['seat_id'] for s in add_seats]
+    if len(seat_ids) != len(set(seat_ids)) or set(seat_ids) & {s['seat_id'] for s in seats}:
+        raise serializers.ValidationError("Cannot select the same seat multiple times")
+
+    seats_by_id = Seat.objects.filter(
+        showroom_id__in=Showing.objects.filter(showing_id=session.showing_id).values('showroom_id')
+    ).in_bulk(seat_ids)
+
+    added = []
+    for seat_data in add_seats:
+        seat = seats_by_id.get(seat_data['seat_id'])
+        if seat is None:
+            raise serializers.ValidationError(f"Seat with ID {seat_data['seat_id']} is not in this showroom")
+        added.append({
+            'seat_id': seat.seat_id,
+            'seat_display': f"{seat.row_label}{seat.seat_number}",
+            'age_category': seat_data['age_category'],
+        })
+
+    # sold or held by someone else
+    BookingFacade(user=user).check_seats_free([dict(s, showing_id=session.showing_id) for s in added])
+
+    return added
+
+
+def _check_open(session):
+    if session.status != 'open':
+        raise serializers.ValidationError(f"Checkout is already {session.status}")
+    if session.expires_at <= timezone.now():
+        raise CheckoutExpired()
+
+
+def confirm_session(user, session_id, payment_info):
+    '''
+    book the session's quote and release the holds
+
+    Returns:
+        dict: BookingFacade result
+
+    Raises:
+        CheckoutExpired, serializers.ValidationError
+    '''
+    with transaction.atomic():
+        session = _lock(user, session_id)
+        _check_open(session)
+
+        facade = BookingFacade(
+            user=user,
+            showing_id=session.showing_id,
+            seats_data=_seats_data(session.seats),
+            promo_code=session.promo_code,
+            payment_info=payment_info,
+            quote=session.quote
+        )
+        result = facade.process_booking()
+
+        # the tickets block the seats from here on
+        SeatReservation.objects.filter(user=user, showing_id=session.showing_id).delete()
+
+        session.status = 'confirmed'
+        session.booking = facade.booking
+        session.save(update_fields=['status', 'booking', 'updated_at'])
+
+    return result
+
+
+def cancel_session(user, session_id):
+    '''drop an open session and release its seats'''
+    with transaction.atomic():
+        session = _lock(user, session_id)
+        if session.status != 'open':
+            raise serializers.ValidationError(f"Checkout is already {session.status}")
+
+        SeatReservation.objects.filter(
+            user=user, showing_id=session.showing_id, is_confirmed=False
+        ).delete()
+        session.status = 'cancelled'
+        session.save(update_fields=['status', 'updated_at'])
@@ -0,0 +1,33 @@
+'''
+System checks (python manage.py check, runserver and every other command).
+
+The user cache, waiting room, rate limits, token blacklist marks and the
+dashboard snapshot keep state in the Django cache and expect every process
+to see the same cache (see CACHES in the settings).
+'''
+
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Tags, Warning, register
+
+
+def cache_is_shared():
+    '''False if the default cache lives in this process only (LocMemCache)'''
+    return not isinstance(caches['default'], LocMemCache)
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    if cache_is_shared():
+        return []
+    return [
+        Warning(
+            "The default cache is local to each process.",
+            hint=(
+                "Waiting room positions, rate limits and blacklisted tokens are not "
+                "shared between processes, and users are not cached. Point CACHES "
+                "(REDIS_URL) at Redis unless the site runs in a single process."
+            ),
+            id='cinema.W001',
+        )
+    ]
@@ -0,0 +1,148 @@
+'''
+Statistics of the admin dashboard (AdminHomeView).
+
+The dashboard ran seven COUNT queries on every load, two of them on movies
+again with a filter. build() reads each table once with conditional
+aggregates (COUNT ... FILTER / CASE WHEN) and adds what happened today:
+
+    movies          total, currently running, coming soon
+    promotions      total, valid today
+    auth_user       total, active (profile status 'Active')
+    Movie_Showtimes total
+    booking_summaries  bookings, tickets sold and revenue of today
+    showings        showings today, their seats and tickets sold (occupancy)
+
+The result is a snapshot kept in the Django cache under a version (random
+id) and the date:
+
+- saving or deleting a movie, promotion, showtime or showing, registering,
+  verifying or deleting a user, or saving a profile sets a new version
+  (invalidate())
+- bookings don't, today's figures are at most SNAPSHOT_TIMEOUT seconds old
+
+so a dashboard load costs one cache read.
+'''
+
+import uuid
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import BookingSummary, Movie, MovieShowtime, Profile, Promotion, Seat, Showing, Ticket
+
+SNAPSHOT_TIMEOUT = getattr(settings, 'DASHBOARD_SNAPSHOT_TIMEOUT', 60)
+
+VERSION_KEY = 'dashboard:version'
+
+
+def _version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def build():
+    '''the statistics, one query per table'''
+    today = timezone.localdate()
+    day_start = timezone.make_aware(datetime.combine(today, time.min))
+    day_end = day_start + timedelta(days=1)
+
+    movies = Movie.objects.aggregate(
+        total=Count('pk'),
+        currently_running=Count('pk', filter=Q(movie_status='Currently Running')),
+        coming_soon=Count('pk', filter=Q(movie_status='Coming Soon')),
+    )
+    promotions = Promotion.objects.aggregate(
+        total=Count('pk'),
+        active=Count('pk', filter=Q(start_date__lte=today, end_date__gte=today)),
+    )
+    users = User.objects.aggregate(
+        total=Count('pk'),
+        # same meaning as before the snapshot: the profile's status
+        active=Count('pk', filter=Q(profile__status='Active')),
+    )
+    total_showtimes = MovieShowtime.objects.count()
+
+    # bookings made today
+    sales = BookingSummary.objects.filter(booking_time__gte=day_start, booking_time__lt=day_end).aggregate(
+        bookings=Count('pk'),
+        tickets_sold=Coalesce(Sum('ticket_count'), 0),
+        revenue=Sum('total_price'),
+    )
+
+    # showings that start today, with the seats of their showroom and their tickets
+    seats = Seat.objects.filter(showroom_id=OuterRef('showroom')).values('showroom_id').annotate(n=Count('pk')).values('n')
+    sold = Ticket.objects.filter(showing_id=OuterRef('pk')).values('showing_id').annotate(n=Count('pk')).values('n')
+    occupancy = Showing.objects.filter(start_time__gte=day_start, start_time__lt=day_end).aggregate(
+        showings=Count('pk'),
+        seats=Coalesce(Sum(Subquery(seats, output_field=IntegerField())), 0),
+        seats_sold=Coalesce(Sum(Subquery(sold, output_field=IntegerField())), 0),
+    )
+
+    return {
+        'total_movies': movies['total'],
+        'currently_running': movies['currently_running'],
+        'coming_soon': movies['coming_soon'],
+        'total_promotions': promotions['total'],
+        'active_promotions': promotions['active'],
+        'total_users': users['total'],
+        'active_users': users['active'],
+        'total_showtimes': total_showtimes,
+        'today': {
+            'date': today.isoformat(),
+            'bookings': sales['bookings'],
+            'tickets_sold': sales['tickets_sold'],
+            'revenue': f"{sales['revenue'] or 0:.2f}",
+            'showings': occupancy['showings'],
+            'seats': occupancy['seats'],
+            'seats_sold': occupancy['seats_sold'],
+            'occupancy_percent': round(100 * occupancy['seats_sold'] / occupancy['seats'], 1) if occupancy['seats'] else 0.0,
+        },
+        'generated_at': timezone.now().isoformat(),
+    }
+
+
+def snapshot():
+    '''build() from the cache, rebuilt after a change or SNAPSHOT_TIMEOUT seconds'''
+    key = f'dashboard:snapshot:{_version()}:{timezone.localdate().isoformat()}'
+    statistics = cache.get(key)
+    if statistics is None:
+        statistics = build()
+        cache.set(key, statistics, SNAPSHOT_TIMEOUT)
+    return statistics
+
+
+def invalidate():
+    '''the next dashboard load (after the current transaction commits) rebuilds the snapshot'''
+    transaction.on_commit(lambda: cache.set(VERSION_KEY, uuid.uuid4().hex, None))
+
+
+@receiver([post_save, post_delete], sender=Movie)
+@receiver([post_save, post_delete], sender=Promotion)
+@receiver([post_save, post_delete], sender=MovieShowtime)
+@receiver([post_save, post_delete], sender=Showing)
+def _schedule_changed(sender, **kwargs):
+    invalidate()
+
+
+@receiver([post_save, post_delete], sender=Profile)
+def _profile_changed(sender, **kwargs):
+    # the status decides active_users
+    invalidate()
+
+
+@receiver([post_save, post_delete], sender=User)
+def _user_changed(sender, created=False, update_fields=None, **kwargs):
+    # not on logins, they only save last_login
+    if created or update_fields is None or 'is_active' in update_fields:
+        invalidate()
@@ -0,0 +1,94 @@
+'''
+Email templates.
+
+Every email the site sends is a set of templates in
+cinema/templates/cinema/emails/:
+
+    <name>.subject.txt   the subject line
+    <name>.txt           plain text body
+    <name>.html          HTML body (optional)
+
+The templates are compiled once, when the app starts (CinemaConfig.ready()),
+instead of building the text with f-strings in every view. The parts that are
+the same in every email (HTML header and footer, text signature, in
+emails/fragments/) are rendered once at the same time and handed to each
+template as `fragments`, so rendering an email only renders what changes.
+
+render() gives (subject, text, html) for a template and a context; queue()
+renders an email and puts it in the outbox (cinema/outbox.py). Emails without
+per-recipient data, like promotion campaigns, are rendered once and sent to
+every recipient as is.
+'''
+
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from .outbox import enqueue_email
+
+TEMPLATE_DIR = 'cinema/emails'
+
+EMAILS = [
+    'verification',
+    'password_reset',
+    'booking_confirmation',
+    'card_added',
+    'card_updated',
+    'card_removed',
+    'promotion',
+]
+
+FRAGMENTS = ['header.html', 'footer.html', 'signature.txt']
+
+# {name: (subject, text, html or None)} compiled templates
+_templates = {}
+# {'header_html': ..., 'footer_html': ..., 'signature_txt': ...} rendered fragments
+_fragments = {}
+
+
+def load():
+    '''compile every email template and render the fragments (done once at startup)'''
+    templates = {}
+    for name in EMAILS:
+        try:
+            html = get_template(f'{TEMPLATE_DIR}/{name}.html')
+        except TemplateDoesNotExist:
+            html = None
+        templates[name] = (
+            get_template(f'{TEMPLATE_DIR}/{name}.subject.txt'),
+            get_template(f'{TEMPLATE_DIR}/{name}.txt'),
+            html,
+        )
+
+    fragments = {
+        fragment.replace('.', '_'): mark_safe(
+            get_template(f'{TEMPLATE_DIR}/fragments/{fragment}').render({}).strip()
+        )
+        for fragment in FRAGMENTS
+    }
+
+    _templates.update(templates)
+    _fragments.update(fragments)
+
+
+def render(name, context):
+    '''
+    Returns:
+        (subject, text body, html body or '')
+    '''
+    if not _templates:
+        load()
+    subject, text, html = _templates[name]
+    context = {**context, 'fragments': _fragments}
+    return (
+        # subjects are one line
+        ' '.join(subject.render(context).split()),
+        text.render(context).strip() + '\n',
+        html.render(context) if html else '',
+    )
+
+
+def queue(name, to_email, context):
+    '''render an email and queue it in the outbox, call inside the transaction it is about'''
+    subject, text, html = render(name, context)
+    return enqueue_email(to_email, subject, text, html)
@@ -0,0 +1,46 @@
+'''
+Write booking_summaries rows for bookings made before the table existed.
+
+Walks bookings without a summary in booking_id order, a batch at a time
+(keyset, no OFFSET), so it can be stopped and re-run at any point.
+
+Usage:
+    python manage.py backfill_booking_summaries --batch-size 500
+'''
+
+from django.core.management.base import BaseCommand
+
+from cinema.models import Booking, BookingSummary
+from cinema.summaries import rebuild_summaries
+
+
+class Command(BaseCommand):
+    help = 'Create missing booking summaries for the order history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--rebuild', action='store_true',
+                            help='recompute every summary, not only the missing ones')
+
+    def handle(self, *args, **options):
+        batch_size = max(options['batch_size'], 1)
+        bookings = Booking.objects.order_by('booking_id')
+        if not options['rebuild']:
+            bookings = bookings.exclude(
+                booking_id__in=BookingSummary.objects.values('booking_id')
+            )
+
+        last_id = 0
+        written = 0
+        while True:
+            batch = list(
+                bookings.filter(booking_id__gt=last_id).values_list('booking_id', flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+
+            written += rebuild_summaries(batch)
+            last_id = batch[-1]
+            self.stdout.write(f"  up to booking #{last_id}: {written} summaries written")
+
+        self.stdout.write(self.style.SUCCESS(f"Done, {written} summaries written"))
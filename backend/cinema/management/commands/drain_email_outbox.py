@@ -0,0 +1,44 @@
+'''
+Send the emails waiting in the transactional email outbox.
+
+Sends every pending email that is due (first attempts and retries whose
+backoff has passed), see cinema/outbox.py. Run it from cron, or keep it
+running with --loop as the email worker.
+
+Usage:
+    python manage.py drain_email_outbox
+    python manage.py drain_email_outbox --loop --interval 5
+    python manage.py drain_email_outbox --requeue-dead
+'''
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from cinema import outbox
+
+
+class Command(BaseCommand):
+    help = 'Send the emails waiting in the transactional email outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='emails per batch / SMTP connection (default EMAIL_OUTBOX_BATCH_SIZE)')
+        parser.add_argument('--loop', action='store_true', help='keep polling for new emails')
+        parser.add_argument('--interval', type=float, default=5.0, help='seconds between polls with --loop')
+        parser.add_argument('--requeue-dead', action='store_true',
+                            help='give dead emails a fresh set of attempts first')
+
+    def handle(self, *args, **options):
+        if options['requeue_dead']:
+            requeued = outbox.requeue_dead()
+            self.stdout.write(f"Re-queued {requeued} dead emails")
+
+        while True:
+            sent, retried, dead = outbox.drain(options['batch_size'])
+            if sent or retried or dead or not options['loop']:
+                line = f"{sent} sent, {retried} to retry, {dead} dead"
+                self.stdout.write(self.style.SUCCESS(line) if not (retried or dead) else self.style.WARNING(line))
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
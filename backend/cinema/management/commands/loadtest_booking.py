@@ -0,0 +1,285 @@
+'''
+Booking load test.
+
+Seeds a showroom, seats and showings into a LOCAL database and runs N
+concurrent virtual users against the real views (through django.test.Client,
+so middleware, JWT auth and serializers are all included). Every user loops:
+
+    GET  /api/user/showings/                  (ShowingListView)
+    GET  /api/user/showings/<id>/seats/       (SeatMapView)
+    POST /api/user/bookings/create/           (BookingCreateView)
+
+--hot-skew controls contention: that share of bookings goes for the same few
+"hot" seats (the middle of row A, everybody wants them), the rest pick random
+free seats from the seat map they just loaded.
+
+Reports throughput, p50/p95/p99 latency and queries per request per endpoint,
+the booking conflict rate, and checks the tickets table for double bookings.
+
+Usage:
+    python manage.py loadtest_booking --settings=config.settings_loadtest --users 20 --iterations 10
+'''
+
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from cinema.models import Movie, Seat, Showing, Showroom, Ticket
+
+CARD = {'card_number': '4532123456789012', 'expiration': f'12/{timezone.now().year + 2}', 'brand': 'Visa'}
+
+
+def percentile(values, pct):
+    '''nearest-rank percentile of a list of numbers'''
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(int(round(pct / 100.0 * len(ordered))) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+class Command(BaseCommand):
+    help = 'Load test browsing and booking with concurrent users (local database only)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20, help='concurrent virtual users')
+        parser.add_argument('--iterations', type=int, default=10, help='browse + book loops per user')
+        parser.add_argument('--showings', type=int, default=3, help='showings to seed')
+        parser.add_argument('--rows', type=int, default=10, help='seat rows in the seeded showroom')
+        parser.add_argument('--seats-per-row', type=int, default=12)
+        parser.add_argument('--seats-per-booking', type=int, default=2)
+        parser.add_argument('--hot-seats', type=int, default=4, help='size of the hot seat block')
+        parser.add_argument('--hot-skew', type=float, default=0.5,
+                            help='share of bookings that go for the hot seats (0-1)')
+        parser.add_argument('--seed', type=int, default=None, help='random seed for repeatable runs')
+
+    def handle(self, *args, **options):
+        if not getattr(settings, 'LOADTEST_DATABASE', False):
+            raise CommandError(
+                'Refusing to run against this database. Use a local database, '
+                'e.g. --settings=config.settings_loadtest'
+            )
+        if not 0 <= options['hot_skew'] <= 1:
+            raise CommandError('--hot-skew must be between 0 and 1')
+
+        self.random = random.Random(options['seed'])
+
+        self._prepare_database()
+        showings, tokens = self._seed(options)
+
+        self.stdout.write(
+            f"Running {options['users']} users x {options['iterations']} iterations "
+            f"against {len(showings)} showings (hot skew {options['hot_skew']:.0%})..."
+        )
+
+        stats = defaultdict(lambda: {'latencies': [], 'queries': [], 'statuses': defaultdict(int)})
+        bookings = {'attempts': 0, 'created': 0, 'conflicts': 0, 'errors': 0}
+        lock = threading.Lock()
+
+        threads = [
+            threading.Thread(
+                target=self._virtual_user,
+                args=(tokens[i], showings, options, stats, bookings, lock, self.random.random())
+            )
+            for i in range(options['users'])
+        ]
+
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        self._report(stats, bookings, elapsed, showings)
+
+    # --- setup --- #
+
+    def _prepare_database(self):
+        '''migrate and create the tables Django doesn't manage (schema lives in database/*.sql)'''
+        call_command('migrate', verbosity=0)
+        existing = set(connection.introspection.table_names())
+        with connection.schema_editor() as editor:
+            for model in apps.get_app_config('cinema').get_models():
+                if not model._meta.managed and model._meta.db_table not in existing:
+                    editor.create_model(model)
+                    existing.add(model._meta.db_table)
+
+    def _seed(self, options):
+        '''fresh showroom + showings for this run, reusable users with JWTs'''
+        run = uuid.uuid4().hex[:6]
+        movie = Movie.objects.create(movie_title=f'Load Test {run}', movie_status='Currently Running')
+        showroom = Showroom.objects.create(showroom_name=f'Load Test Room {run}')
+
+        rows = [chr(ord('A') + i) for i in range(min(options['rows'], 26))]
+        Seat.objects.bulk_create([
+            Seat(showroom_id=showroom, row_label=row, seat_number=number)
+            for row in rows
+            for number in range(1, options['seats_per_row'] + 1)
+        ])
+
+        start = timezone.now() + timedelta(days=1)
+        showings = [
+            Showing.objects.create(movie=movie, showroom=showroom, start_time=start + timedelta(hours=3 * i))
+            for i in range(options['showings'])
+        ]
+
+        # the middle of row A, hot for every showing
+        seats = list(Seat.objects.filter(showroom_id=showroom).order_by('row_label', 'seat_number'))
+        middle = options['seats_per_row'] // 2
+        first_row = seats[:options['seats_per_row']]
+        hot = first_row[max(middle - options['hot_seats'] // 2, 0):][:options['hot_seats']]
+        self.hot_seat_ids = [seat.seat_id for seat in hot]
+
+        tokens = []
+        for i in range(options['users']):
+            user, _ = User.objects.get_or_create(
+                username=f'loadtest_user_{i}',
+                defaults={'email': f'loadtest_user_{i}@example.com'}
+            )
+            tokens.append(str(RefreshToken.for_user(user).access_token))
+
+        self.stdout.write(
+            f"Seeded {len(seats)} seats in {showroom.showroom_name} and {len(showings)} showings"
+        )
+        return [showing.showing_id for showing in showings], tokens
+
+    # --- virtual user --- #
+
+    def _call(self, client, name, stats, lock, method, path, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            if method == 'get':
+                response = client.get(path)
+            else:
+                response = client.post(path, data, content_type='application/json')
+            latency = time.perf_counter() - started
+
+        with lock:
+            stats[name]['latencies'].append(latency)
+            stats[name]['queries'].append(len(queries))
+            stats[name]['statuses'][response.status_code] += 1
+        return response
+
+    def _virtual_user(self, token, showings, options, stats, bookings, lock, seed):
+        rng = random.Random(seed)
+        client = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+        try:
+            for _ in range(options['iterations']):
+                self._call(client, 'ShowingListView', stats, lock, 'get', '/api/user/showings/')
+
+                showing_id = rng.choice(showings)
+                response = self._call(
+                    client, 'SeatMapView', stats, lock, 'get', f'/api/user/showings/{showing_id}/seats/'
+                )
+                if response.status_code != 200:
+                    continue
+
+                free = [
+                    seat['seat_id']
+                    for row in response.json()['seats_by_row'].values()
+                    for seat in row
+                    if seat['is_available']
+                ]
+                wanted = min(options['seats_per_booking'], len(free)) or options['seats_per_booking']
+
+                if rng.random() < options['hot_skew']:
+                    seat_ids = rng.sample(self.hot_seat_ids, min(wanted, len(self.hot_seat_ids)))
+                elif free:
+                    seat_ids = rng.sample(free, wanted)
+                else:
+                    # sold out, still try so the conflict path gets measured
+                    seat_ids = rng.sample(self.hot_seat_ids, min(wanted, len(self.hot_seat_ids)))
+
+                body = {
+                    'showing_id': showing_id,
+                    'seats': [{'seat_id': seat_id, 'age_category': 'Adult'} for seat_id in seat_ids],
+                    **CARD,
+                }
+                response = self._call(
+                    client, 'BookingCreateView', stats, lock, 'post', '/api/user/bookings/create/', body
+                )
+
+                with lock:
+                    bookings['attempts'] += 1
+                    if response.status_code == 201:
+                        bookings['created'] += 1
+                    elif response.status_code == 400 and any(
+                        phrase in str(response.json().get('error', ''))
+                        for phrase in ('already booked', 'being held')
+                    ):
+                        bookings['conflicts'] += 1
+                    else:
+                        bookings['errors'] += 1
+        finally:
+            connections.close_all()
+
+    # --- report --- #
+
+    def _report(self, stats, bookings, elapsed, showings):
+        total_requests = sum(len(endpoint['latencies']) for endpoint in stats.values())
+
+        self.stdout.write('')
+        self.stdout.write(f"{total_requests} requests in {elapsed:.2f}s = {total_requests / elapsed:.1f} req/s")
+        self.stdout.write('')
+        self.stdout.write(
+            f"{'endpoint':<20}{'count':>7}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+            f"{'queries':>9}  statuses"
+        )
+        for name in ['ShowingListView', 'SeatMapView', 'BookingCreateView']:
+            endpoint = stats.get(name)
+            if not endpoint:
+                continue
+            latencies = endpoint['latencies']
+            statuses = ', '.join(f"{code}: {count}" for code, count in sorted(endpoint['statuses'].items()))
+            self.stdout.write(
+                f"{name:<20}{len(latencies):>7}{len(latencies) / elapsed:>8.1f}"
+                f"{percentile(latencies, 50) * 1000:>9.1f}"
+                f"{percentile(latencies, 95) * 1000:>9.1f}"
+                f"{percentile(latencies, 99) * 1000:>9.1f}"
+                f"{sum(endpoint['queries']) / len(endpoint['queries']):>9.1f}  {statuses}"
+            )
+
+        attempts = bookings['attempts'] or 1
+        self.stdout.write('')
+        self.stdout.write(
+            f"Bookings: {bookings['attempts']} attempts, {bookings['created']} created, "
+            f"{bookings['conflicts']} conflicts ({bookings['conflicts'] / attempts:.1%}), "
+            f"{bookings['errors']} other errors"
+        )
+
+        double_booked = list(
+            Ticket.objects.filter(showing_id__in=showings)
+            .values('showing_id', 'seat_id')
+            .annotate(tickets=Count('ticket_id'))
+            .filter(tickets__gt=1)
+        )
+        if double_booked:
+            self.stdout.write(self.style.ERROR(f"DOUBLE BOOKINGS: {len(double_booked)} seats sold more than once"))
+            for row in double_booked:
+                self.stdout.write(self.style.ERROR(
+                    f"  showing {row['showing_id']} seat {row['seat_id']}: {row['tickets']} tickets"
+                ))
+        else:
+            self.stdout.write(self.style.SUCCESS('No double bookings'))
+
+        if connection.vendor == 'sqlite' and bookings['errors']:
+            self.stdout.write(self.style.WARNING(
+                "SQLite allows one writer at a time, most 500s above are 'database is locked'. "
+                "Use a local MySQL (see config/settings_loadtest.py) for contention numbers."
+            ))
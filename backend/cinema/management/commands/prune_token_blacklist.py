@@ -0,0 +1,55 @@
+'''
+Delete expired refresh tokens from the token blacklist tables.
+
+Every login and every refresh adds a row to token_blacklist_outstandingtoken,
+and every refresh and logout one to token_blacklist_blacklistedtoken. Rows of
+expired tokens are useless (an expired token is rejected anyway), this
+deletes them in batches so the tables don't grow forever and the delete never
+holds locks for long. Run it from cron, e.g. nightly.
+
+Usage:
+    python manage.py prune_token_blacklist
+    python manage.py prune_token_blacklist --batch-size 5000 --sleep 0.5
+'''
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+
+class Command(BaseCommand):
+    help = 'Delete expired refresh tokens from the token blacklist tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='tokens deleted per transaction')
+        parser.add_argument('--sleep', type=float, default=0.0, help='seconds to pause between batches')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        now = timezone.now()
+        outstanding = blacklisted = 0
+
+        while True:
+            ids = list(
+                OutstandingToken.objects.filter(expires_at__lte=now)
+                .order_by('id')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+
+            with transaction.atomic():
+                # blacklist rows go with their token (on_delete=CASCADE)
+                _, deleted = OutstandingToken.objects.filter(id__in=ids).delete()
+            outstanding += deleted.get(OutstandingToken._meta.label, 0)
+            blacklisted += deleted.get(BlacklistedToken._meta.label, 0)
+
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {outstanding} expired tokens ({blacklisted} of them blacklisted)"
+        ))
@@ -0,0 +1,49 @@
+'''
+Delete expired email verification and password reset codes.
+
+A code is deleted when it is used or guessed wrong too often, codes nobody
+used stay in cinema_one_time_code after they expire. This deletes them in
+batches on the expires_at index, so the delete never holds locks for long.
+Run it from cron, e.g. hourly.
+
+Usage:
+    python manage.py purge_one_time_codes
+    python manage.py purge_one_time_codes --batch-size 5000 --sleep 0.5
+'''
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from cinema import one_time_codes
+from cinema.models import OneTimeCode
+
+
+class Command(BaseCommand):
+    help = 'Delete expired email verification and password reset codes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='codes deleted per statement')
+        parser.add_argument('--sleep', type=float, default=0.0, help='seconds to pause between batches')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        purged = 0
+
+        while True:
+            ids = list(
+                one_time_codes.expired()
+                .order_by('expires_at')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+
+            # codes have no dependent rows, a plain delete of the batch
+            deleted, _ = OneTimeCode.objects.filter(id__in=ids).delete()
+            purged += deleted
+
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {purged} expired one-time codes"))
@@ -0,0 +1,50 @@
+'''
+Delete seat holds of checkouts that ran out of time.
+
+An expired hold (seat_reservation row) no longer blocks its seat, but nothing
+deletes it unless the user opens, changes or cancels a checkout for the same
+showing again, so abandoned checkouts pile up. This deletes them in batches
+on the expires_at index, so the delete never holds locks for long. Run it
+from cron, e.g. every few minutes.
+
+Usage:
+    python manage.py purge_seat_holds
+    python manage.py purge_seat_holds --batch-size 5000 --sleep 0.5
+'''
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from cinema import checkout
+from cinema.models import SeatReservation
+
+
+class Command(BaseCommand):
+    help = 'Delete expired seat holds of abandoned checkouts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='holds deleted per statement')
+        parser.add_argument('--sleep', type=float, default=0.0, help='seconds to pause between batches')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        purged = 0
+
+        while True:
+            ids = list(
+                checkout.expired_holds()
+                .order_by('expires_at')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+
+            # holds have no dependent rows, a plain delete of the batch
+            deleted, _ = SeatReservation.objects.filter(id__in=ids).delete()
+            purged += deleted
+
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {purged} expired seat holds"))
@@ -0,0 +1,211 @@
+'''
+Re-encrypt every payment card number with the newest card key.
+
+With the new key in front of CARD_ENCRYPTION_KEYS (see cinema/card_cipher.py)
+new cards are encrypted with it, this moves the existing ones over with
+MultiFernet.rotate so the old key can be dropped afterwards.
+
+The table is walked in id order a chunk at a time (keyset, no OFFSET and
+never the whole table in memory). Worker threads rotate the chunks, each in
+its own short transaction that locks only the rows of that chunk, so cards
+can be used and added while it runs. Every finished stretch of chunks is
+written to a checkpoint file: a stopped or failed run picks up from there
+when started again with the same newest key.
+
+Usage:
+    python manage.py rotate_card_keys
+    python manage.py rotate_card_keys --workers 8 --chunk-size 1000
+    python manage.py rotate_card_keys --restart    (ignore the checkpoint)
+'''
+
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+from cryptography.fernet import InvalidToken
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.utils import timezone
+
+from cinema import card_cipher
+from cinema.models import PaymentCard
+
+
+class Command(BaseCommand):
+    help = 'Re-encrypt payment card numbers with the newest CARD_ENCRYPTION_KEYS key'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='cards per transaction')
+        parser.add_argument('--workers', type=int, default=4, help='threads rotating chunks in parallel')
+        parser.add_argument('--checkpoint', default='rotate_card_keys.checkpoint.json',
+                            help='file the progress is kept in')
+        parser.add_argument('--restart', action='store_true', help='start from the first card, ignore the checkpoint')
+        parser.add_argument('--sleep', type=float, default=0.0, help='seconds each worker pauses between chunks')
+
+    def handle(self, *args, **options):
+        chunk_size = max(options['chunk_size'], 1)
+        workers = max(options['workers'], 1)
+        self.checkpoint_path = options['checkpoint']
+        self.sleep = options['sleep']
+        self.key = card_cipher.fingerprint()
+
+        if len(card_cipher.keys()) == 1:
+            self.stdout.write(self.style.WARNING(
+                "Only one card key is configured, cards are re-encrypted with the key they already use"
+            ))
+
+        after_id = 0 if options['restart'] else self._load_checkpoint()
+        if after_id:
+            self.stdout.write(f"Resuming after card #{after_id}")
+        total = PaymentCard.objects.filter(id__gt=after_id).count()
+        self.stdout.write(f"Rotating {total} cards to key {self.key} with {workers} workers")
+
+        work = queue.Queue()
+        done = queue.Queue()
+        threads = [
+            threading.Thread(target=self._worker, args=(work, done), daemon=True)
+            for _ in range(workers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        started = time.monotonic()
+        rotated = failed = 0
+        cursor = after_id
+        exhausted = False
+        error = None
+        submitted = deque()  # (after id, last id) of chunks in id order
+        finished = set()
+        in_flight = 0
+
+        try:
+            while True:
+                # keep every worker busy with a chunk or two queued
+                while not exhausted and error is None and in_flight < workers * 2:
+                    ids = list(
+                        PaymentCard.objects.filter(id__gt=cursor)
+                        .order_by('id')
+                        .values_list('id', flat=True)[:chunk_size]
+                    )
+                    if not ids:
+                        exhausted = True
+                        break
+                    chunk = (cursor, ids[-1])
+                    submitted.append(chunk)
+                    work.put(chunk)
+                    cursor = ids[-1]
+                    in_flight += 1
+
+                if not in_flight:
+                    break
+
+                chunk, chunk_rotated, chunk_failed, chunk_error = done.get()
+                in_flight -= 1
+                if chunk_error is not None:
+                    error = error or chunk_error
+                    continue
+                rotated += chunk_rotated
+                failed += chunk_failed
+                finished.add(chunk)
+
+                # checkpoint the end of the finished chunks that have no unfinished one before them
+                checkpoint = None
+                while submitted and submitted[0] in finished:
+                    finished.discard(submitted[0])
+                    checkpoint = submitted.popleft()[1]
+                if checkpoint is not None:
+                    self._save_checkpoint(checkpoint, rotated)
+
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f"  {rotated}/{total} cards rotated ({rotated / elapsed if elapsed else 0:.0f} rows/s)"
+                )
+        finally:
+            for _ in threads:
+                work.put(None)
+            for thread in threads:
+                thread.join()
+
+        elapsed = time.monotonic() - started
+        rate = rotated / elapsed if elapsed else 0
+        if error is not None:
+            raise CommandError(
+                f"Stopped after {rotated} cards ({rate:.0f} rows/s): {error}. "
+                f"Run again to resume from {self.checkpoint_path}"
+            )
+
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        if failed:
+            self.stdout.write(self.style.WARNING(
+                f"{failed} cards could not be decrypted with any configured key and were left as they are"
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f"Rotated {rotated} cards in {elapsed:.1f}s ({rate:.0f} rows/s)"
+        ))
+
+    def _worker(self, work, done):
+        try:
+            while True:
+                chunk = work.get()
+                if chunk is None:
+                    return
+                try:
+                    rotated, failed = self._rotate_chunk(*chunk)
+                    done.put((chunk, rotated, failed, None))
+                except Exception as e:
+                    done.put((chunk, 0, 0, e))
+                if self.sleep:
+                    time.sleep(self.sleep)
+        finally:
+            # each thread has its own database connection
+            connections.close_all()
+
+    def _rotate_chunk(self, after_id, last_id):
+        '''rotate the cards with after_id < id <= last_id in one transaction'''
+        with transaction.atomic():
+            cards = list(
+                PaymentCard.objects.select_for_update()
+                .filter(id__gt=after_id, id__lte=last_id)
+                .only('id', 'card_number_enc')
+            )
+            changed = []
+            failed = 0
+            for card in cards:
+                try:
+                    card.card_number_enc = card_cipher.rotate(card.card_number_enc)
+                except (InvalidToken, ValueError):
+                    failed += 1
+                    continue
+                changed.append(card)
+            PaymentCard.objects.bulk_update(changed, ['card_number_enc'])
+        return len(changed), failed
+
+    def _load_checkpoint(self):
+        '''id of the last card rotated by an earlier run with the same key, else 0'''
+        try:
+            with open(self.checkpoint_path) as f:
+                checkpoint = json.load(f)
+        except FileNotFoundError:
+            return 0
+        except ValueError:
+            raise CommandError(f"{self.checkpoint_path} is not a checkpoint, remove it or use --restart")
+        if checkpoint.get('key') != self.key:
+            self.stdout.write(f"{self.checkpoint_path} is for another key, starting from the first card")
+            return 0
+        return checkpoint.get('last_id', 0)
+
+    def _save_checkpoint(self, last_id, rotated):
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'key': self.key,
+                'last_id': last_id,
+                'rotated': rotated,
+                'updated_at': timezone.now().isoformat(),
+            }, f)
+        # replaced in one step, a crash never leaves half a checkpoint
+        os.replace(tmp_path, self.checkpoint_path)
@@ -0,0 +1,59 @@
+'''
+Send queued promotion email campaigns and resume interrupted ones.
+
+This is how campaigns are sent (PROMOTION_CAMPAIGN_BACKGROUND is off by
+default). Picks up queued campaigns and running campaigns that stopped
+checkpointing (their worker died). Each one continues from its checkpoint,
+see cinema/campaigns.py. Run it from cron, e.g. every minute; a campaign
+already being sent by another run is skipped.
+
+Usage:
+    python manage.py run_promotion_campaigns
+    python manage.py run_promotion_campaigns --campaign 12 --retry-failed
+'''
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cinema import campaigns
+from cinema.models import PromotionCampaign
+
+
+class Command(BaseCommand):
+    help = 'Send queued promotion email campaigns and resume interrupted ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--campaign', type=int, default=None, help='only this campaign')
+        parser.add_argument('--retry-failed', action='store_true',
+                            help='queue failed campaigns again (they continue from their checkpoint)')
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            failed = PromotionCampaign.objects.filter(status='failed')
+            if options['campaign']:
+                failed = failed.filter(pk=options['campaign'])
+            requeued = failed.update(status='queued', finished_at=None)
+            if requeued:
+                self.stdout.write(f"Re-queued {requeued} failed campaigns")
+
+        if options['campaign']:
+            if not PromotionCampaign.objects.filter(pk=options['campaign']).exists():
+                raise CommandError(f"Campaign #{options['campaign']} does not exist")
+            campaign_ids = [options['campaign']]
+        else:
+            campaign_ids = campaigns.pending_campaign_ids()
+
+        if not campaign_ids:
+            self.stdout.write('No campaigns to run')
+            return
+
+        for campaign_id in campaign_ids:
+            campaign = campaigns.run_campaign(campaign_id)
+            if campaign is None:
+                self.stdout.write(f"  campaign #{campaign_id}: not pending or taken by another worker, skipped")
+                continue
+
+            line = (
+                f"  campaign #{campaign_id}: {campaign.status}, {campaign.sent_count} sent, "
+                f"{campaign.failed_count} failed of {campaign.total_recipients}"
+            )
+            self.stdout.write(self.style.SUCCESS(line) if campaign.status == 'completed' else self.style.WARNING(line))
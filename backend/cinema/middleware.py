@@ -1,7 +1,146 @@
+import json
+import re
+
+from django.http import JsonResponse
 from django.utils.deprecation import MiddlewareMixin
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .admission import AdmissionController
+from .ratelimit import client_ip, limit_request
 
 class DisableCSRFForAdminAPI(MiddlewareMixin):
     """Disable CSRF for admin API endpoints since they use JWT authentication"""
     def process_request(self, request):
         if request.path.startswith('/admin/'):
-            setattr(request, '_dont_enforce_csrf_checks', True)
\ No newline at end of file
+            setattr(request, '_dont_enforce_csrf_checks', True)
+
+
+class AuthRateLimitMiddleware(MiddlewareMixin):
+    """
+    Sliding-window rate limits for login, email verification and password
+    reset (see cinema/ratelimit.py).
+
+    Runs before authentication and the views, so a request over its limit
+    gets a 429 without any password hashing or database work.
+    """
+    def process_request(self, request):
+        return limit_request(request)
+
+
+class ShowingAdmissionMiddleware(MiddlewareMixin):
+    """
+    Virtual waiting room for high-demand showings (see cinema/admission.py).
+
+    Guards the per-showing user endpoints (/api/user/showings/<id>/...) and the
+    booking endpoints (preview, create, cart, opening a checkout), which carry
+    the showing(s) in the JSON body. Showings
+    without admission control pass straight through.
+
+    Clients send back the X-Admission-Pass and X-Queue-Ticket headers they
+    were given (comma separated, one ticket per queued showing). Requests
+    that are still queued get a 429 with their position and estimated wait
+    instead of reaching the view (and the database). Passes and queue tickets
+    are bound to the user of the access token and the client address.
+    """
+    SHOWING_PATH = re.compile(r'^/api/user/showings/(?P<pk>\d+)/')
+    BOOKING_PATHS = ('/api/user/bookings/preview/', '/api/user/bookings/create/', '/api/user/checkout/')
+    CART_PATH = '/api/user/bookings/cart/'
+
+    def _showing_ids_for(self, request):
+        match = self.SHOWING_PATH.match(request.path)
+        if match:
+            return [int(match.group('pk'))]
+
+        if request.method != 'POST' or (
+            request.path not in self.BOOKING_PATHS and request.path != self.CART_PATH
+        ):
+            return []
+
+        try:
+            data = json.loads(request.body or b'{}')
+            if request.path == self.CART_PATH:
+                return [int(item['showing_id']) for item in data.get('items', [])]
+            return [int(data.get('showing_id'))]
+        except (ValueError, TypeError, AttributeError, KeyError):
+            # let the view report the bad request body
+            return []
+
+    def _holder(self, request):
+        '''who a pass is granted to: the user of a valid access token and the client address'''
+        user_id = None
+        parts = request.headers.get('Authorization', '').split()
+        if len(parts) == 2 and parts[0] in api_settings.AUTH_HEADER_TYPES:
+            try:
+                user_id = AccessToken(parts[1]).get(api_settings.USER_ID_CLAIM)
+            except TokenError:
+                # the view rejects the token, the request only gets an address-bound pass
+                pass
+        return {'u': user_id, 'a': client_ip(request)}
+
+    def process_request(self, request):
+        # a cart checkout can hold several showings, so several passes and
+        # queue tickets (one per showing) can be sent as comma separated lists
+        passes = [p for p in request.headers.get('X-Admission-Pass', '').split(',') if p]
+        tickets = [t for t in request.headers.get('X-Queue-Ticket', '').split(',') if t]
+        granted = []
+        queued = []
+        holder = None
+
+        for showing_id in self._showing_ids_for(request):
+            controller = AdmissionController.for_showing(showing_id)
+            if controller is None:
+                continue
+
+            if holder is None:
+                holder = self._holder(request)
+
+            if any(controller.has_valid_pass(admission_pass, holder) for admission_pass in passes):
+                continue
+
+            decision = controller.admit(tickets, holder)
+
+            if decision.admitted:
+                granted.append(decision.admission_pass)
+            else:
+                queued.append((showing_id, decision))
+
+        if granted:
+            # handed to the client in process_response, with a 429 too so the
+            # passes of the showings that were admitted are kept
+            request.admission_passes = granted
+        if not queued:
+            return None
+
+        # the showing with the longest wait decides when to come back
+        showing_id, decision = max(queued, key=lambda entry: entry[1].estimated_wait_seconds)
+        response = JsonResponse({
+            'error': 'This showing is in high demand. You are in the waiting room.',
+            'code': 'ADMISSION_QUEUED',
+            'showing_id': showing_id,
+            'queue_ticket': decision.queue_ticket,
+            'position': decision.position,
+            'people_ahead': decision.people_ahead,
+            'estimated_wait_seconds': decision.estimated_wait_seconds,
+            # every showing of the request that is still queued, with its own ticket
+            'queued': [
+                {
+                    'showing_id': queued_showing_id,
+                    'queue_ticket': queued_decision.queue_ticket,
+                    'position': queued_decision.position,
+                    'people_ahead': queued_decision.people_ahead,
+                    'estimated_wait_seconds': queued_decision.estimated_wait_seconds,
+                }
+                for queued_showing_id, queued_decision in queued
+            ],
+        }, status=429)
+        response['Retry-After'] = str(max(decision.estimated_wait_seconds, 1))
+        response['X-Queue-Ticket'] = ','.join(queued_decision.queue_ticket for _, queued_decision in queued)
+        return response
+
+    def process_response(self, request, response):
+        granted = getattr(request, 'admission_passes', None)
+        if granted:
+            response['X-Admission-Pass'] = ','.join(granted)
+        return response
@@ -0,0 +1,43 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('cinema', '0004_emailoutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OneTimeCode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=254)),
+                ('purpose', models.CharField(choices=[('verify_email', 'Verify email'), ('reset_password', 'Reset password')], max_length=20)),
+                ('code_hash', models.CharField(max_length=64)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='one_time_codes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'cinema_one_time_code',
+                'managed': True,
+                'indexes': [models.Index(fields=['expires_at'], name='one_time_code_expires_idx')],
+                'constraints': [models.UniqueConstraint(fields=('email', 'purpose'), name='one_time_code_email_purpose_uniq')],
+            },
+        ),
+        # codes on the profile expired five minutes after they were sent,
+        # none are worth carrying over to the new table
+        migrations.RemoveField(
+            model_name='profile',
+            name='verification_code',
+        ),
+        migrations.RemoveField(
+            model_name='profile',
+            name='verification_code_created_at',
+        ),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations, models
+
+
+def backfill_last4(apps, schema_editor):
+    # existing cards are decrypted once here, never again to be listed
+    from cinema import card_cipher
+
+    PaymentCard = apps.get_model('cinema', 'PaymentCard')
+    batch = []
+    for card in PaymentCard.objects.filter(last4='').only('id', 'card_number_enc').iterator(chunk_size=500):
+        try:
+            card.last4 = card_cipher.decrypt(card.card_number_enc)[-4:]
+        except Exception:
+            # not readable with the configured keys, shown masked as before
+            continue
+        batch.append(card)
+        if len(batch) >= 500:
+            PaymentCard.objects.bulk_update(batch, ['last4'])
+            batch = []
+    if batch:
+        PaymentCard.objects.bulk_update(batch, ['last4'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cinema', '0005_onetimecode_remove_profile_verification_code'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paymentcard',
+            name='last4',
+            field=models.CharField(blank=True, default='', max_length=4),
+        ),
+        migrations.RunPython(backfill_last4, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.db import migrations, models
+
+# auth_user belongs to django.contrib.auth, the index is added to it from here
+EMAIL_INDEX = models.Index(fields=['email'], name='auth_user_email_idx')
+
+
+def add_email_index(apps, schema_editor):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    with schema_editor.connection.cursor() as cursor:
+        existing = schema_editor.connection.introspection.get_constraints(cursor, User._meta.db_table)
+    # databases created from database/new_schema.sql already have it
+    if EMAIL_INDEX.name not in existing:
+        schema_editor.add_index(User, EMAIL_INDEX)
+
+
+def remove_email_index(apps, schema_editor):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    schema_editor.remove_index(User, EMAIL_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('cinema', '0006_paymentcard_last4'),
+    ]
+
+    operations = [
+        # admin user search by email prefix, registration and forgot password lookups by email
+        migrations.RunPython(add_email_index, remove_email_index),
+    ]
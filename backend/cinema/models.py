@@ -1,9 +1,12 @@
 #this will map to existing tables in the database
 #views will handle the logic and pull from the models created here
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
-from cryptography.fernet import Fernet
-import base64
+from django.utils import timezone
+import uuid
+
+from . import card_cipher
 
 class Movie(models.Model):
     movie_id = models.AutoField(primary_key=True)
@@ -152,6 +155,83 @@ class Showing(models.Model):
         return f"{self.movie.movie_title} - {self.showroom.showroom_name} - {self.start_time.strftime('%b %d, %I:%M %p')}"    
 
 
+class ShowingAdmission(models.Model):
+    """
+    Per-showing settings for the virtual waiting room (see cinema/admission.py).
+
+    When enabled, users are let into the seat map / booking flow through a
+    token bucket: `burst` users get in right away and after that
+    `admits_per_minute` more are admitted every minute. Everyone else gets a
+    signed queue ticket with an estimated wait.
+    """
+    showing = models.OneToOneField(
+        Showing,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        db_column='showing_id',
+        related_name='admission'
+    )
+    enabled = models.BooleanField(default=False)
+    admits_per_minute = models.PositiveIntegerField(default=60)
+    burst = models.PositiveIntegerField(default=20)
+    # how long an admitted user can stay in the booking flow without queueing again
+    pass_ttl_minutes = models.PositiveIntegerField(default=10)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'showing_admission'
+        managed = False
+
+    def __str__(self):
+        state = 'on' if self.enabled else 'off'
+        return f"Admission for showing #{self.showing_id} ({state})"
+
+
+class TicketPrice(models.Model):
+    """
+    One row of the ticket price table (see cinema/pricing.py).
+
+    A price applies to one showroom or, with showroom empty, to every showroom,
+    and to one time-of-day band or to all of them ('any'). The most specific
+    row wins; categories without any row keep the standard prices.
+    """
+    TIME_BAND_CHOICES = [
+        ('any', 'Any time'),
+        ('matinee', 'Matinee (06:00 - 16:59)'),
+        ('evening', 'Evening (17:00 - 21:59)'),
+        ('late', 'Late night (22:00 - 05:59)'),
+    ]
+    AGE_CATEGORY_CHOICES = [
+        ('Child', 'Child'),
+        ('Adult', 'Adult'),
+        ('Senior', 'Senior'),
+    ]
+
+    price_id = models.AutoField(primary_key=True)
+
+    showroom = models.ForeignKey(
+        Showroom,
+        on_delete=models.CASCADE,
+        db_column='showroom_id',
+        null=True,
+        blank=True,
+        related_name='ticket_prices'
+    )
+
+    time_band = models.CharField(max_length=10, choices=TIME_BAND_CHOICES, default='any')
+    age_category = models.CharField(max_length=10, choices=AGE_CATEGORY_CHOICES)
+    price = models.DecimalField(max_digits=6, decimal_places=2)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'ticket_prices'
+        managed = False
+
+    def __str__(self):
+        showroom = self.showroom_id or 'all showrooms'
+        return f"{self.age_category} {self.time_band} ({showroom}): ${self.price}"
+
+
 class Booking(models.Model):
     """
     Represents a user's booking
@@ -225,13 +305,202 @@ class Ticket(models.Model):
     def __str__(self):
         return f"Ticket #{self.ticket_id} - Seat {self.seat} - {self.age_category}"
     
+class BookingSummary(models.Model):
+    """
+    Denormalized copy of what the order history shows for a booking.
+
+    Written together with the booking (BookingFacade) so listing a user's
+    history is one indexed query instead of walking tickets -> showing ->
+    movie/showroom for every booking. For cart bookings the showing fields
+    describe the earliest showing and movie_title lists every movie.
+    """
+    booking = models.OneToOneField(
+        Booking,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        db_column='booking_id',
+        related_name='summary'
+    )
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        db_column='user_id',
+        related_name='booking_summaries'
+    )
+
+    showing = models.ForeignKey(
+        Showing,
+        on_delete=models.SET_NULL,
+        null=True,
+        db_column='showing_id',
+        related_name='+'
+    )
+
+    movie_title = models.CharField(max_length=255)
+    showroom_name = models.CharField(max_length=50)
+    start_time = models.DateTimeField()
+    # [{"seat_display": "A5", "age_category": "Adult"}, ...]
+    seats = models.JSONField(default=list)
+    ticket_count = models.PositiveIntegerField(default=0)
+    total_price = models.DecimalField(max_digits=10, decimal_places=2)
+    booking_time = models.DateTimeField()
+
+    class Meta:
+        db_table = 'booking_summaries'
+        managed = False
+        indexes = [
+            models.Index(fields=['user', 'booking_time'], name='idx_summary_user_time'),
+            models.Index(fields=['user', 'start_time'], name='idx_summary_user_start'),
+            models.Index(fields=['booking_time'], name='idx_summary_booking_time'),
+        ]
+
+    def __str__(self):
+        return f"Summary of booking #{self.booking_id}"
+
+
+class BookingReceipt(models.Model):
+    """
+    Snapshot of a booking as it was sold (see cinema/receipts.py).
+
+    Written once by BookingFacade in the booking transaction. The detail page,
+    confirmation page and email read it back with one primary-key lookup, and
+    it keeps showing what the customer paid for even if movie titles or
+    prices change later. Bulk cancels/moves never rewrite it, they append to
+    amendments.
+    """
+    booking = models.OneToOneField(
+        Booking,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        db_column='booking_id',
+        related_name='receipt'
+    )
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        db_column='user_id',
+        related_name='booking_receipts'
+    )
+
+    receipt = models.JSONField(encoder=DjangoJSONEncoder)
+    amendments = models.JSONField(encoder=DjangoJSONEncoder, default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'booking_receipts'
+        managed = False
+
+    def __str__(self):
+        return f"Receipt for booking #{self.booking_id}"
+
+
+class SeatReservation(models.Model):
+    """
+    Temporary hold on a seat while a user is checking out (see cinema/checkout.py).
+
+    A hold blocks the seat for everybody else until it expires or the
+    checkout is confirmed.
+    """
+    id = models.AutoField(primary_key=True)
+
+    showing = models.ForeignKey(
+        Showing,
+        on_delete=models.CASCADE,
+        db_column='showing_id',
+        related_name='reservations'
+    )
+
+    seat = models.ForeignKey(
+        Seat,
+        on_delete=models.CASCADE,
+        db_column='seat_id',
+        related_name='reservations'
+    )
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        db_column='user_id',
+        related_name='seat_reservations'
+    )
+
+    reserved_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    is_confirmed = models.BooleanField(default=False)
+
+    class Meta:
+        db_table = 'seat_reservation'
+        managed = False
+        unique_together = (('showing', 'seat', 'user'),)
+
+    def __str__(self):
+        return f"Hold on seat {self.seat_id} for showing #{self.showing_id} by user {self.user_id}"
+
+
+class CheckoutSession(models.Model):
+    """
+    Server-side state of a checkout in progress (see cinema/checkout.py).
+
+    Holds the selected seats with their age categories, the promo code and the
+    current price quote, so each checkout step only sends what changed.
+    """
+    STATUS_CHOICES = [
+        ('open', 'Open'),
+        ('confirmed', 'Confirmed'),
+        ('cancelled', 'Cancelled'),
+    ]
+
+    session_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        db_column='user_id',
+        related_name='checkout_sessions'
+    )
+
+    showing = models.ForeignKey(
+        Showing,
+        on_delete=models.CASCADE,
+        db_column='showing_id',
+        related_name='checkout_sessions'
+    )
+
+    # [{"seat_id": 5, "seat_display": "A5", "age_category": "Adult"}, ...]
+    seats = models.JSONField(default=list)
+    promo_code = models.CharField(max_length=100, null=True, blank=True)
+    # BookingFacade quote for the current seats and promo code
+    quote = models.JSONField(null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='open')
+
+    booking = models.ForeignKey(
+        Booking,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        db_column='booking_id',
+        related_name='+'
+    )
+
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'checkout_sessions'
+        managed = False
+
+    def __str__(self):
+        return f"Checkout {self.session_id} ({self.status})"
+
+
 class Profile(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="profile")
     phone = models.CharField(max_length=20, blank=True)
     subscribed = models.BooleanField(default=False)         # promotions
     status = models.CharField(max_length=10, default="Inactive")  # Active/Inactive
-    verification_code = models.CharField(max_length=6, null=True, blank=True)
-    verification_code_created_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return f"Profile<{self.user.email}>"
@@ -243,6 +512,11 @@ class Promotion(models.Model):
     discount_value = models.DecimalField(max_digits=5, decimal_places=2, default=0.00)
     start_date = models.DateField()
     end_date = models.DateField()
+    # redemption limits (see cinema/redemptions.py), null = unlimited
+    max_uses = models.PositiveIntegerField(null=True, blank=True)
+    per_user_limit = models.PositiveIntegerField(null=True, blank=True)
+    # counter row for max_uses, only changed with conditional updates
+    times_redeemed = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -263,6 +537,198 @@ class Promotion(models.Model):
     
 
 
+class PromotionUserUsage(models.Model):
+    """
+    How often a user has redeemed a promotion, the counter row for
+    Promotion.per_user_limit (see cinema/redemptions.py)
+    """
+    usage_id = models.AutoField(primary_key=True)
+    promotion = models.ForeignKey(
+        Promotion,
+        on_delete=models.CASCADE,
+        db_column='promo_id',
+        related_name='user_usage'
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        db_column='user_id',
+        related_name='promotion_usage'
+    )
+    times_redeemed = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'promotion_user_usage'
+        managed = False
+        unique_together = [('promotion', 'user')]
+
+    def __str__(self):
+        return f"{self.user_id} used promotion #{self.promotion_id} {self.times_redeemed}x"
+
+
+class PromotionRedemption(models.Model):
+    """
+    Ledger of promotion redemptions, one row per booking that used a code.
+    Cancelling the booking releases the redemption (released_at) and gives
+    the use back to the promotion and the user.
+    """
+    redemption_id = models.AutoField(primary_key=True)
+    promotion = models.ForeignKey(
+        Promotion,
+        on_delete=models.CASCADE,
+        db_column='promo_id',
+        related_name='redemptions'
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        db_column='user_id',
+        related_name='promotion_redemptions'
+    )
+    booking = models.OneToOneField(
+        'Booking',
+        on_delete=models.SET_NULL,
+        null=True,
+        db_column='booking_id',
+        related_name='promotion_redemption'
+    )
+    redeemed_at = models.DateTimeField(auto_now_add=True)
+    released_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'promotion_redemptions'
+        managed = False
+
+    def __str__(self):
+        return f"Promotion #{self.promotion_id} redeemed by {self.user_id} (booking #{self.booking_id})"
+
+
+class PromotionCampaign(models.Model):
+    """
+    Background send of a promotion email to every subscribed user
+    (see cinema/campaigns.py).
+
+    Recipients are walked in user id order and progress is checkpointed after
+    every chunk (last_user_id and the counters), so a campaign that stops
+    half way is resumed where it left off instead of emailing people twice.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('cancelled', 'Cancelled'),
+        ('failed', 'Failed'),
+    ]
+
+    campaign_id = models.AutoField(primary_key=True)
+    promotion = models.ForeignKey(
+        Promotion,
+        on_delete=models.CASCADE,
+        db_column='promo_id',
+        related_name='campaigns'
+    )
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        db_column='created_by',
+        related_name='+'
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    total_recipients = models.PositiveIntegerField(default=0)
+    sent_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    # checkpoint: every subscriber with a lower or equal user id has been handled
+    last_user_id = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # written at every checkpoint, a running campaign without one for a while has died
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'promotion_campaigns'
+        managed = False
+
+    def __str__(self):
+        return f"Campaign #{self.campaign_id} for {self.promotion_id} ({self.status})"
+
+
+class EmailOutbox(models.Model):
+    """
+    Transactional email waiting to be sent (see cinema/outbox.py).
+
+    Rows are written in the same transaction as the change they announce
+    (registration, password reset, booking, card changes) and sent afterwards
+    by a worker, so a request never waits on SMTP and a failed send is
+    retried with backoff until it goes out or is marked dead.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('dead', 'Dead'),
+    ]
+
+    to_email = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True, default='')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    # when a pending email is due next, also pushed ahead while a worker holds it
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'cinema_email_outbox'
+        managed = True  # django manages this table
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='email_outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"Email #{self.id} to {self.to_email} ({self.status})"
+
+
+class OneTimeCode(models.Model):
+    """
+    Email verification or password reset code (see cinema/one_time_codes.py).
+
+    One row per (email, purpose), found with one index lookup: a new code
+    replaces the previous one. Only an HMAC of the code is stored, and a code
+    is deleted once used, after too many wrong attempts or by
+    purge_one_time_codes once it has expired.
+    """
+    PURPOSE_CHOICES = [
+        ('verify_email', 'Verify email'),
+        ('reset_password', 'Reset password'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='one_time_codes')
+    email = models.EmailField()  # lowercased
+    purpose = models.CharField(max_length=20, choices=PURPOSE_CHOICES)
+    code_hash = models.CharField(max_length=64)
+    attempts = models.PositiveSmallIntegerField(default=0)  # wrong codes entered
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'cinema_one_time_code'
+        managed = True  # django manages this table
+        constraints = [
+            models.UniqueConstraint(fields=['email', 'purpose'], name='one_time_code_email_purpose_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at'], name='one_time_code_expires_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.purpose} code for {self.email}"
+
+
 # uses the existing cinema_address table
 class Address(models.Model):
     # each user has only one address (well at least in this model)
@@ -288,6 +754,8 @@ class PaymentCard(models.Model):
     brand = models.CharField(max_length=20)  # Visa, MasterCard, etc.
     expiration = models.CharField(max_length=7)  # want it in MM/YYYY format
     card_number_enc = models.CharField(max_length=256)
+    # last four digits in plaintext, set with the number, so showing a card needs no decryption
+    last4 = models.CharField(max_length=4, blank=True, default='')
 
     class Meta:
         db_table = 'cinema_paymentcard'  # maps to the cinema_paymentcard table
@@ -297,12 +765,16 @@ class PaymentCard(models.Model):
     def __str__(self):
         return f"{self.brand} - {self.expiration}"
     
+    def get_last4(self):
+        """last four digits, decrypted for cards the last4 backfill couldn't read ('' if unreadable)"""
+        return self.last4 or (self.get_card_number() or '')[-4:]
+
     # just to look cool
     def get_masked_card_number(self):
         """Return masked card number for display"""
-        card_number = self.get_card_number()  # Get the real number
-        if card_number and len(card_number) >= 4:
-            return f"****-****-****-{card_number[-4:]}"  # Show last 4 digits
+        last4 = self.get_last4()
+        if len(last4) == 4:
+            return f"****-****-****-{last4}"  # Show last 4 digits
         return "****-****-****-****"
 
     # check if card is expired
@@ -317,13 +789,12 @@ class PaymentCard(models.Model):
             return True
     
     def set_card_number(self, card_number):
-        """encrypt and store card number"""
+        """encrypt and store card number (and its last four digits)"""
         try:
-            cipher = Fernet(settings.CARD_ENCRYPTION_KEY.encode())
-            encrypted_data = cipher.encrypt(card_number.encode())
-            self.card_number_enc = base64.urlsafe_b64encode(encrypted_data).decode()
+            self.card_number_enc = card_cipher.encrypt(card_number)
         except Exception as e:
             raise ValueError(f"Encryption failed: {str(e)}")
+        self.last4 = card_number[-4:]
 
 
     def get_card_number(self):
@@ -331,8 +802,6 @@ class PaymentCard(models.Model):
         if not self.card_number_enc:
             return None
         try:
-            cipher = Fernet(settings.CARD_ENCRYPTION_KEY.encode())
-            encrypted_data = base64.urlsafe_b64decode(self.card_number_enc.encode())
-            return cipher.decrypt(encrypted_data).decode()
+            return card_cipher.decrypt(self.card_number_enc)
         except Exception:
             return None    
\ No newline at end of file
@@ -0,0 +1,47 @@
+'''
+Booking emails.
+
+Built from the BookingFacade result (or a stored receipt, same keys) so they
+need no extra queries, rendered from the email templates (cinema/emails.py)
+and queued in the transactional outbox (cinema/outbox.py) inside the booking
+transaction: the email exists if and only if the booking does, and the
+request never waits on SMTP.
+'''
+
+from datetime import datetime
+
+from django.conf import settings
+
+from . import emails
+
+
+def _showtime(start_time):
+    '''start times are datetimes in a fresh booking result, ISO strings in a stored receipt'''
+    if isinstance(start_time, str):
+        return datetime.fromisoformat(start_time.replace('Z', '+00:00'))
+    return start_time
+
+
+def queue_booking_confirmation(user, result):
+    '''
+    queue the booking confirmation email, lists every showing of a cart
+    checkout. call inside the booking transaction.
+
+    Returns:
+        EmailOutbox, or None when booking emails are turned off
+    '''
+    if not getattr(settings, 'BOOKING_EMAILS_ENABLED', True) or not user.email:
+        return None
+
+    return emails.queue('booking_confirmation', user.email, {
+        'username': user.username,
+        'booking_id': result['booking_id'],
+        'showings': [
+            {**showing, 'start_time': _showtime(showing['start_time'])}
+            for showing in result['showings']
+        ],
+        'base_price': result['base_price'],
+        'promotion_applied': result.get('promotion_applied'),
+        'discount_display': result.get('discount_display'),
+        'final_price': result['final_price'],
+    })
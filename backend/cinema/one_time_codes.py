@@ -0,0 +1,128 @@
+'''
+Email verification and password reset codes.
+
+Codes used to live on Profile.verification_code (one field for both kinds),
+so verify_email found the user by auth_user.email, which has no index, sorted
+by date_joined, and compared the code in plain text with no limit on wrong
+guesses. They now live in cinema_one_time_code (OneTimeCode), one row per
+(email, purpose):
+
+- issue() stores an HMAC-SHA256 of a new code (keyed with SECRET_KEY) and
+  replaces the previous code of the same email and purpose
+- consume() finds the row with one lookup on the unique (email, purpose)
+  index, compares in constant time and deletes the code once it is used,
+  expired or guessed wrong MAX_ATTEMPTS times
+- purge_one_time_codes deletes expired codes nobody used, in batches on the
+  expires_at index
+'''
+
+import hashlib
+import hmac
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OneTimeCode
+
+VERIFY_EMAIL = 'verify_email'
+RESET_PASSWORD = 'reset_password'
+
+CODE_TTL = getattr(settings, 'ONE_TIME_CODE_TTL', 15 * 60)
+MAX_ATTEMPTS = getattr(settings, 'ONE_TIME_CODE_MAX_ATTEMPTS', 5)
+
+
+class CodeError(Exception):
+    '''
+    a code could not be used.
+
+    reason is 'missing' (none issued, or already used or thrown away),
+    'expired' or 'invalid' (wrong code, counted as an attempt)
+    '''
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def _normalize(email):
+    return (email or '').strip().lower()
+
+
+def _hash(email, purpose, code):
+    message = f'{purpose}:{email}:{code}'.encode()
+    return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+
+def expires_minutes():
+    '''lifetime of a code, for the emails'''
+    return CODE_TTL // 60
+
+
+def issue(user, purpose):
+    '''
+    new 6-digit code for the user's email, replacing the previous one.
+
+    Returns:
+        the code, to be sent; only its hash is stored
+    '''
+    email = _normalize(user.email)
+    code = f'{secrets.randbelow(10 ** 6):06d}'
+    OneTimeCode.objects.update_or_create(
+        email=email,
+        purpose=purpose,
+        defaults={
+            'user': user,
+            'code_hash': _hash(email, purpose, code),
+            'attempts': 0,
+            'expires_at': timezone.now() + timedelta(seconds=CODE_TTL),
+        },
+    )
+    return code
+
+
+def consume(email, purpose, code):
+    '''
+    use a code: it is deleted and can't be used again.
+
+    Call it outside of a transaction that rolls back on failure, the wrong
+    attempt is counted by the failing request itself.
+
+    Returns:
+        id of the user the code was issued to
+
+    Raises:
+        CodeError
+    '''
+    email = _normalize(email)
+    row = OneTimeCode.objects.filter(email=email, purpose=purpose).first()
+    if row is None:
+        raise CodeError('missing')
+
+    if row.expires_at <= timezone.now():
+        row.delete()
+        raise CodeError('expired')
+
+    if not hmac.compare_digest(row.code_hash, _hash(email, purpose, str(code).strip())):
+        # count the attempt, the code is gone after MAX_ATTEMPTS wrong ones
+        counted = (
+            OneTimeCode.objects
+            .filter(pk=row.pk, attempts__lt=MAX_ATTEMPTS - 1)
+            .update(attempts=F('attempts') + 1)
+        )
+        if not counted:
+            OneTimeCode.objects.filter(pk=row.pk).delete()
+        raise CodeError('invalid')
+
+    # only one of two concurrent requests with the right code deletes it
+    deleted, _ = OneTimeCode.objects.filter(pk=row.pk).delete()
+    if not deleted:
+        raise CodeError('missing')
+    return row.user_id
+
+
+def expired():
+    '''codes past their expiry, for purge_one_time_codes'''
+    return OneTimeCode.objects.filter(expires_at__lte=timezone.now())
@@ -0,0 +1,239 @@
+'''
+Transactional email outbox.
+
+Registration, password reset, booking confirmations and card notices used to
+open an SMTP session inside the request, which added seconds to every one of
+those requests and lost the email for good when the send failed. Now the
+request only writes an EmailOutbox row with enqueue_email(), in the same
+transaction as the change it announces: if the change rolls back there is no
+email, if it commits the email is guaranteed to go out eventually.
+
+The outbox is drained by drain():
+
+- due rows are claimed in batches (SELECT ... FOR UPDATE SKIP LOCKED, then
+  next_attempt_at is pushed ahead as a lease), so several workers never send
+  the same email, and one that dies just lets its lease run out
+- a batch is sent over a single SMTP connection (EMAIL_BACKEND), reopened
+  after an error
+- a failed email is retried after EMAIL_OUTBOX_RETRY_DELAY seconds, doubling
+  after every failure (up to EMAIL_OUTBOX_MAX_RETRY_DELAY), and marked dead
+  after EMAIL_OUTBOX_MAX_ATTEMPTS attempts
+
+With EMAIL_OUTBOX_BACKGROUND a thread of the web process drains the outbox
+right after the enqueuing transaction commits, so emails still arrive within
+seconds. The drain_email_outbox command (cron or a long running --loop
+worker) sends whatever that thread didn't: retries, emails of a restarted
+process, or everything when the thread is turned off.
+
+For local development and tests point EMAIL_HOST/EMAIL_PORT at a local SMTP
+stand-in, see the email settings.
+'''
+
+import logging
+import random
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+# emails claimed and sent over one SMTP connection at a time
+BATCH_SIZE = getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 50)
+MAX_ATTEMPTS = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 8)
+RETRY_DELAY = getattr(settings, 'EMAIL_OUTBOX_RETRY_DELAY', 30)
+MAX_RETRY_DELAY = getattr(settings, 'EMAIL_OUTBOX_MAX_RETRY_DELAY', 60 * 60)
+# how long a claimed batch is held before another worker may take it over
+LEASE = getattr(settings, 'EMAIL_OUTBOX_LEASE', 5 * 60)
+# drain from a thread of the web process after commit
+RUN_IN_BACKGROUND = getattr(settings, 'EMAIL_OUTBOX_BACKGROUND', True)
+
+
+def enqueue_email(to_email, subject, body, html_body=''):
+    '''
+    queue an email. call inside the transaction of the change it is about,
+    it is only sent if that transaction commits.
+
+    Returns:
+        EmailOutbox
+    '''
+    email = EmailOutbox.objects.create(
+        to_email=to_email,
+        subject=subject,
+        body=body,
+        html_body=html_body
+    )
+    if RUN_IN_BACKGROUND:
+        transaction.on_commit(_wake_worker)
+    return email
+
+
+def retry_delay(attempts):
+    '''seconds to wait after the given number of failed attempts (with a little jitter)'''
+    delay = min(RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+    return delay + random.uniform(0, delay / 10)
+
+
+def claim_batch(batch_size=None):
+    '''
+    lease a batch of due emails to this worker
+
+    Returns:
+        list of EmailOutbox
+    '''
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')
+            .values_list('id', flat=True)[:batch_size or BATCH_SIZE]
+        )
+        if not ids:
+            return []
+        EmailOutbox.objects.filter(id__in=ids).update(next_attempt_at=now + timedelta(seconds=LEASE))
+    return list(EmailOutbox.objects.filter(id__in=ids).order_by('id'))
+
+
+def send_batch(emails):
+    '''
+    send claimed emails over one SMTP connection and record the outcome
+
+    Returns:
+        (sent, retried, dead)
+    '''
+    sent = retried = dead = 0
+    try:
+        connection = get_connection()
+        connection.open()
+    except Exception as e:
+        # SMTP is down: every claimed email counts as a failed attempt, so it
+        # backs off (and eventually dies) instead of being claimed again
+        # every LEASE
+        logger.error(f"Could not connect to send {len(emails)} outbox emails: {e}")
+        for email in emails:
+            if _failed(email, e):
+                retried += 1
+            else:
+                dead += 1
+        return sent, retried, dead
+
+    try:
+        for email in emails:
+            message = EmailMultiAlternatives(
+                email.subject,
+                email.body,
+                settings.DEFAULT_FROM_EMAIL,
+                [email.to_email],
+                connection=connection
+            )
+            if email.html_body:
+                message.attach_alternative(email.html_body, 'text/html')
+
+            try:
+                message.send()
+            except Exception as e:
+                if _failed(email, e):
+                    retried += 1
+                else:
+                    dead += 1
+                # the server may have dropped us, go on with a fresh connection
+                connection.close()
+                try:
+                    connection.open()
+                except Exception:
+                    # next send opens its own connection (and reports the error)
+                    pass
+                continue
+
+            EmailOutbox.objects.filter(id=email.id).update(
+                status='sent',
+                attempts=F('attempts') + 1,
+                sent_at=timezone.now(),
+                last_error=''
+            )
+            sent += 1
+    finally:
+        connection.close()
+    return sent, retried, dead
+
+
+def _failed(email, error):
+    '''schedule a retry, returns False if the email is dead now'''
+    attempts = email.attempts + 1
+    updates = {'attempts': attempts, 'last_error': str(error)}
+    if attempts >= MAX_ATTEMPTS:
+        updates['status'] = 'dead'
+        logger.error(f"Email #{email.id} to {email.to_email} is dead after {attempts} attempts: {error}")
+    else:
+        updates['next_attempt_at'] = timezone.now() + timedelta(seconds=retry_delay(attempts))
+        logger.warning(f"Email #{email.id} to {email.to_email} failed (attempt {attempts}), will retry: {error}")
+    EmailOutbox.objects.filter(id=email.id).update(**updates)
+    return attempts < MAX_ATTEMPTS
+
+
+def drain(batch_size=None):
+    '''
+    send every email that is due, batch by batch
+
+    Returns:
+        (sent, retried, dead)
+    '''
+    totals = [0, 0, 0]
+    while True:
+        emails = claim_batch(batch_size)
+        if not emails:
+            break
+        for i, count in enumerate(send_batch(emails)):
+            totals[i] += count
+    return tuple(totals)
+
+
+def requeue_dead():
+    '''give dead emails a fresh set of attempts, returns how many'''
+    return EmailOutbox.objects.filter(status='dead').update(
+        status='pending',
+        attempts=0,
+        next_attempt_at=timezone.now()
+    )
+
+
+# background worker of this process, one at a time
+_worker = None
+_worker_lock = threading.Lock()
+_wakeup = threading.Event()
+
+
+def _wake_worker():
+    global _worker
+    with _worker_lock:
+        _wakeup.set()
+        if _worker is None:
+            _worker = threading.Thread(target=_run_worker, name='email-outbox', daemon=True)
+            _worker.start()
+
+
+def _run_worker():
+    global _worker
+    try:
+        while True:
+            _wakeup.clear()
+            try:
+                drain()
+            except Exception as e:
+                # the rows stay pending, drain_email_outbox picks them up
+                logger.error(f"Email outbox worker failed: {e}")
+            with _worker_lock:
+                # emails enqueued while draining get another round
+                if not _wakeup.is_set():
+                    _worker = None
+                    return
+    finally:
+        # the thread has its own database connection
+        connections.close_all()
@@ -0,0 +1,46 @@
+'''
+Pagination classes for list endpoints.
+'''
+
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+
+class BookingHistoryPagination(CursorPagination):
+    """
+    Newest bookings first, paged by an opaque cursor on booking_time.
+
+    Cursor pages stay fast on large histories (no OFFSET, no COUNT) and don't
+    skip or repeat bookings when a new one is made while paging.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 50
+    ordering = ('-booking_time', '-booking_id')
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'bookings': data,
+        })
+
+
+class AdminUserPagination(CursorPagination):
+    """
+    Newest users first, paged by an opaque cursor on the user id.
+
+    A page is an index range on the primary key, no OFFSET and no COUNT, so
+    the last page costs what the first one does with a million users.
+    """
+    page_size = 25
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-id',)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'users': data,
+        })
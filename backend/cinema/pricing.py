@@ -0,0 +1,179 @@
+'''
+Ticket pricing.
+
+Prices come from the ticket_prices table (TicketPrice): a price per age
+category for a showroom (or every showroom) and a time-of-day band (or all
+day). The table is small and read on every booking, preview, receipt and
+refund, so it is compiled once into a PriceMatrix:
+
+    (showroom_id or None, time band, age category) -> Decimal
+
+with every combination already resolved (most specific row wins, standard
+prices when nothing matches), so a lookup is a dict access.
+
+The compiled matrix is shared through the Django cache and kept in process
+memory, both tagged with a version (random id). Admin changes call
+invalidate(), which sets a new version: every process sees it on its next
+lookup and recompiles. Reading the version is the only cache hit per call,
+and a process recompiles at least every PRICING_CACHE_TIMEOUT seconds in
+case the cache is per process.
+
+quote() prices a whole order (any number of tickets, showings and showrooms)
+against one matrix, so an order never mixes two price versions.
+'''
+
+import time
+import uuid
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import TicketPrice
+
+# prices when the table has no row for a category
+STANDARD_PRICES = {
+    'Child': Decimal('8.00'),
+    'Adult': Decimal('12.00'),
+    'Senior': Decimal('10.00'),
+}
+DEFAULT_CATEGORY = 'Adult'
+
+# start hour of each band, a showing belongs to the last band it has passed.
+# the last band runs past midnight until the first one starts (00:30 is late)
+TIME_BANDS = [('matinee', 6), ('evening', 17), ('late', 22)]
+
+# the compiled matrix is re-read from the database at least this often
+MATRIX_CACHE_TIMEOUT = getattr(settings, 'PRICING_CACHE_TIMEOUT', 60 * 60)
+
+VERSION_KEY = 'pricing:version'
+
+# (version, PriceMatrix, compiled at) of this process
+_local = (None, None, 0)
+
+
+def band_hours():
+    '''{band: "06:00 - 17:00"} for the admin screens'''
+    return {
+        name: f"{start_hour:02d}:00 - {TIME_BANDS[(i + 1) % len(TIME_BANDS)][1]:02d}:00"
+        for i, (name, start_hour) in enumerate(TIME_BANDS)
+    }
+
+
+def time_band(start_time):
+    '''time-of-day band of a showing start time (in the site time zone)'''
+    hour = timezone.localtime(start_time).hour if timezone.is_aware(start_time) else start_time.hour
+    # before the first band starts: still the previous night's last band
+    band = TIME_BANDS[-1][0]
+    for name, start_hour in TIME_BANDS:
+        if hour >= start_hour:
+            band = name
+    return band
+
+
+class PriceMatrix:
+    '''
+    fully resolved prices, built by compile() from the TicketPrice rows
+
+    Attributes:
+        version: price version it was compiled for
+        prices: {(showroom_id or None, band, category): Decimal}
+    '''
+
+    def __init__(self, version, prices):
+        self.version = version
+        self.prices = prices
+
+    @classmethod
+    def compile(cls, version, rows):
+        '''
+        Args:
+            rows: (showroom_id, time_band, age_category, price) tuples
+
+        Most specific row wins: showroom + band, showroom + any band,
+        all showrooms + band, all showrooms + any band, standard price.
+        '''
+        table = {(showroom_id, band, category): Decimal(price) for showroom_id, band, category, price in rows}
+        showroom_ids = {None} | {showroom_id for showroom_id, _, _, _ in rows}
+
+        prices = {}
+        for showroom_id in showroom_ids:
+            for band, _ in TIME_BANDS:
+                for category, standard in STANDARD_PRICES.items():
+                    candidates = [
+                        (showroom_id, band, category),
+                        (showroom_id, 'any', category),
+                        (None, band, category),
+                        (None, 'any', category),
+                    ]
+                    prices[(showroom_id, band, category)] = next(
+                        (table[key] for key in candidates if key in table), standard
+                    )
+        return cls(version, prices)
+
+    def price(self, showroom_id, start_time, age_category):
+        '''price of one ticket, unknown categories pay the adult price'''
+        if age_category not in STANDARD_PRICES:
+            age_category = DEFAULT_CATEGORY
+        band = time_band(start_time)
+        price = self.prices.get((showroom_id, band, age_category))
+        if price is None:
+            # showroom without its own prices
+            price = self.prices[(None, band, age_category)]
+        return price
+
+    def quote(self, lines):
+        '''
+        Args:
+            lines: (showroom_id, start_time, age_category) per ticket
+
+        Returns:
+            list of Decimal prices, in the order of lines
+        '''
+        return [self.price(showroom_id, start_time, category) for showroom_id, start_time, category in lines]
+
+
+def _version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # first use or evicted, either way nobody's matrix can be trusted
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def get_matrix():
+    '''the current PriceMatrix: from process memory, the cache or the database'''
+    global _local
+
+    version = _version()
+    local_version, matrix, compiled_at = _local
+    if local_version == version and time.monotonic() - compiled_at < MATRIX_CACHE_TIMEOUT:
+        return matrix
+
+    key = f'pricing:matrix:{version}'
+    prices = cache.get(key)
+    if prices is None:
+        rows = TicketPrice.objects.values_list('showroom_id', 'time_band', 'age_category', 'price')
+        prices = PriceMatrix.compile(version, list(rows)).prices
+        cache.set(key, prices, MATRIX_CACHE_TIMEOUT)
+
+    matrix = PriceMatrix(version, prices)
+    _local = (version, matrix, time.monotonic())
+    return matrix
+
+
+def quote(lines):
+    '''price a whole order against one matrix, see PriceMatrix.quote()'''
+    return get_matrix().quote(lines)
+
+
+def ticket_price(showroom_id, start_time, age_category):
+    '''price of a single ticket'''
+    return get_matrix().price(showroom_id, start_time, age_category)
+
+
+def invalidate():
+    '''call after the ticket_prices table changes'''
+    cache.set(VERSION_KEY, uuid.uuid4().hex, None)
@@ -0,0 +1,81 @@
+'''
+In-memory map of the promotions that are valid today.
+
+Every preview, booking and checkout step resolves the promo code the user
+typed. Instead of querying cinema_promotions each time, PromotionFactory looks
+the code up in a map of today's valid promotions:
+
+    normalized code (stripped, upper case) -> Promotion
+
+The map is kept in process memory and in the Django cache, tagged with a
+version (random id) and the date it was built for. It is rebuilt when an
+admin creates, changes or deletes a promotion (invalidate() sets a new
+version) and when the date rolls over, so promotions start and expire on
+time without anyone touching them.
+
+Codes that are not in the map (unknown, expired or not started yet) fall back
+to one query on the unique promo_code index; codes are stored normalized.
+'''
+
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Promotion
+
+# the map is re-read from the database at least this often
+CACHE_TIMEOUT = getattr(settings, 'PROMOTION_CACHE_TIMEOUT', 10 * 60)
+
+VERSION_KEY = 'promotions:version'
+
+# (version, date, {code: Promotion}, built at) of this process
+_local = (None, None, {}, 0)
+
+
+def normalize_code(promo_code):
+    '''promo codes are matched without surrounding spaces and case-insensitively'''
+    return (promo_code or '').strip().upper()
+
+
+def _version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def active_promotions():
+    '''{normalized code: Promotion} of the promotions valid today'''
+    global _local
+
+    today = timezone.localdate()
+    version = _version()
+    local_version, local_date, promotions, built_at = _local
+    if (local_version, local_date) == (version, today) and time.monotonic() - built_at < CACHE_TIMEOUT:
+        return promotions
+
+    key = f'promotions:active:{version}:{today.isoformat()}'
+    promotions = cache.get(key)
+    if promotions is None:
+        promotions = {
+            normalize_code(promo.promo_code): promo
+            for promo in Promotion.objects.filter(start_date__lte=today, end_date__gte=today)
+        }
+        cache.set(key, promotions, CACHE_TIMEOUT)
+
+    _local = (version, today, promotions, time.monotonic())
+    return promotions
+
+
+def get_active(promo_code):
+    '''the Promotion for a code if it is valid today, else None (no queries once the map is built)'''
+    return active_promotions().get(normalize_code(promo_code))
+
+
+def invalidate():
+    '''call after a promotion is created, changed or deleted'''
+    cache.set(VERSION_KEY, uuid.uuid4().hex, None)
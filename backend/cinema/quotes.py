@@ -0,0 +1,70 @@
+'''
+Signed price quotes shared between booking preview and booking create.
+
+BookingPreviewView validates the order and prices it once, then hands the
+client a short-lived signed token with everything checkout needs (showings,
+seats, categories, prices, promotion and totals). BookingCreateView sends the
+token back and BookingFacade rebuilds its state from it instead of
+re-reading the showing, the seats and the promotion and re-pricing the order.
+
+The token is signed with SECRET_KEY (django.core.signing), so it can't be
+tampered with, and it is bound to the user it was issued for. Seat occupancy
+is still checked at checkout since seats can sell in the meantime.
+'''
+
+from datetime import datetime
+
+from django.conf import settings
+from django.core import signing
+
+QUOTE_SALT = 'cinema.booking-quote'
+
+# seconds a quote stays valid, after that create prices the order again
+QUOTE_MAX_AGE = getattr(settings, 'BOOKING_QUOTE_MAX_AGE', 5 * 60)
+
+
+def issue_quote(user, quote):
+    '''
+    sign a quote for a user
+
+    Args:
+        user: the user the quote was priced for
+        quote: dict produced by BookingFacade.preview()
+
+    Returns:
+        str: compact url-safe token
+    '''
+    return signing.dumps({'u': user.pk, 'q': quote}, salt=QUOTE_SALT, compress=True)
+
+
+def read_quote(token, user):
+    '''
+    verify a quote token
+
+    Returns:
+        dict: the quote, or None if the token is invalid, expired or
+        belongs to someone else
+    '''
+    if not token:
+        return None
+    try:
+        data = signing.loads(token, salt=QUOTE_SALT, max_age=QUOTE_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    if data.get('u') != user.pk:
+        return None
+    return data.get('q')
+
+
+def quoted_showing(info):
+    '''
+    showing entry of a quote ([movie_title, showroom_name, iso start, showroom_id])
+    as a BookingFacade.showings value
+    '''
+    movie_title, showroom_name, start_time, showroom_id = info
+    return {
+        'movie_title': movie_title,
+        'showroom_name': showroom_name,
+        'start_time': datetime.fromisoformat(start_time),
+        'showroom_id': showroom_id,
+    }
@@ -0,0 +1,303 @@
+'''
+Sliding-window rate limits for the auth endpoints.
+
+Login, email verification, forgot password and reset password had no limits,
+so a credential-stuffing burst made us hash a password per request and a
+script could flood someone's inbox with reset emails or guess a 6-digit code.
+AuthRateLimitMiddleware (cinema/middleware.py) checks every POST to those
+endpoints against a few limits per endpoint, keyed by client IP and by the
+username or email in the body, before the request reaches DRF: a limited
+request costs no password hashing and no query.
+
+Each limit is a sliding window counter: the count of the current fixed window
+plus the previous window's count weighted by how much of it still overlaps
+the sliding window. Two counters per key, close to an exact sliding log.
+
+Counters live in a pluggable CounterStore (RATE_LIMIT_STORE):
+
+- CacheCounterStore: the Django cache, shared by every process when the
+  cache is (the default)
+- LocalCounterStore: this process' memory, for a single process or tests
+
+The store also keeps allowed / limited totals per endpoint and key, served
+to admins as metrics (GET /api/admin/metrics/rate-limits/).
+'''
+
+import hashlib
+import json
+import math
+import threading
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.utils.module_loading import import_string
+
+
+@dataclass(frozen=True)
+class Limit:
+    '''at most `limit` requests per `window` seconds for one value of `key` (ip, username or email)'''
+    key: str
+    limit: int
+    window: int
+
+
+# path -> (endpoint name, limits)
+DEFAULT_RATE_LIMITS = {
+    '/api/auth/login/': ('login', [Limit('ip', 20, 60), Limit('username', 5, 60), Limit('username', 20, 60 * 60)]),
+    '/api/admin/login/': ('admin_login', [Limit('ip', 10, 60), Limit('username', 5, 60)]),
+    '/api/auth/verify/': ('verify_email', [Limit('ip', 20, 60), Limit('email', 5, 10 * 60)]),
+    '/api/auth/forgot-password/': ('forgot_password', [Limit('ip', 5, 10 * 60), Limit('email', 3, 60 * 60)]),
+    '/api/auth/reset-password/': ('reset_password', [Limit('ip', 10, 10 * 60), Limit('email', 5, 10 * 60)]),
+}
+
+RATE_LIMITS = getattr(settings, 'RATE_LIMITS', DEFAULT_RATE_LIMITS)
+RATE_LIMIT_ENABLED = getattr(settings, 'RATE_LIMIT_ENABLED', True)
+# number of our own proxies in front of the app that append to X-Forwarded-For,
+# 0 = not behind a proxy, X-Forwarded-For is ignored
+TRUSTED_PROXY_HOPS = getattr(settings, 'RATE_LIMIT_TRUSTED_PROXY_HOPS', 0)
+
+
+class CounterStore:
+    '''where window counters and metrics are kept'''
+
+    def get_many(self, keys):
+        '''{key: count} for the keys that exist'''
+        raise NotImplementedError
+
+    def incr(self, key, timeout):
+        '''add one to a counter that expires after timeout seconds'''
+        raise NotImplementedError
+
+    def incr_metric(self, name):
+        raise NotImplementedError
+
+    def metrics(self):
+        '''{metric name: count}'''
+        raise NotImplementedError
+
+
+class LocalCounterStore(CounterStore):
+    '''counters in this process' memory'''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}  # key -> [count, expires at]
+        self._metrics = {}
+        self._next_purge = 0
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                key: self._counters[key][0]
+                for key in keys
+                if key in self._counters and self._counters[key][1] > now
+            }
+
+    def incr(self, key, timeout):
+        now = time.monotonic()
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is None or counter[1] <= now:
+                self._counters[key] = [1, now + timeout]
+            else:
+                counter[0] += 1
+            if now >= self._next_purge:
+                # drop expired windows once in a while so memory stays bounded
+                self._counters = {k: c for k, c in self._counters.items() if c[1] > now}
+                self._next_purge = now + 60
+
+    def incr_metric(self, name):
+        with self._lock:
+            self._metrics[name] = self._metrics.get(name, 0) + 1
+
+    def metrics(self):
+        with self._lock:
+            return dict(self._metrics)
+
+
+class CacheCounterStore(CounterStore):
+    '''counters in the Django cache, shared when the cache is shared'''
+
+    METRIC_NAMES_KEY = 'ratelimit:metrics'
+
+    def get_many(self, keys):
+        return cache.get_many(keys)
+
+    def incr(self, key, timeout):
+        # add() only creates a missing counter, incr() is atomic on shared caches
+        if not cache.add(key, 1, timeout):
+            try:
+                cache.incr(key)
+            except ValueError:
+                # expired between add() and incr()
+                cache.add(key, 1, timeout)
+
+    def incr_metric(self, name):
+        key = f'ratelimit:metric:{name}'
+        if cache.add(key, 1, None):
+            names = cache.get(self.METRIC_NAMES_KEY, set())
+            cache.set(self.METRIC_NAMES_KEY, names | {name}, None)
+        else:
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.add(key, 1, None)
+
+    def metrics(self):
+        names = sorted(cache.get(self.METRIC_NAMES_KEY, set()))
+        values = cache.get_many([f'ratelimit:metric:{name}' for name in names])
+        return {name: values.get(f'ratelimit:metric:{name}', 0) for name in names}
+
+
+_store = None
+
+
+def get_store():
+    global _store
+    if _store is None:
+        _store = import_string(getattr(settings, 'RATE_LIMIT_STORE', 'cinema.ratelimit.CacheCounterStore'))()
+    return _store
+
+
+@dataclass
+class RateLimitDecision:
+    allowed: bool
+    retry_after: int = 0
+    limit: Limit = None
+
+
+def _digest(value):
+    # keeps cache keys short and free of whatever the client sent
+    return hashlib.sha1(value.encode()).hexdigest()[:20]
+
+
+def _retry_after(previous, current, limit, elapsed):
+    '''seconds until the sliding count drops under the limit'''
+    window = limit.window
+    if current < limit.limit:
+        # wait for enough of the previous window to slide out
+        fraction = 1 - (limit.limit - current) / previous
+        return max(1, math.ceil(fraction * window - elapsed))
+    # wait for the next window, then for enough of this one to slide out
+    return max(1, math.ceil(window - elapsed + (1 - limit.limit / current) * window))
+
+
+def check(endpoint, limits, values, store=None):
+    '''
+    count a request against the limits of an endpoint.
+
+    Args:
+        values: {'ip': ..., 'username': ..., 'email': ...}, limits whose value
+            is missing are skipped
+
+    Returns:
+        RateLimitDecision. Limited requests are not counted.
+    '''
+    store = store or get_store()
+    now = time.time()
+
+    windows = []
+    for limit in limits:
+        value = values.get(limit.key)
+        if not value:
+            continue
+        index, elapsed = divmod(now, limit.window)
+        prefix = f'ratelimit:{endpoint}:{limit.key}:{limit.window}:{_digest(value)}'
+        windows.append((limit, f'{prefix}:{int(index)}', f'{prefix}:{int(index) - 1}', elapsed))
+
+    counts = store.get_many([key for _, current, previous, _ in windows for key in (current, previous)])
+    for limit, current_key, previous_key, elapsed in windows:
+        current = counts.get(current_key, 0)
+        previous = counts.get(previous_key, 0)
+        weight = 1 - elapsed / limit.window
+        if previous * weight + current >= limit.limit:
+            store.incr_metric(f'{endpoint}.{limit.key}.limited')
+            return RateLimitDecision(False, _retry_after(previous, current, limit, elapsed), limit)
+
+    for limit, current_key, _, _ in windows:
+        # kept for two windows, it is the previous window after this one
+        store.incr(current_key, limit.window * 2)
+    store.incr_metric(f'{endpoint}.allowed')
+    return RateLimitDecision(True)
+
+
+def client_ip(request):
+    '''
+    address of the client. behind TRUSTED_PROXY_HOPS proxies it is the
+    address the outermost one saw, counted from the right of X-Forwarded-For:
+    the client can put anything in the header, our proxies only append
+    '''
+    if TRUSTED_PROXY_HOPS:
+        forwarded = [
+            address.strip() for address in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')
+            if address.strip()
+        ]
+        if forwarded:
+            return forwarded[max(len(forwarded) - TRUSTED_PROXY_HOPS, 0)]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def _identifiers(request):
+    '''ip and the username / email of the request body (JSON or form)'''
+    values = {'ip': client_ip(request)}
+    try:
+        if request.content_type == 'application/json':
+            data = json.loads(request.body or b'{}')
+        else:
+            data = request.POST
+    except (ValueError, UnicodeDecodeError):
+        # let the view report the bad request body
+        data = {}
+    if not hasattr(data, 'get'):
+        data = {}
+    for field in ('username', 'email'):
+        value = data.get(field)
+        if isinstance(value, str) and value.strip():
+            values[field] = value.strip().lower()
+    return values
+
+
+def limit_request(request):
+    '''
+    Returns:
+        429 JsonResponse if the request is over a limit of its endpoint, else None
+    '''
+    rule = RATE_LIMITS.get(request.path) if RATE_LIMIT_ENABLED and request.method == 'POST' else None
+    if rule is None:
+        return None
+
+    endpoint, limits = rule
+    decision = check(endpoint, limits, _identifiers(request))
+    if decision.allowed:
+        return None
+
+    response = JsonResponse({
+        'error': 'Too many attempts. Please try again later.',
+        'code': 'RATE_LIMITED',
+        'retry_after_seconds': decision.retry_after,
+    }, status=429)
+    response['Retry-After'] = str(decision.retry_after)
+    return response
+
+
+def metrics():
+    '''counters and configured limits, for the admin metrics endpoint'''
+    counters = get_store().metrics()
+    endpoints = {}
+    for endpoint, limits in RATE_LIMITS.values():
+        endpoints[endpoint] = {
+            'allowed': counters.get(f'{endpoint}.allowed', 0),
+            'limited': {
+                key: counters.get(f'{endpoint}.{key}.limited', 0)
+                for key in dict.fromkeys(limit.key for limit in limits)
+            },
+            'limits': [
+                {'key': limit.key, 'limit': limit.limit, 'window_seconds': limit.window}
+                for limit in limits
+            ],
+        }
+    return {'store': type(get_store()).__name__, 'endpoints': endpoints}
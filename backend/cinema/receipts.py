@@ -0,0 +1,162 @@
+'''
+Booking receipts (BookingReceipt, booking_receipts table).
+
+A booking doesn't change after it is sold, so BookingFacade stores what it
+returned to the customer as a JSON snapshot in the same transaction. Booking
+detail, the confirmation page and the confirmation email are served from it
+with one primary-key read, and the receipt keeps the movie title and prices
+the customer actually paid even if those are edited later.
+
+The receipt itself is never rewritten. A bulk cancel/move (cinema/bulk_changes.py)
+appends an amendment instead (what changed, refund, new seats), so the original
+prices, discount and payment stay on record.
+
+Bookings made before the table existed never had a receipt; get_receipt()
+builds one from the tickets on first read.
+'''
+
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from . import pricing
+from .models import Booking, BookingReceipt, Ticket
+
+
+def _snapshot(result):
+    '''
+    JSON-ready copy of a BookingFacade result. the full card number of a
+    new card never goes into the receipt
+    '''
+    receipt = json.loads(json.dumps(result, cls=DjangoJSONEncoder))
+    if receipt.get('payment'):
+        receipt['payment'].pop('card_number', None)
+    return receipt
+
+
+def save_receipt(booking, result):
+    '''store the BookingFacade result of a new booking, returns the snapshot'''
+    receipt = _snapshot(result)
+    BookingReceipt(booking=booking, user_id=booking.user_id, receipt=receipt).save(force_insert=True)
+    return receipt
+
+
+def _stored(booking):
+    '''
+    the BookingReceipt of a booking, built from its tickets if it has none.
+    get_or_create, so two first reads of the same booking don't collide
+    '''
+    stored, _ = BookingReceipt.objects.get_or_create(
+        booking=booking,
+        defaults={'user_id': booking.user_id, 'receipt': _snapshot(build_receipt(booking))}
+    )
+    return stored
+
+
+def get_receipt(booking_id, user):
+    '''
+    the receipt of one of the user's bookings, with its amendments
+
+    Raises:
+        Booking.DoesNotExist: unknown booking or another user's booking
+    '''
+    row = BookingReceipt.objects.filter(
+        booking_id=booking_id, user=user
+    ).values_list('receipt', 'amendments').first()
+    if row is None:
+        booking = Booking.objects.select_related('user').get(booking_id=booking_id, user=user)
+        stored = _stored(booking)
+        row = (stored.receipt, stored.amendments)
+
+    receipt, amendments = row
+    return dict(receipt, amendments=amendments)
+
+
+def amend_receipts(amendments):
+    '''
+    append a change made after the sale to the receipts of these bookings.
+    call it before the tickets change: bookings without a receipt get one
+    from their tickets as they were sold
+
+    Args:
+        amendments: {booking_id: dict describing the change}
+    '''
+    if not amendments:
+        return
+
+    receipts = BookingReceipt.objects.select_for_update().in_bulk(list(amendments))
+    missing = set(amendments) - set(receipts)
+    for booking in Booking.objects.select_related('user').filter(booking_id__in=missing):
+        receipts[booking.booking_id] = _stored(booking)
+
+    amended_at = timezone.now()
+    for booking_id, amendment in amendments.items():
+        receipts[booking_id].amendments = receipts[booking_id].amendments + [
+            _snapshot(dict(amendment, amended_at=amended_at))
+        ]
+    BookingReceipt.objects.bulk_update(
+        [receipts[booking_id] for booking_id in amendments], ['amendments']
+    )
+
+
+def build_receipt(booking):
+    '''
+    receipt for a booking without a snapshot, from its tickets as they are now.
+    same keys as the BookingFacade result (minus payment, which isn't stored)
+    '''
+    showings = {}
+    tickets = []
+    rows = Ticket.objects.filter(booking_id=booking.booking_id).order_by('ticket_id').values_list(
+        'showing_id', 'seat_id', 'seat__row_label', 'seat__seat_number', 'age_category',
+        'showing__showroom_id', 'showing__movie__movie_title', 'showing__showroom__showroom_name', 'showing__start_time'
+    )
+    rows = list(rows)
+    prices = pricing.quote(
+        (showroom_id, start_time, age_category)
+        for _, _, _, _, age_category, showroom_id, _, _, start_time in rows
+    )
+    for row, price in zip(rows, prices):
+        showing_id, seat_id, row_label, seat_number, age_category, _, movie_title, showroom_name, start_time = row
+        price = round(float(price), 2)
+        showing = showings.setdefault(showing_id, {
+            'showing_id': showing_id,
+            'movie_title': movie_title,
+            'showroom_name': showroom_name,
+            'start_time': start_time,
+            'seats': [],
+        })
+        showing['seats'].append({
+            'seat_display': f"{row_label}{seat_number}",
+            'age_category': age_category,
+            'price': f"${price:.2f}",
+        })
+        tickets.append({
+            'showing_id': showing_id,
+            'seat_id': seat_id,
+            'seat_display': f"{row_label}{seat_number}",
+            'age_category': age_category,
+            'price': price,
+        })
+
+    showings = sorted(showings.values(), key=lambda showing: showing['start_time'])
+    first = showings[0] if showings else {'movie_title': None, 'showroom_name': None, 'start_time': None, 'seats': []}
+    base_price = sum(ticket['price'] for ticket in tickets)
+
+    return {
+        'booking_id': booking.booking_id,
+        'user_email': booking.user.email,
+        'movie_title': first['movie_title'],
+        'showroom_name': first['showroom_name'],
+        'start_time': first['start_time'],
+        'seats': first['seats'],
+        'showings': showings,
+        'base_price': f"${base_price:.2f}",
+        'promotion_applied': booking.promo_code or None,
+        'discount_display': None,
+        'final_price': f"${booking.total_price:.2f}",
+        'payment': None,
+        'booking_time': booking.booking_time,
+        'tickets': tickets,
+        'total_price': round(float(booking.total_price), 2),
+    }
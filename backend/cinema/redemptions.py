@@ -0,0 +1,108 @@
+'''
+Promotion redemption limits.
+
+A promotion can be capped overall (Promotion.max_uses) and per user
+(Promotion.per_user_limit). Both are enforced inside the booking transaction
+with conditional UPDATEs on counter rows:
+
+    UPDATE cinema_promotions SET times_redeemed = times_redeemed + 1
+    WHERE promo_id = %s AND times_redeemed < max_uses
+
+The UPDATE either takes a use or changes no row, and the database serializes
+concurrent UPDATEs of the same row, so a code shared on social media can't be
+redeemed more than max_uses times no matter how many checkouts race for it.
+No COUNT over the ledger is needed.
+
+Every redemption also gets a ledger row (PromotionRedemption) tied to its
+booking. Cancelling the booking releases the redemption and gives the use back.
+'''
+
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework import serializers
+
+from .models import Promotion, PromotionRedemption, PromotionUserUsage
+
+
+def redeem(promotion, user):
+    '''
+    take one use of the promotion for the user. call inside the booking
+    transaction, the uses are given back if it rolls back.
+
+    Raises:
+        serializers.ValidationError: the promotion or the user's allowance is used up
+    '''
+    promotions = Promotion.objects.filter(pk=promotion.pk)
+    if promotion.max_uses is not None:
+        promotions = promotions.filter(times_redeemed__lt=F('max_uses'))
+    if not promotions.update(times_redeemed=F('times_redeemed') + 1):
+        raise serializers.ValidationError(
+            f"Promotion {promotion.promo_code} has reached its maximum number of uses"
+        )
+
+    # counted even without a limit, so a limit added later sees earlier uses
+    usage = PromotionUserUsage.objects.filter(promotion=promotion, user=user)
+    if promotion.per_user_limit is not None:
+        usage = usage.filter(times_redeemed__lt=promotion.per_user_limit)
+    if usage.update(times_redeemed=F('times_redeemed') + 1):
+        return
+
+    # no row changed: the user's first redemption, or the allowance is used up
+    if promotion.per_user_limit != 0:
+        try:
+            with transaction.atomic():
+                PromotionUserUsage.objects.create(promotion=promotion, user=user, times_redeemed=1)
+            return
+        except IntegrityError:
+            # the row exists, or a concurrent first redemption just created it
+            if usage.update(times_redeemed=F('times_redeemed') + 1):
+                return
+
+    raise serializers.ValidationError(
+        f"You have already used promotion {promotion.promo_code} "
+        f"the maximum number of times ({promotion.per_user_limit})"
+    )
+
+
+def record(promotion, user, booking):
+    '''ledger row for a redemption taken with redeem()'''
+    PromotionRedemption.objects.create(promotion=promotion, user=user, booking=booking)
+
+
+def release(booking_ids):
+    '''
+    give back the uses of these bookings' redemptions (booking cancelled).
+    call before the bookings are deleted, in the same transaction.
+
+    Returns:
+        int: number of redemptions released
+    '''
+    redemptions = list(
+        PromotionRedemption.objects.select_for_update().filter(
+            booking_id__in=list(booking_ids), released_at__isnull=True
+        ).values_list('redemption_id', 'promotion_id', 'user_id')
+    )
+    if not redemptions:
+        return 0
+
+    # one UPDATE per promotion and per (promotion, user), not per redemption
+    by_promotion = Counter(promotion_id for _, promotion_id, _ in redemptions)
+    for promotion_id, uses in by_promotion.items():
+        Promotion.objects.filter(pk=promotion_id, times_redeemed__gte=uses).update(
+            times_redeemed=F('times_redeemed') - uses
+        )
+
+    by_user = Counter((promotion_id, user_id) for _, promotion_id, user_id in redemptions)
+    for (promotion_id, user_id), uses in by_user.items():
+        PromotionUserUsage.objects.filter(
+            promotion_id=promotion_id, user_id=user_id, times_redeemed__gte=uses
+        ).update(times_redeemed=F('times_redeemed') - uses)
+
+    PromotionRedemption.objects.filter(
+        redemption_id__in=[redemption_id for redemption_id, _, _ in redemptions]
+    ).update(released_at=timezone.now())
+
+    return len(redemptions)
@@ -0,0 +1,155 @@
+'''
+Refresh token blacklist with a Bloom filter in front.
+
+With ROTATE_REFRESH_TOKENS and BLACKLIST_AFTER_ROTATION every refresh
+blacklists the old token, so the token_blacklist tables grow with every
+login and refresh, and every refresh (and logout) first checks the blacklist
+with a query. Almost every token checked is not blacklisted.
+
+Each process keeps a Bloom filter of the jti of every blacklisted token that
+hasn't expired yet. A jti that is not in the filter is definitely not
+blacklisted and needs no query; a jti that is (blacklisted, or one false
+positive in 1 / BLOOM_ERROR_RATE) is checked in the database as before.
+
+- the filter is built from the database on first use in a process, and every
+  SYNC_INTERVAL seconds the rows blacklisted since (ids above the highest one
+  it has loaded) are added with one query on the primary key
+- BloomRefreshToken.blacklist() adds the jti to this process' filter and, once
+  the transaction commits, marks it in the Django cache for a little longer
+  than SYNC_INTERVAL, so the other processes see it before their next sync
+  (a cache read next to the filter lookup, no query)
+- a filter that has taken more tokens than it was sized for is rebuilt
+
+The prune_token_blacklist command deletes expired tokens so the tables (and
+the filter, on its next rebuild) stay the size of the tokens still alive.
+'''
+
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+ERROR_RATE = getattr(settings, 'TOKEN_BLACKLIST_BLOOM_ERROR_RATE', 0.001)
+SYNC_INTERVAL = getattr(settings, 'TOKEN_BLACKLIST_SYNC_INTERVAL', 30)
+# smallest filter, so a new site doesn't rebuild on every logout
+MIN_CAPACITY = 10000
+# a sync re-reads this many ids below the last one it loaded: a blacklist row
+# can commit after rows with higher ids (re-adding a token changes nothing)
+SYNC_OVERLAP = 1000
+
+
+def _recent_key(jti):
+    return f'token_blacklist:recent:{jti}'
+
+
+class BloomFilter:
+    '''fixed size Bloom filter of strings'''
+
+    def __init__(self, capacity, error_rate=ERROR_RATE):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, value):
+        if value in self:
+            return
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+    @property
+    def full(self):
+        return self.count > self.capacity
+
+
+# filter of this process and how far it is synced
+_lock = threading.Lock()
+_filter = None
+_loaded_id = 0
+_synced_at = 0
+
+
+def _blacklisted_since(last_id):
+    '''(id, jti) of live blacklisted tokens with a higher id'''
+    return (
+        BlacklistedToken.objects
+        .filter(id__gt=last_id, token__expires_at__gt=timezone.now())
+        .order_by('id')
+        .values_list('id', 'token__jti')
+        .iterator(chunk_size=5000)
+    )
+
+
+def _rebuild():
+    global _filter, _loaded_id, _synced_at
+    live = BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now()).count()
+    bloom = BloomFilter(max(MIN_CAPACITY, live * 2))
+    loaded_id = 0
+    for blacklisted_id, jti in _blacklisted_since(0):
+        bloom.add(jti)
+        loaded_id = blacklisted_id
+    _filter, _loaded_id, _synced_at = bloom, loaded_id, time.monotonic()
+
+
+def _sync():
+    '''build the filter or add what was blacklisted since the last sync, if it's time'''
+    global _loaded_id, _synced_at
+    if _filter is not None and time.monotonic() - _synced_at < SYNC_INTERVAL:
+        return
+
+    with _lock:
+        if _filter is None or _filter.full:
+            _rebuild()
+            return
+        if time.monotonic() - _synced_at < SYNC_INTERVAL:
+            return
+        for blacklisted_id, jti in _blacklisted_since(max(0, _loaded_id - SYNC_OVERLAP)):
+            _filter.add(jti)
+            _loaded_id = max(_loaded_id, blacklisted_id)
+        _synced_at = time.monotonic()
+
+
+def might_be_blacklisted(jti):
+    '''False: definitely not blacklisted. True: check the database'''
+    _sync()
+    return jti in _filter or cache.get(_recent_key(jti)) is not None
+
+
+def added(jti):
+    '''a token was blacklisted: add it here now and tell the other processes after commit'''
+    _sync()
+    with _lock:
+        _filter.add(jti)
+    transaction.on_commit(lambda: cache.set(_recent_key(jti), True, SYNC_INTERVAL * 2 + 60))
+
+
+class BloomRefreshToken(RefreshToken):
+    '''RefreshToken that only queries the blacklist for tokens the Bloom filter may contain'''
+
+    def check_blacklist(self):
+        if might_be_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            super().check_blacklist()
+
+    def blacklist(self):
+        result = super().blacklist()
+        added(self.payload[api_settings.JTI_CLAIM])
+        return result
@@ -1,15 +1,26 @@
 #takes an object from the database (eg Movie) and converts it to JSON for API responses
 #or, takes info from frontend (password= serializers...), validates fields, then creates/updates database objects
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
 from django.contrib.auth.models import User
-from datetime import timedelta
+from datetime import datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
 from django.utils import timezone
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Lower
 import logging
 from .models import (
     Profile, Movie, Promotion, PaymentCard, Address, Genre, MovieGenre, 
-    Showing, Showroom, Seat, Booking, Ticket
+    Showing, Showroom, Seat, Booking, Ticket, ShowingAdmission, SeatReservation,
+    CheckoutSession, BookingSummary, TicketPrice, PromotionCampaign
 )
+from . import pricing, promotion_cache, redemptions
+from .promotion_cache import normalize_code
+from .quotes import read_quote, quoted_showing
+from .receipts import save_receipt
+from .revocation import BloomRefreshToken
+from .notifications import queue_booking_confirmation
+from .summaries import build_summary, rebuild_for_showings
 
 # --- Movie Serializer ---
 # Handles Movie model serialization (for display or creation)
@@ -118,31 +129,40 @@ class MovieSerializer(serializers.ModelSerializer):
         return value
     
     def validate_genres(self, value):
-        """Validate that at least one genre is provided"""
+        """
+        Validate that at least one genre is provided and that they all exist.
+        The names are resolved with one query; returns the Genre objects,
+        in the order given and without repeats.
+        """
         if not value or len(value) == 0:
             raise serializers.ValidationError("At least one genre is required")
         
-        # Check that all genres exist in the database
-        for genre_name in value:
-            if not Genre.objects.filter(genre_name__iexact=genre_name).exists():
+        # Look all names up at once (case-insensitive, like the names on the site)
+        wanted = [genre_name.strip().lower() for genre_name in value]
+        genres_by_name = {
+            genre.name_lower: genre
+            for genre in Genre.objects.annotate(name_lower=Lower('genre_name')).filter(name_lower__in=set(wanted))
+        }
+        
+        for genre_name, name_lower in zip(value, wanted):
+            if name_lower not in genres_by_name:
                 raise serializers.ValidationError(
                     f"Genre '{genre_name}' does not exist. Please use valid genre names."
                 )
         
-        return value
+        return list({name_lower: genres_by_name[name_lower] for name_lower in wanted}.values())
     
     def create(self, validated_data):
         """Create movie with genres"""
-        # Extract genres from validated data
+        # Extract genres from validated data (Genre objects, see validate_genres)
         genres = validated_data.pop('genres', [])
         
-        # Create the movie
-        movie = Movie.objects.create(**validated_data)
-        
-        # Add genres to the movie
-        for genre_name in genres:
-            genre = Genre.objects.get(genre_name__iexact=genre_name)
-            MovieGenre.objects.create(movie=movie, genre=genre)
+        with transaction.atomic():
+            # Create the movie
+            movie = Movie.objects.create(**validated_data)
+            
+            # Add genres to the movie in one insert
+            MovieGenre.objects.bulk_create([MovieGenre(movie=movie, genre=genre) for genre in genres])
         
         return movie
     
@@ -151,20 +171,30 @@ class MovieSerializer(serializers.ModelSerializer):
         # Extract genres if provided
         genres = validated_data.pop('genres', None)
         
-        # Update movie fields
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
-        
-        # Update genres if provided
-        if genres is not None:
-            # Remove existing genre associations
-            MovieGenre.objects.filter(movie=instance).delete()
+        with transaction.atomic():
+            title_changed = validated_data.get('movie_title', instance.movie_title) != instance.movie_title
+
+            # Update movie fields
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            instance.save()
+
+            # order history shows the title (booking_summaries)
+            if title_changed:
+                rebuild_for_showings(
+                    Showing.objects.filter(movie=instance).values_list('showing_id', flat=True)
+                )
             
-            # Add new genres
-            for genre_name in genres:
-                genre = Genre.objects.get(genre_name__iexact=genre_name)
-                MovieGenre.objects.create(movie=instance, genre=genre)
+            # Update genres if provided: only the associations that change are written
+            if genres is not None:
+                current = set(MovieGenre.objects.filter(movie=instance).values_list('genre_id', flat=True))
+                wanted = {genre.genre_id for genre in genres}
+                
+                if current - wanted:
+                    MovieGenre.objects.filter(movie=instance, genre_id__in=current - wanted).delete()
+                MovieGenre.objects.bulk_create([
+                    MovieGenre(movie=instance, genre=genre) for genre in genres if genre.genre_id not in current
+                ])
         
         return instance
     
@@ -292,17 +322,114 @@ class ShowingSerializer(serializers.ModelSerializer):
         movie_id = validated_data.pop('movie_id', None)
         showroom_id = validated_data.pop('showroom_id', None)
         
-        if movie_id:
-            instance.movie = Movie.objects.get(movie_id=movie_id)
-        if showroom_id:
-            instance.showroom = Showroom.objects.get(showroom_id=showroom_id)
-        
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
+        # what the order history shows of the showing (booking_summaries)
+        summary_changed = (
+            (movie_id and movie_id != instance.movie_id)
+            or (showroom_id and showroom_id != instance.showroom_id)
+            or validated_data.get('start_time', instance.start_time) != instance.start_time
+        )
         
-        instance.save()
+        with transaction.atomic():
+            if movie_id:
+                instance.movie = Movie.objects.get(movie_id=movie_id)
+            if showroom_id:
+                instance.showroom = Showroom.objects.get(showroom_id=showroom_id)
+            
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            
+            instance.save()
+            
+            if summary_changed:
+                rebuild_for_showings([instance.showing_id])
         return instance
 
+class ShowingAdmissionSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the per-showing waiting room settings (admin only)
+    """
+    showing_id = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = ShowingAdmission
+        fields = [
+            'showing_id',
+            'enabled',
+            'admits_per_minute',
+            'burst',
+            'pass_ttl_minutes',
+            'updated_at'
+        ]
+        read_only_fields = ['updated_at']
+
+    def validate_admits_per_minute(self, value):
+        """Admission rate must let at least one user in per minute"""
+        if value < 1:
+            raise serializers.ValidationError("admits_per_minute must be at least 1")
+        return value
+
+    def validate_burst(self, value):
+        """Bucket must hold at least one user"""
+        if value < 1:
+            raise serializers.ValidationError("burst must be at least 1")
+        return value
+
+    def validate_pass_ttl_minutes(self, value):
+        """Admission pass must last at least a minute"""
+        if value < 1:
+            raise serializers.ValidationError("pass_ttl_minutes must be at least 1")
+        return value
+
+class TicketPriceSerializer(serializers.ModelSerializer):
+    """
+    Serializer for rows of the ticket price table (admin only).
+    showroom_id null = every showroom, time_band 'any' = all day
+    """
+    showroom_id = serializers.PrimaryKeyRelatedField(
+        source='showroom',
+        queryset=Showroom.objects.all(),
+        allow_null=True,
+        required=False
+    )
+    showroom_name = serializers.CharField(source='showroom.showroom_name', read_only=True, default=None)
+
+    class Meta:
+        model = TicketPrice
+        fields = [
+            'price_id',
+            'showroom_id',
+            'showroom_name',
+            'time_band',
+            'age_category',
+            'price',
+            'updated_at'
+        ]
+        read_only_fields = ['price_id', 'updated_at']
+
+    def validate_price(self, value):
+        """Tickets can be free but not negative"""
+        if value < 0:
+            raise serializers.ValidationError("price cannot be negative")
+        return value
+
+    def validate(self, data):
+        """One price per showroom, time band and age category"""
+        showroom = data.get('showroom', getattr(self.instance, 'showroom', None))
+        time_band = data.get('time_band', getattr(self.instance, 'time_band', 'any'))
+        age_category = data.get('age_category', getattr(self.instance, 'age_category', None))
+
+        # checked here, MySQL doesn't enforce the unique key when showroom_id is NULL
+        existing = TicketPrice.objects.filter(
+            showroom=showroom, time_band=time_band, age_category=age_category
+        )
+        if self.instance:
+            existing = existing.exclude(pk=self.instance.pk)
+        if existing.exists():
+            raise serializers.ValidationError(
+                "A price for this showroom, time band and age category already exists"
+            )
+        return data
+
 # --- Promotion Serializer ---
 # handles promotion data with discount_type and discount_value fields
 
@@ -310,8 +437,11 @@ class PromotionSerializer(serializers.ModelSerializer):
     """serializer for promotions using discount_type and discount_value"""
     class Meta:
         model = Promotion
-        fields = ['promo_id', 'promo_code', 'discount_type', 'discount_value', 'start_date', 'end_date', 'created_at']
-        read_only_fields = ['promo_id', 'created_at']
+        fields = [
+            'promo_id', 'promo_code', 'discount_type', 'discount_value', 'start_date', 'end_date',
+            'max_uses', 'per_user_limit', 'times_redeemed', 'created_at'
+        ]
+        read_only_fields = ['promo_id', 'times_redeemed', 'created_at']
 
     def validate_promo_code(self, value):
         """make sure promo code is unique and formatted correctly"""
@@ -327,13 +457,25 @@ class PromotionSerializer(serializers.ModelSerializer):
         if not re.match(r'^[A-Z0-9_-]+$', value):
             raise serializers.ValidationError("promo code can only contain letters, numbers, hyphens, and underscores")
         
-        if Promotion.objects.filter(promo_code__iexact=value).exists():
+        if Promotion.objects.filter(promo_code=value).exists():
             if self.instance and self.instance.promo_code.upper() == value:
                 return value
             raise serializers.ValidationError("a promotion with this code already exists")
         
         return value
     
+    def validate_max_uses(self, value):
+        """null = unlimited, otherwise at least one use"""
+        if value is not None and value < 1:
+            raise serializers.ValidationError("max uses must be at least 1 (leave empty for unlimited)")
+        return value
+
+    def validate_per_user_limit(self, value):
+        """null = unlimited, otherwise at least one use per user"""
+        if value is not None and value < 1:
+            raise serializers.ValidationError("per user limit must be at least 1 (leave empty for unlimited)")
+        return value
+
     def validate_discount_type(self, value):
         """check discount type is either percentage or fixed"""
         if not value:
@@ -391,6 +533,44 @@ class PromotionSerializer(serializers.ModelSerializer):
         
         return data
 
+
+class PromotionCampaignSerializer(serializers.ModelSerializer):
+    """
+    Status and progress of a promotion email campaign (admin only)
+    """
+    promo_code = serializers.CharField(source='promotion.promo_code', read_only=True)
+    processed = serializers.SerializerMethodField()
+    percent_complete = serializers.SerializerMethodField()
+
+    class Meta:
+        model = PromotionCampaign
+        fields = [
+            'campaign_id',
+            'promo_code',
+            'status',
+            'total_recipients',
+            'sent_count',
+            'failed_count',
+            'processed',
+            'percent_complete',
+            'last_error',
+            'created_at',
+            'started_at',
+            'heartbeat_at',
+            'finished_at'
+        ]
+        read_only_fields = fields
+
+    def get_processed(self, obj):
+        """recipients handled so far, sent or failed"""
+        return obj.sent_count + obj.failed_count
+
+    def get_percent_complete(self, obj):
+        """subscribers can join while it runs, so it is capped at 100"""
+        if obj.status == 'completed' or not obj.total_recipients:
+            return 100.0 if obj.status == 'completed' else 0.0
+        return min(round(100.0 * self.get_processed(obj) / obj.total_recipients, 1), 100.0)
+
 # --- User Registration Serializer ---
 # Creates new users and associated profiles
 
@@ -418,22 +598,23 @@ class RegisterSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Phone number must have at least 10 digits")
         return value
 
-# Creates user and inactive profile (activated later)
+# Creates inactive user, profile and address (activated later)
+    # savepoint=False: runs inside RegisterView's transaction without a savepoint
+    @transaction.atomic(savepoint=False)
     def create(self, validated_data):
         subscribed = validated_data.pop("subscribed", False)
         phone = validated_data.pop("phone")
-        #create user (in auth_user table)
-        user = User.objects.create_user(**validated_data)
+        #create user (in auth_user table), inactive until the email is verified
+        user = User.objects.create_user(**validated_data, is_active=False)
         #create associated profile (in cinema_profile table)
-        Profile.objects.create(user=user, phone=phone, subscribed=subscribed, status="Inactive")
-        #creates empty address for the user
-        Address.objects.create(
+        Profile.objects.create(
             user=user,
-            street="",
-            city="",
-            state="",
-            zip_code=""
+            phone=phone,
+            subscribed=subscribed,
+            status="Inactive",
         )
+        #creates empty address for the user
+        Address.objects.create(user=user)
         return user
     
 # --- Admin Registration Serializer ---
@@ -463,6 +644,13 @@ class LoginSerializer(serializers.Serializer):
     password = serializers.CharField(write_only=True)
     remember_me = serializers.BooleanField(required=False, default=False)
 
+# --- Token Refresh Serializer ---
+# simplejwt's refresh (rotation + blacklisting) with the Bloom filter in front
+# of the blacklist (see cinema/revocation.py)
+
+class BloomTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = BloomRefreshToken
+
 # --- Profile Serializer ---
 # Serializes user profile details
 
@@ -593,10 +781,10 @@ class PaymentCardSerializer(serializers.ModelSerializer):
         # add user from request context
         validated_data['user'] = self.context['request'].user
     
-        # create card with other fields (user, brand, expiration)
-        card = PaymentCard.objects.create(**validated_data)
+        # card with other fields (user, brand, expiration)
+        card = PaymentCard(**validated_data)
     
-        # uses the model method to set encrypted card number
+        # uses the model method to set encrypted card number and last4, then one insert
         card.set_card_number(card_number)
         card.save()
     
@@ -625,6 +813,33 @@ class UserDetailSerializer(serializers.ModelSerializer):
         fields = ["username", "email", "first_name", "last_name", "phone", "subscribed", "status"]
 
 
+# --- Admin User Serializer ---
+# One row of the admin user list (read-only)
+
+class AdminUserSerializer(serializers.ModelSerializer):
+    """
+    User with profile fields and booking totals, for GET /api/admin/users/.
+
+    booking_count and lifetime_spend are set on each user by the view, from
+    one grouped query over the users of the page.
+    """
+    phone = serializers.CharField(source='profile.phone', default='', read_only=True)
+    subscribed = serializers.BooleanField(source='profile.subscribed', default=False, read_only=True)
+    booking_count = serializers.IntegerField(default=0, read_only=True)
+    lifetime_spend = serializers.DecimalField(
+        max_digits=12, decimal_places=2, default=Decimal('0.00'), read_only=True
+    )
+
+    class Meta:
+        model = User
+        fields = [
+            'id', 'username', 'email', 'first_name', 'last_name',
+            'is_active', 'is_staff', 'date_joined', 'last_login',
+            'phone', 'subscribed', 'booking_count', 'lifetime_spend',
+        ]
+        read_only_fields = fields
+
+
 # --- User Portal Serializers ---
 
 class SeatSerializer(serializers.ModelSerializer):
@@ -874,20 +1089,11 @@ class TicketSerializer(serializers.ModelSerializer):
 
     def get_price(self, obj):
         '''
-        calculate ticket price based on age category.
-
-        Pricing:
-        - Child: $8.00
-        - Adult: $12.00
-        - Senior: $10.00
+        ticket price from the price table (cinema/pricing.py) for the
+        ticket's showroom, showtime and age category
         '''
-        pricing = {
-            'Child': 8.00,
-            'Adult': 12.00,
-            'Senior': 10.00
-        }
-        # default to Adult price if category not found
-        return pricing.get(obj.age_category, 12.00)
+        price = pricing.ticket_price(obj.showing.showroom_id, obj.showing.start_time, obj.age_category)
+        return float(price)
     
 class BookingCreateSerializer(serializers.Serializer):
     '''
@@ -904,6 +1110,7 @@ class BookingCreateSerializer(serializers.Serializer):
             {"seat_id": 7, "age_category": "Senior"}
         ],
         "promo_code": "SUMMER20",  # Optional
+        "quote_token": "...",  # Optional, from the booking preview
         "payment_card_id": 3,  # Use saved card
         # OR provide new card:
         "card_number": "4532123456789012",
@@ -923,6 +1130,9 @@ class BookingCreateSerializer(serializers.Serializer):
     # optional promotion code
     promo_code = serializers.CharField(required=False, allow_blank=True)
 
+    # optional quote_token from bookings/preview/, skips re-pricing the order
+    quote_token = serializers.CharField(required=False, allow_blank=True)
+
     # payment: either saved card OR new card info
     payment_card_id = serializers.IntegerField(required=False)
     card_number = serializers.CharField(required=False, max_length=19)
@@ -986,8 +1196,37 @@ class BookingCreateSerializer(serializers.Serializer):
         showing_id = validated_data['showing_id']
         seats_data = validated_data['seats']
         promo_code = validated_data.get('promo_code', '').strip()
+        
+        # use Facade to process the entire booking
+        facade = BookingFacade(
+            user=user,
+            showing_id=showing_id,
+            seats_data=seats_data,
+            promo_code=promo_code if promo_code else None,
+            payment_info=self.get_payment_info(validated_data),
+            quote=self.get_quote(validated_data, user)
+        )
+        
+        # process booking and return result
+        # the Facade handles all validation, calculation, and creation
+        return facade.process_booking()
+
+    def get_quote(self, validated_data, user):
+        """
+        verified quote from the preview, or None to price the order again.
+        an expired/invalid token or a different promo code just means the
+        booking is priced from scratch
+        """
+        quote = read_quote(validated_data.get('quote_token'), user)
+        if quote is None:
+            return None
+        # quotes carry the stored (normalized) code
+        if normalize_code(quote['promo_code']) != normalize_code(validated_data.get('promo_code')):
+            return None
+        return quote
 
-        # build payment info dict
+    def get_payment_info(self, validated_data):
+        """build payment info dict for the facade (saved card OR new card)"""
         payment_info = {}
         if validated_data.get('payment_card_id'):
             payment_info['payment_card_id'] = validated_data['payment_card_id']
@@ -995,20 +1234,266 @@ class BookingCreateSerializer(serializers.Serializer):
             payment_info['card_number'] = validated_data.get('card_number')
             payment_info['expiration'] = validated_data.get('expiration')
             payment_info['brand'] = validated_data.get('brand')
-        
-        # use Facade to process the entire booking
+        return payment_info
+
+
+class CartCheckoutSerializer(BookingCreateSerializer):
+    '''
+    serializer for checking out several showings at once (double feature,
+    group buying two different times, ...)
+
+    all showings end up in ONE booking with one payment and one promotion,
+    processed by a single BookingFacade run
+
+    example input:
+    {
+        "items": [
+            {"showing_id": 42, "seats": [{"seat_id": 5, "age_category": "Adult"}]},
+            {"showing_id": 43, "seats": [{"seat_id": 5, "age_category": "Adult"}]}
+        ],
+        "promo_code": "SUMMER20",  # Optional, applied to the cart total
+        "payment_card_id": 3  # OR card_number / expiration / brand
+    }
+    '''
+    MAX_SHOWINGS = 5
+
+    # replaced by items
+    showing_id = None
+    seats = None
+
+    items = serializers.ListField(
+        child=serializers.DictField(),
+        min_length=1,
+        max_length=MAX_SHOWINGS,
+        required=True
+    )
+
+    def validate_items(self, value):
+        """each item needs a showing and 1-10 seats"""
+        for item in value:
+            if 'showing_id' not in item:
+                raise serializers.ValidationError("Each item must have a showing_id")
+            try:
+                item['showing_id'] = int(item['showing_id'])
+            except (TypeError, ValueError):
+                raise serializers.ValidationError("showing_id must be a number")
+
+            seats = item.get('seats')
+            if not isinstance(seats, list) or not 1 <= len(seats) <= 10:
+                raise serializers.ValidationError("Each item must have between 1 and 10 seats")
+
+            for seat_data in seats:
+                if not isinstance(seat_data, dict) or 'seat_id' not in seat_data:
+                    raise serializers.ValidationError("Each seat must have a seat_id")
+                if 'age_category' not in seat_data:
+                    raise serializers.ValidationError(
+                        "Each seat must have an age_category (Child, Adult, or Senior)"
+                    )
+                try:
+                    seat_data['seat_id'] = int(seat_data['seat_id'])
+                except (TypeError, ValueError):
+                    raise serializers.ValidationError("seat_id must be a number")
+        return value
+
+    def create(self, validated_data):
+        """books every item of the cart with one BookingFacade run"""
+        user = self.context['request'].user
+        promo_code = validated_data.get('promo_code', '').strip()
+
         facade = BookingFacade(
             user=user,
-            showing_id=showing_id,
-            seats_data=seats_data,
+            items=validated_data['items'],
             promo_code=promo_code if promo_code else None,
-            payment_info=payment_info
+            payment_info=self.get_payment_info(validated_data)
         )
-        
-        # process booking and return result
-        # the Facade handles all validation, calculation, and creation
         return facade.process_booking()
 
+class CheckoutSessionCreateSerializer(serializers.Serializer):
+    '''
+    input for opening a checkout session (see cinema/checkout.py)
+
+    example input:
+    {
+        "showing_id": 42,
+        "seats": [{"seat_id": 5, "age_category": "Adult"}],
+        "promo_code": "SUMMER20"  # Optional
+    }
+    '''
+    showing_id = serializers.IntegerField(required=True)
+    seats = serializers.ListField(
+        child=serializers.DictField(),
+        min_length=1,
+        max_length=10,
+        required=True
+    )
+    promo_code = serializers.CharField(required=False, allow_blank=True)
+
+    def validate_seats(self, value):
+        """each seat needs a seat_id and an age_category"""
+        for seat_data in value:
+            if 'seat_id' not in seat_data:
+                raise serializers.ValidationError("Each seat must have a seat_id")
+            if 'age_category' not in seat_data:
+                raise serializers.ValidationError(
+                    "Each seat must have an age_category (Child, Adult, or Senior)"
+                )
+        return value
+
+
+class CheckoutSessionUpdateSerializer(serializers.Serializer):
+    '''
+    delta applied to an open checkout session, every field is optional
+
+    example input:
+    {
+        "add_seats": [{"seat_id": 7, "age_category": "Child"}],
+        "remove_seat_ids": [5],
+        "change_seats": [{"seat_id": 6, "age_category": "Senior"}],
+        "promo_code": "SUMMER20"  # "" removes the promo code
+    }
+    '''
+    add_seats = serializers.ListField(child=serializers.DictField(), required=False, max_length=10)
+    remove_seat_ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+    change_seats = serializers.ListField(child=serializers.DictField(), required=False)
+    promo_code = serializers.CharField(required=False, allow_blank=True)
+
+    def validate(self, data):
+        """seat entries need a seat_id and an age_category"""
+        for field in ['add_seats', 'change_seats']:
+            for seat_data in data.get(field, []):
+                if 'seat_id' not in seat_data or 'age_category' not in seat_data:
+                    raise serializers.ValidationError({
+                        field: "Each seat must have a seat_id and an age_category"
+                    })
+                try:
+                    seat_data['seat_id'] = int(seat_data['seat_id'])
+                except (TypeError, ValueError):
+                    raise serializers.ValidationError({field: "seat_id must be a number"})
+        return data
+
+
+class CheckoutConfirmSerializer(BookingCreateSerializer):
+    '''
+    payment for confirming a checkout session, the order itself comes from the session
+
+    example input:
+    {
+        "payment_card_id": 3  # OR card_number / expiration / brand
+    }
+    '''
+    # taken from the session
+    showing_id = None
+    seats = None
+    promo_code = None
+    quote_token = None
+
+
+class CheckoutSessionSerializer(serializers.ModelSerializer):
+    '''
+    current state of a checkout session
+
+    Example output:
+    {
+        "session_id": "6f1c...",
+        "showing_id": 42,
+        "status": "open",
+        "seats": [{"seat_id": 5, "seat_display": "A5", "age_category": "Adult", "price": "$12.00"}],
+        "promo_code": "SUMMER20",
+        "base_price": "$12.00",
+        "discount_display": "20% off (-$2.40)",
+        "final_price": "$9.60",
+        "expires_at": "2025-12-03T10:40:00Z",
+        "booking_id": null
+    }
+    '''
+    showing_id = serializers.IntegerField(read_only=True)
+    booking_id = serializers.IntegerField(read_only=True)
+    status = serializers.SerializerMethodField()
+    seats = serializers.SerializerMethodField()
+    base_price = serializers.SerializerMethodField()
+    discount_display = serializers.SerializerMethodField()
+    final_price = serializers.SerializerMethodField()
+
+    class Meta:
+        model = CheckoutSession
+        fields = [
+            'session_id',
+            'showing_id',
+            'status',
+            'seats',
+            'promo_code',
+            'base_price',
+            'discount_display',
+            'final_price',
+            'expires_at',
+            'booking_id'
+        ]
+
+    def get_status(self, obj):
+        """open sessions past their expiry show up as expired"""
+        if obj.status == 'open' and obj.expires_at <= timezone.now():
+            return 'expired'
+        return obj.status
+
+    def get_seats(self, obj):
+        """seats with their price from the quote"""
+        prices = {seat[1]: seat[4] for seat in obj.quote['seats']}
+        return [dict(seat, price=f"${prices[seat['seat_id']]}") for seat in obj.seats]
+
+    def get_base_price(self, obj):
+        return f"${obj.quote['base_price']}"
+
+    def get_discount_display(self, obj):
+        return obj.quote['discount_display'] if obj.promo_code else None
+
+    def get_final_price(self, obj):
+        return f"${obj.quote['final_price']}"
+
+class BookingSummarySerializer(serializers.ModelSerializer):
+    """
+    Order history entry, read straight from booking_summaries.
+
+    Example output:
+    {
+        "booking_id": 123,
+        "booking_time": "2025-12-03T10:30:00Z",
+        "showing_id": 42,
+        "movie_title": "Inception",
+        "showroom_name": "Theater 1",
+        "start_time": "2025-11-15T19:30:00Z",
+        "seat_labels": ["A5", "A6"],
+        "tickets": [
+            {"seat_display": "A5", "age_category": "Adult"},
+            {"seat_display": "A6", "age_category": "Child"}
+        ],
+        "ticket_count": 2,
+        "total_price": "20.00"
+    }
+    """
+    booking_id = serializers.IntegerField(read_only=True)
+    showing_id = serializers.IntegerField(read_only=True)
+    seat_labels = serializers.SerializerMethodField()
+    tickets = serializers.JSONField(source='seats', read_only=True)
+
+    class Meta:
+        model = BookingSummary
+        fields = [
+            'booking_id',
+            'booking_time',
+            'showing_id',
+            'movie_title',
+            'showroom_name',
+            'start_time',
+            'seat_labels',
+            'tickets',
+            'ticket_count',
+            'total_price'
+        ]
+
+    def get_seat_labels(self, obj):
+        return [seat['seat_display'] for seat in obj.seats]
+
+
 class BookingDetailSerializer(serializers.ModelSerializer):
     """
     Detailed serializer for viewing booking history.
@@ -1062,21 +1547,18 @@ class BookingDetailSerializer(serializers.ModelSerializer):
         read_only_fields = ['booking_id', 'booking_time']
     
     def get_total_price(self, obj):
-        """Calculate total price for all tickets."""
-        pricing = {
-            'Child': 8.00,
-            'Adult': 12.00,
-            'Senior': 10.00
-        }
-        
-        total = sum(
-            pricing.get(ticket.age_category, 12.00)
+        """Calculate total price for all tickets, priced in one batch."""
+        prices = pricing.quote(
+            (ticket.showing.showroom_id, ticket.showing.start_time, ticket.age_category)
             for ticket in obj.tickets.all()
         )
-        
-        return total
+        return float(sum(prices, Decimal('0.00')))
     
 
+# promotion discounts are rounded to cents
+CENTS = Decimal('0.01')
+
+
 # --- Factory Method pattern --- #
 # adding this to handle different promotion types
 # Allows for easy extension of new promotion types without modifying existing code
@@ -1104,26 +1586,26 @@ class PromotionFactory:
         if not promo_code:
             return NoPromotion()
         
-        try:
-            # query the Promotion model
-            promo = Promotion.objects.get(promo_code__iexact=promo_code)
+        # today's valid promotions are kept in memory (cinema/promotion_cache.py)
+        promo = promotion_cache.get_active(promo_code)
+
+        if promo is None:
+            # unknown, expired or not started yet, codes are stored normalized
+            # so this is a lookup on the unique promo_code index
+            promo = Promotion.objects.filter(promo_code=normalize_code(promo_code)).first()
+            if promo is None:
+                return InvalidPromotion()
 
-            # checking if it is valid at the moment
-            from datetime import date
-            today = date.today()
+            today = timezone.localdate()
             if promo.start_date > today:
                 return ExpiredPromotion(promo, 'Promotion has not started yet.')
-            if promo.end_date < today:
-                return ExpiredPromotion(promo, 'Promotion has expired.')
-            
-            # check discount type to decide which handler to use
-            if promo.discount_type == 'percentage':
-                return PercentagePromotion(promo)
-            else:
-                return FixedPromotion(promo)
-            
-        except Promotion.DoesNotExist:
-            return InvalidPromotion()
+            return ExpiredPromotion(promo, 'Promotion has expired.')
+
+        # check discount type to decide which handler to use
+        if promo.discount_type == 'percentage':
+            return PercentagePromotion(promo)
+        else:
+            return FixedPromotion(promo)
 
 
 class PercentagePromotion:
@@ -1134,15 +1616,15 @@ class PercentagePromotion:
     def __init__(self, promo):
         self.promo = promo
         self.promo_code = promo.promo_code
-        self.discount_value = float(promo.discount_value)
+        self.discount_value = Decimal(promo.discount_value)
     
-    def apply(self, total_price: float) -> float:
+    def apply(self, total_price: Decimal) -> Decimal:
         """apply percentage discount to total, cant go below 0"""
         discount_amount = (self.discount_value / 100) * total_price
         final_price = total_price - discount_amount
-        return round(max(0, final_price), 2)
+        return max(Decimal('0'), final_price).quantize(CENTS, ROUND_HALF_UP)
 
-    def get_discount_display(self, base_price: float) -> str:
+    def get_discount_display(self, base_price: Decimal) -> str:
         """show discount as percentage with dollar amount"""
         discount_amount = (self.discount_value / 100) * base_price
         return f"{self.discount_value:.0f}% off (-${discount_amount:.2f})"
@@ -1158,11 +1640,11 @@ class FixedPromotion:
     def __init__(self, promo):
         self.promo = promo
         self.promo_code = promo.promo_code
-        self.discount_value = float(promo.discount_value)
+        self.discount_value = Decimal(promo.discount_value)
     
     def apply(self, total):
         """subtract fixed amount from total, cant go below 0"""
-        return round(max(0, total - self.discount_value), 2)
+        return max(Decimal('0'), total - self.discount_value).quantize(CENTS, ROUND_HALF_UP)
     
     def get_discount_display(self, total):
         """show discount as dollar amount"""
@@ -1239,14 +1721,23 @@ class BookingFacade:
     Provides a simple interface to complex booking operations.
     
     Handles:
-    - Validating seats and showing
+    - Validating seats and showing(s)
     - Calculating total price
     - Applying promotions (via Factory Method)
     - Processing payment
     - Creating booking and tickets
+
+    A booking can cover several showings (cart checkout, e.g. a double feature).
+    Everything runs in one transaction: the showing rows are locked first so two
+    checkouts for the same showing can't both pass the availability check, and
+    all tickets are written with a single batched insert.
+
+    preview() runs the validation and pricing steps only and returns a quote
+    (see cinema/quotes.py). Passing that quote back skips re-reading the showing,
+    seats and promotion and re-pricing the order at checkout.
     '''
 
-    def __init__(self, user, showing_id, seats_data, promo_code=None, payment_info=None):
+    def __init__(self, user, showing_id=None, seats_data=None, promo_code=None, payment_info=None, items=None, quote=None):
         """
         Initialize the booking facade with input data
         
@@ -1256,19 +1747,31 @@ class BookingFacade:
             seats_data: List of dicts with seat_id and age_category
             promo_code: Optional promotion code
             payment_info: Dict with payment card info or payment_card_id
+            items: Cart checkout, list of {"showing_id": ..., "seats": [...]}
+                   (used instead of showing_id/seats_data)
+            quote: verified quote from preview() (cinema.quotes.read_quote)
         """
+        if items is None:
+            items = [{'showing_id': showing_id, 'seats': seats_data or []}]
+
         self.user = user
-        self.showing_id = showing_id
-        self.seats_data = seats_data
+        self.items = items
+        self.showing_id = items[0]['showing_id']
+        self.seats_data = items[0]['seats']
         self.promo_code = promo_code
         self.payment_info = payment_info or {}
+        self.quote = quote
         
         # Initialize attributes that will be set during processing
-        self.showing = None
+        # showing_id -> {'movie_title', 'showroom_name', 'start_time', 'showroom_id'}
+        self.showings = {}
+        # one entry per ticket: showing_id, seat_id, seat_display, age_category, price
         self.seats = []
         self.promotion = None
-        self.base_price = 0.0
-        self.final_price = 0.0
+        self.promotion_applied = None
+        self.discount_display = None
+        self.base_price = Decimal('0.00')
+        self.final_price = Decimal('0.00')
         self.booking = None
         self.tickets = []
 
@@ -1283,23 +1786,39 @@ class BookingFacade:
             serializers.ValidationError: If any step fails
         """
         try:
-            # validate showing and seats
-            self._validate_showing_and_seats()
-            
-            # calculate base price
-            self._calculate_base_price()
-            
-            # apply promotion (if provided)
-            self._apply_promotion()
-            
-            # simulate payment
-            payment_result = self._simulate_payment()
-            
-            # create booking and tickets
-            self._create_booking_and_tickets()
-            
+            with transaction.atomic():
+                if self.quote:
+                    # already validated and priced by preview()
+                    self._load_quote()
+                else:
+                    # validate showing and seats
+                    self._validate_showing_and_seats()
+                    
+                    # calculate base price
+                    self._calculate_base_price()
+                    
+                    # apply promotion (if provided)
+                    self._apply_promotion()
+
+                # take a use of the promo code (max uses / per-user limit)
+                self._redeem_promotion()
+                
+                # simulate payment
+                payment_result = self._simulate_payment()
+                
+                # create booking and tickets
+                self._create_booking_and_tickets()
+
+                result = self._format_result(payment_result)
+
+                # receipt snapshot, commits with the booking
+                save_receipt(self.booking, result)
+
+                # confirmation email, sent by the outbox worker once this commits
+                queue_booking_confirmation(self.user, result)
+
             # return complete booking result
-            return self._format_result(payment_result)
+            return result
         
         except Exception as e:
             # log the error for debugging
@@ -1307,77 +1826,257 @@ class BookingFacade:
             logger.error(f"Booking failed: {str(e)}")
             raise
 
-    def _validate_showing_and_seats(self):
+    def preview(self, lock=False):
         """
-        Validate showing exists, is in future, and seats are available.
+        Validate and price the order without booking anything.
+
+        Args:
+            lock: lock the showing rows (when the caller goes on to hold seats)
+
+        Returns:
+            dict: quote with everything process_booking() needs, to be signed
+            with cinema.quotes.issue_quote()
+
+        Raises:
+            serializers.ValidationError: invalid order or invalid promo code
         """
-        # validate showing exists
-        try:
-            self.showing = Showing.objects.get(showing_id=self.showing_id)
-        except Showing.DoesNotExist:
-            raise serializers.ValidationError(f"Showing with ID {self.showing_id} does not exist")
-        
-        # validate showing is in the future
-        if self.showing.start_time < timezone.now():
-            raise serializers.ValidationError("Cannot book tickets for past showings")
-        
-        # get all seat IDs
-        seat_ids = [s['seat_id'] for s in self.seats_data]
+        self._validate_showing_and_seats(lock=lock)
+        return self._price_for_quote()
 
-        # check for duplicate seat selections
-        if len(seat_ids) != len(set(seat_ids)):
-            raise serializers.ValidationError("Cannot select the same seat multiple times")
-        
-        # validate each seat
-        for seat_data in self.seats_data:
-            try:
-                seat = Seat.objects.get(seat_id=seat_data['seat_id'])
-            except Seat.DoesNotExist:
-                raise serializers.ValidationError(f"Seat with ID {seat_data['seat_id']} does not exist")
-            
-            # check seat belongs to correct showroom (compare objects)
-            if seat.showroom_id != self.showing.showroom:
-                raise serializers.ValidationError(
-                    f"Seat {seat.row_label}{seat.seat_number} is not in {self.showing.showroom.showroom_name}"
-                )
-            
-            # check seat availability
-            if Ticket.objects.filter(showing=self.showing, seat=seat).exists():
+    def price(self, showings, seats):
+        """
+        Price an order whose showings and seats were validated earlier (e.g. the
+        seats of a checkout session, see cinema/checkout.py) without reading
+        them from the database again.
+
+        Args:
+            showings: showing_id -> {'movie_title', 'showroom_name', 'start_time', 'showroom_id'}
+            seats: list of dicts with showing_id, seat_id, seat_display and age_category
+
+        Returns:
+            dict: quote, same format as preview()
+
+        Raises:
+            serializers.ValidationError: invalid promo code
+        """
+        self.showings = dict(showings)
+        self.seats = [dict(seat_info) for seat_info in seats]
+        return self._price_for_quote()
+
+    def check_seats_free(self, seats):
+        """
+        Make sure none of the seats (dicts with showing_id, seat_id and
+        seat_display) is sold or held by another user than the facade's.
+
+        Raises:
+            serializers.ValidationError: a seat is taken
+        """
+        showing_ids = {seat_info['showing_id'] for seat_info in seats}
+        seat_ids = [seat_info['seat_id'] for seat_info in seats]
+
+        occupied = set(
+            Ticket.objects.filter(
+                showing_id__in=showing_ids,
+                seat_id__in=seat_ids
+            ).values_list('showing_id', 'seat_id')
+        )
+        # seats in someone else's checkout (see cinema/checkout.py)
+        held = set(
+            SeatReservation.objects.filter(
+                showing_id__in=showing_ids,
+                seat_id__in=seat_ids,
+                is_confirmed=False,
+                expires_at__gt=timezone.now()
+            ).exclude(user=self.user).values_list('showing_id', 'seat_id')
+        )
+
+        for seat_info in seats:
+            key = (seat_info['showing_id'], seat_info['seat_id'])
+            if key in occupied:
                 raise serializers.ValidationError(
-                    f"Seat {seat.row_label}{seat.seat_number} is already booked for this showing"
+                    f"Seat {seat_info['seat_display']} is already booked for this showing"
                 )
-            
-            # validate age category
-            valid_categories = ['Child', 'Adult', 'Senior']
-            if seat_data['age_category'] not in valid_categories:
+            if key in held:
                 raise serializers.ValidationError(
-                    f"Age category must be one of: {', '.join(valid_categories)}"
+                    f"Seat {seat_info['seat_display']} is being held by another customer"
                 )
-            
-            self.seats.append({
-                'seat': seat,
-                'age_category': seat_data['age_category']
-            })
+
+    def _price_for_quote(self):
+        """price the validated order with its promotion and build the quote"""
+        self._calculate_base_price()
+        self._apply_promotion()
+
+        # at checkout a bad code is ignored, when previewing the user wants to know
+        if self.promo_code and not self.promotion.is_valid():
+            raise serializers.ValidationError("Invalid or expired promotion code")
+
+        return self._build_quote()
+
+    def _build_quote(self):
+        """current showings, seats and prices in the quote format"""
+        return {
+            'showings': {
+                str(showing_id): [
+                    info['movie_title'], info['showroom_name'], info['start_time'].isoformat(), info['showroom_id']
+                ]
+                for showing_id, info in self.showings.items()
+            },
+            'seats': [
+                [seat_info['showing_id'], seat_info['seat_id'], seat_info['seat_display'],
+                 seat_info['age_category'], f"{seat_info['price']:.2f}"]
+                for seat_info in self.seats
+            ],
+            'promo_code': self.promotion_applied,
+            'discount_display': self.discount_display,
+            'base_price': f"{self.base_price:.2f}",
+            'final_price': f"{self.final_price:.2f}",
+        }
+
+    def _load_quote(self):
+        """
+        Restore showings, seats and prices from a verified quote.
+
+        Only what can change between preview and checkout is checked again:
+        the showing must not have started and the seats must still be free.
+        """
+        for showing_id, info in self.quote['showings'].items():
+            self.showings[int(showing_id)] = quoted_showing(info)
+
+        self.seats = [
+            {
+                'showing_id': showing_id,
+                'seat_id': seat_id,
+                'seat_display': seat_display,
+                'age_category': age_category,
+                'price': Decimal(price),
+            }
+            for showing_id, seat_id, seat_display, age_category, price in self.quote['seats']
+        ]
+
+        # the quote must cover exactly the order being checked out
+        requested = sorted(
+            (int(item['showing_id']), int(s['seat_id']), s['age_category'])
+            for item in self.items for s in item['seats']
+        )
+        quoted = sorted((s['showing_id'], s['seat_id'], s['age_category']) for s in self.seats)
+        if requested != quoted:
+            raise serializers.ValidationError("Price quote does not match the selected seats")
+
+        for info in self.showings.values():
+            if info['start_time'] < timezone.now():
+                raise serializers.ValidationError("Cannot book tickets for past showings")
+
+        # same lock as the full path
+        list(Showing.objects.select_for_update().filter(
+            showing_id__in=list(self.showings)
+        ).order_by('showing_id').values_list('showing_id', flat=True))
+
+        self.check_seats_free(self.seats)
+
+        self.promo_code = self.quote['promo_code']
+        self.promotion_applied = self.quote['promo_code']
+        self.discount_display = self.quote['discount_display']
+        self.base_price = Decimal(self.quote['base_price'])
+        self.final_price = Decimal(self.quote['final_price'])
+
+    def _validate_showing_and_seats(self, lock=True):
+        """
+        Validate showings exist, are in future, and seats are available.
+
+        Uses a fixed number of queries no matter how many seats/showings:
+        one (locking) read of the showings, one for the seats, one for occupancy.
+        """
+        showing_ids = [item['showing_id'] for item in self.items]
+        if len(showing_ids) != len(set(showing_ids)):
+            raise serializers.ValidationError("Each showing can only appear once in the cart")
+
+        showings = Showing.objects.select_related('movie', 'showroom').filter(
+            showing_id__in=showing_ids
+        ).order_by('showing_id')
+        if lock:
+            # lock the showing rows until the transaction ends, concurrent checkouts
+            # for the same showing wait here instead of double booking seats
+            showings = showings.select_for_update(of=('self',))
+        showings = {showing.showing_id: showing for showing in showings}
+
+        for showing_id in showing_ids:
+            showing = showings.get(showing_id)
+
+            # validate showing exists
+            if showing is None:
+                raise serializers.ValidationError(f"Showing with ID {showing_id} does not exist")
+
+            # validate showing is in the future
+            if showing.start_time < timezone.now():
+                raise serializers.ValidationError("Cannot book tickets for past showings")
+
+            self.showings[showing_id] = {
+                'movie_title': showing.movie.movie_title,
+                'showroom_name': showing.showroom.showroom_name,
+                'start_time': showing.start_time,
+                'showroom_id': showing.showroom_id,
+            }
+
+        # get all seat IDs
+        seat_ids = [s['seat_id'] for item in self.items for s in item['seats']]
+        seats_by_id = Seat.objects.in_bulk(seat_ids)
+
+        valid_categories = ['Child', 'Adult', 'Senior']
+
+        for item in self.items:
+            showing = showings[item['showing_id']]
+            item_seat_ids = [s['seat_id'] for s in item['seats']]
+
+            # check for duplicate seat selections
+            if len(item_seat_ids) != len(set(item_seat_ids)):
+                raise serializers.ValidationError("Cannot select the same seat multiple times")
+
+            # validate each seat
+            for seat_data in item['seats']:
+                seat = seats_by_id.get(seat_data['seat_id'])
+                if seat is None:
+                    raise serializers.ValidationError(f"Seat with ID {seat_data['seat_id']} does not exist")
+                
+                # check seat belongs to correct showroom
+                if seat.showroom_id_id != showing.showroom_id:
+                    raise serializers.ValidationError(
+                        f"Seat {seat.row_label}{seat.seat_number} is not in {showing.showroom.showroom_name}"
+                    )
+                
+                # validate age category
+                if seat_data['age_category'] not in valid_categories:
+                    raise serializers.ValidationError(
+                        f"Age category must be one of: {', '.join(valid_categories)}"
+                    )
+                
+                self.seats.append({
+                    'showing_id': showing.showing_id,
+                    'seat_id': seat.seat_id,
+                    'seat_display': f"{seat.row_label}{seat.seat_number}",
+                    'age_category': seat_data['age_category']
+                })
+
+        # check seat availability
+        self.check_seats_free(self.seats)
     
     def _calculate_base_price(self):
         """
-        Calculate base price based on ticket types
-        
-        Pricing:
-        - Child: $8.00
-        - Adult: $12.00
-        - Senior: $10.00
+        Calculate base price from the ticket price table (cinema/pricing.py),
+        the whole order is priced in one call
         """
-        pricing = {
-            'Child': 8.00,
-            'Adult': 12.00,
-            'Senior': 10.00
-        }
-        
-        self.base_price = sum(
-            pricing.get(seat_info['age_category'], 12.00)
+        prices = pricing.quote(
+            (
+                self.showings[seat_info['showing_id']]['showroom_id'],
+                self.showings[seat_info['showing_id']]['start_time'],
+                seat_info['age_category']
+            )
             for seat_info in self.seats
         )
+
+        for seat_info, price in zip(self.seats, prices):
+            seat_info['price'] = price
+        
+        self.base_price = sum(prices, Decimal('0.00'))
         
         # start with base price (will be modified by promotion)
         self.final_price = self.base_price
@@ -1392,6 +2091,28 @@ class BookingFacade:
         # apply promotion to calculate final price
         if self.promotion.is_valid():
             self.final_price = self.promotion.apply(self.base_price)
+            self.promotion_applied = self.promotion.promo_code
+
+        self.discount_display = self.promotion.get_discount_display(self.base_price)
+
+    def _redeem_promotion(self):
+        """
+        Take one use of the applied promotion (cinema/redemptions.py).
+        Runs in the booking transaction, so the use is given back if the
+        booking fails later on.
+        """
+        if not self.promotion_applied:
+            return
+
+        if self.promotion is None:
+            # priced from a quote, the handler wasn't needed until now
+            self.promotion = PromotionFactory.get_promotion(self.promotion_applied)
+            if not self.promotion.is_valid():
+                raise serializers.ValidationError(
+                    f"Promotion {self.promotion_applied} is no longer valid, please review your order"
+                )
+
+        redemptions.redeem(self.promotion.promo, self.user)
 
     def _simulate_payment(self):
         """
@@ -1413,7 +2134,7 @@ class BookingFacade:
                 
                 return {
                     'payment_method': 'saved_card',
-                    'last4': card.get_masked_card_number()[-4:],
+                    'last4': card.get_last4(),
                     'brand': card.brand,
                     'card_id': card.id
                 }
@@ -1462,7 +2183,8 @@ class BookingFacade:
 
     def _create_booking_and_tickets(self):
         """
-        Create booking and ticket records in the database
+        Create booking, ticket, booking summary and promotion redemption
+        records in the database
         """
         # Create the booking
         self.booking = Booking.objects.create(
@@ -1471,15 +2193,22 @@ class BookingFacade:
             promo_code=self.promo_code or ''
         )
         
-        # create tickets for each seat
-        for seat_info in self.seats:
-            ticket = Ticket.objects.create(
+        # create all tickets (across every showing in the cart) in one insert
+        self.tickets = Ticket.objects.bulk_create([
+            Ticket(
                 booking=self.booking,
-                showing=self.showing,
-                seat=seat_info['seat'],
+                showing_id=seat_info['showing_id'],
+                seat_id=seat_info['seat_id'],
                 age_category=seat_info['age_category']
             )
-            self.tickets.append(ticket)
+            for seat_info in self.seats
+        ])
+
+        # what the order history lists, so it doesn't have to join tickets
+        build_summary(self.booking, self.showings, self.seats).save(force_insert=True)
+
+        if self.promotion_applied:
+            redemptions.record(self.promotion.promo, self.user, self.booking)
 
     def _format_result(self, payment_result):
         """
@@ -1488,23 +2217,50 @@ class BookingFacade:
         Returns:
             dict: Complete booking information for API response
         """
+        showings = []
+        for item in self.items:
+            info = self.showings[item['showing_id']]
+            showings.append({
+                'showing_id': item['showing_id'],
+                'movie_title': info['movie_title'],
+                'showroom_name': info['showroom_name'],
+                'start_time': info['start_time'],
+                'seats': [
+                    {
+                        'seat_display': seat_info['seat_display'],
+                        'age_category': seat_info['age_category'],
+                        'price': f"${seat_info['price']:.2f}"
+                    }
+                    for seat_info in self.seats
+                    if seat_info['showing_id'] == item['showing_id']
+                ]
+            })
+
         return {
             'booking_id': self.booking.booking_id,
             'user_email': self.user.email,
-            'movie_title': self.showing.movie.movie_title,
-            'showroom_name': self.showing.showroom.showroom_name,
-            'start_time': self.showing.start_time,
-            'seats': [
-                {
-                    'seat_display': f"{ticket.seat.row_label}{ticket.seat.seat_number}",
-                    'age_category': ticket.age_category
-                }
-                for ticket in self.tickets
-            ],
+            # first showing, kept for single-showing clients
+            'movie_title': showings[0]['movie_title'],
+            'showroom_name': showings[0]['showroom_name'],
+            'start_time': showings[0]['start_time'],
+            'seats': showings[0]['seats'],
+            'showings': showings,
             'base_price': f"${self.base_price:.2f}",
-            'promotion_applied': self.promotion.promo_code if self.promotion.is_valid() else None,
-            'discount_display': self.promotion.get_discount_display(self.base_price),
+            'promotion_applied': self.promotion_applied,
+            'discount_display': self.discount_display,
             'final_price': f"${self.final_price:.2f}",
             'payment': payment_result,
-            'booking_time': self.booking.booking_time
-        }
\ No newline at end of file
+            'booking_time': self.booking.booking_time,
+            # same shape as BookingDetailSerializer, for the detail/confirmation page
+            'tickets': [
+                {
+                    'showing_id': seat_info['showing_id'],
+                    'seat_id': seat_info['seat_id'],
+                    'seat_display': seat_info['seat_display'],
+                    'age_category': seat_info['age_category'],
+                    'price': round(float(seat_info['price']), 2)
+                }
+                for seat_info in self.seats
+            ],
+            'total_price': round(float(self.final_price), 2)
+        }
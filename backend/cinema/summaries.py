@@ -0,0 +1,127 @@
+'''
+Booking summaries (BookingSummary, booking_summaries table).
+
+New bookings get their summary from BookingFacade, which already has every
+value in memory. The helpers here rebuild summaries from the tickets for
+bookings that change afterwards (bulk cancel/move), for bookings whose
+showing or movie is edited (start time, movie title: rebuild_for_showings)
+and for bookings made before the table existed (backfill_booking_summaries
+command).
+'''
+
+from collections import defaultdict
+
+from django.db import transaction
+
+from . import authentication
+from .models import Booking, BookingSummary, Ticket
+
+# bookings rebuilt per statement by rebuild_for_showings
+REBUILD_CHUNK_SIZE = 500
+
+
+def build_summary(booking, showings, seats):
+    '''
+    Args:
+        booking: Booking (user_id, total_price, booking_time are used)
+        showings: {showing_id: {'movie_title', 'showroom_name', 'start_time'}}
+        seats: [{'showing_id', 'seat_display', 'age_category'}] in display order
+
+    Returns:
+        unsaved BookingSummary, described by the earliest showing
+    '''
+    ordered = sorted(showings.items(), key=lambda item: item[1]['start_time'])
+    first_id, first = ordered[0]
+
+    movie_titles = []
+    for _, info in ordered:
+        if info['movie_title'] not in movie_titles:
+            movie_titles.append(info['movie_title'])
+
+    return BookingSummary(
+        booking_id=booking.booking_id,
+        user_id=booking.user_id,
+        showing_id=first_id,
+        movie_title=" + ".join(movie_titles),
+        showroom_name=first['showroom_name'],
+        start_time=first['start_time'],
+        seats=[
+            {'seat_display': seat['seat_display'], 'age_category': seat['age_category']}
+            for seat in seats
+        ],
+        ticket_count=len(seats),
+        total_price=booking.total_price,
+        booking_time=booking.booking_time,
+    )
+
+
+def rebuild_summaries(booking_ids):
+    '''
+    recompute the summaries of these bookings from their tickets (two reads,
+    one delete, one insert). bookings without tickets lose their summary.
+
+    Returns:
+        int: number of summaries written
+    '''
+    booking_ids = list(booking_ids)
+    if not booking_ids:
+        return 0
+
+    bookings = Booking.objects.in_bulk(booking_ids)
+
+    showings = defaultdict(dict)
+    seats = defaultdict(list)
+    tickets = Ticket.objects.filter(booking_id__in=booking_ids).order_by('ticket_id').values_list(
+        'booking_id', 'showing_id', 'seat__row_label', 'seat__seat_number', 'age_category',
+        'showing__movie__movie_title', 'showing__showroom__showroom_name', 'showing__start_time'
+    )
+    for booking_id, showing_id, row_label, seat_number, age_category, movie_title, showroom_name, start_time in tickets:
+        showings[booking_id][showing_id] = {
+            'movie_title': movie_title,
+            'showroom_name': showroom_name,
+            'start_time': start_time,
+        }
+        seats[booking_id].append({
+            'showing_id': showing_id,
+            'seat_display': f"{row_label}{seat_number}",
+            'age_category': age_category,
+        })
+
+    summaries = [
+        build_summary(bookings[booking_id], showings[booking_id], seats[booking_id])
+        for booking_id in booking_ids
+        if booking_id in bookings and showings[booking_id]
+    ]
+
+    with transaction.atomic():
+        BookingSummary.objects.filter(booking_id__in=booking_ids).delete()
+        BookingSummary.objects.bulk_create(summaries)
+
+    return len(summaries)
+
+
+def rebuild_for_showings(showing_ids):
+    '''
+    rebuild the summaries of every booking with tickets for these showings,
+    call in the transaction that changed them (start time, movie, showroom
+    or the movie's title)
+
+    Returns:
+        int: number of summaries written
+    '''
+    booking_ids = list(
+        Ticket.objects.filter(showing_id__in=list(showing_ids))
+        .values_list('booking_id', flat=True)
+        .distinct()
+    )
+
+    written = 0
+    for start in range(0, len(booking_ids), REBUILD_CHUNK_SIZE):
+        written += rebuild_summaries(booking_ids[start:start + REBUILD_CHUNK_SIZE])
+
+    # cached account data lists upcoming bookings (cinema/account.py)
+    user_ids = Booking.objects.filter(booking_id__in=booking_ids).values_list('user_id', flat=True).distinct()
+    for user_id in user_ids:
+        authentication.invalidate(user_id)
+
+    return written
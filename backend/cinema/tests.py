@@ -1,4 +1,494 @@
 #allows you to write automated tests to verify code functionality.
-from django.test import TestCase
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.mail.backends.locmem import EmailBackend as LocmemEmailBackend
+from django.db import connection, transaction
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.test import APIClient
+
+from . import checkout, outbox, pricing, ratelimit, redemptions
+from .admission import AdmissionController
+from .models import (
+    Booking, CheckoutSession, EmailOutbox, Movie, PaymentCard, Promotion, PromotionRedemption, PromotionUserUsage,
+    Seat, SeatReservation, Showing, Showroom, Ticket
+)
+from .serializers import BookingFacade
+
+LOCAL_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+NEW_CARD = {'card_number': '4532123456789012', 'expiration': '12/2099', 'brand': 'Visa'}
+
+
+def create_unmanaged_tables():
+    """the booking tables come from database/new_schema.sql, not migrations"""
+    existing = set(connection.introspection.table_names())
+    with connection.schema_editor() as editor:
+        for model in apps.get_app_config('cinema').get_models():
+            if not model._meta.managed and model._meta.db_table not in existing:
+                editor.create_model(model)
+                existing.add(model._meta.db_table)
+
+
+@override_settings(CACHES=LOCAL_CACHE, BOOKING_EMAILS_ENABLED=False)
+class BookingTestCase(TestCase):
+    """a showing with 15 seats, a promotion and three customers"""
+
+    @classmethod
+    def setUpClass(cls):
+        # outside the class transaction, schema changes can't run inside one on every backend
+        create_unmanaged_tables()
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', 'alice@example.com', 'pw123456!')
+        cls.bob = User.objects.create_user('bob', 'bob@example.com', 'pw123456!')
+        cls.carol = User.objects.create_user('carol', 'carol@example.com', 'pw123456!')
+        movie = Movie.objects.create(movie_title='Inception', movie_status='Currently Running')
+        showroom = Showroom.objects.create(showroom_name='Showroom A')
+        Seat.objects.bulk_create([
+            Seat(showroom_id=showroom, row_label=row, seat_number=number) for row in 'ABC' for number in range(1, 6)
+        ])
+        cls.seats = list(Seat.objects.filter(showroom_id=showroom).order_by('seat_id'))
+        start = timezone.now() + timedelta(days=2)
+        cls.showing = Showing.objects.create(movie=movie, showroom=showroom, start_time=start, end_time=start + timedelta(hours=2))
+        cls.promotion = Promotion.objects.create(
+            promo_code='SUMMER20', discount_type='percentage', discount_value=20,
+            start_date=date.today(), end_date=date.today() + timedelta(days=30)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def seat_data(self, *indexes):
+        return [{'seat_id': self.seats[i].seat_id, 'age_category': 'Adult'} for i in indexes]
+
+    def book(self, user, *indexes, promo_code='SUMMER20'):
+        return BookingFacade(
+            user=user,
+            showing_id=self.showing.showing_id,
+            seats_data=self.seat_data(*indexes),
+            promo_code=promo_code,
+            payment_info=NEW_CARD
+        ).process_booking()
+
+
+class SMTPDownBackend(BaseEmailBackend):
+    """the mail server can't be reached at all"""
+
+    def open(self):
+        raise ConnectionRefusedError('Connection refused')
+
+    def send_messages(self, email_messages):
+        raise ConnectionRefusedError('Connection refused')
+
+
+class RejectingBackend(LocmemEmailBackend):
+    """connects fine, rejects mail to rejected@example.com"""
+
+    def send_messages(self, email_messages):
+        for message in email_messages:
+            if 'rejected@example.com' in message.to:
+                raise OSError('550 Mailbox unavailable')
+        return super().send_messages(email_messages)
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class EmailOutboxTests(TestCase):
+    """draining the transactional email outbox (cinema/outbox.py)"""
+
+    def queue(self, to_email='user@example.com', **fields):
+        return EmailOutbox.objects.create(
+            to_email=to_email,
+            subject='Your booking',
+            body='See you at the movies',
+            html_body='<p>See you at the movies</p>',
+            **fields
+        )
+
+    def test_due_emails_are_sent(self):
+        first = self.queue('first@example.com')
+        second = self.queue('second@example.com')
+
+        self.assertEqual(outbox.drain(), (2, 0, 0))
+
+        self.assertEqual([message.to for message in mail.outbox], [['first@example.com'], ['second@example.com']])
+        self.assertEqual(mail.outbox[0].alternatives[0][1], 'text/html')
+        for email in (first, second):
+            email.refresh_from_db()
+            self.assertEqual(email.status, 'sent')
+            self.assertEqual(email.attempts, 1)
+            self.assertIsNotNone(email.sent_at)
+
+    def test_emails_not_due_yet_are_left_alone(self):
+        email = self.queue(next_attempt_at=timezone.now() + timedelta(minutes=5))
+
+        self.assertEqual(outbox.drain(), (0, 0, 0))
+
+        self.assertEqual(mail.outbox, [])
+        email.refresh_from_db()
+        self.assertEqual(email.status, 'pending')
+
+    def test_claimed_batch_is_leased(self):
+        email = self.queue()
+
+        claimed = outbox.claim_batch()
+
+        self.assertEqual([claimed_email.id for claimed_email in claimed], [email.id])
+        # a second worker finds nothing while the lease runs
+        self.assertEqual(outbox.claim_batch(), [])
+        email.refresh_from_db()
+        self.assertGreater(email.next_attempt_at, timezone.now() + timedelta(seconds=outbox.LEASE - 60))
+
+    @override_settings(EMAIL_BACKEND='cinema.tests.RejectingBackend')
+    def test_failed_send_is_retried_with_backoff(self):
+        rejected = self.queue('rejected@example.com')
+        delivered = self.queue('delivered@example.com')
+
+        before = timezone.now()
+        self.assertEqual(outbox.drain(), (1, 1, 0))
+
+        # one bad address doesn't stop the rest of the batch
+        self.assertEqual([message.to for message in mail.outbox], [['delivered@example.com']])
+        delivered.refresh_from_db()
+        self.assertEqual(delivered.status, 'sent')
+
+        rejected.refresh_from_db()
+        self.assertEqual(rejected.status, 'pending')
+        self.assertEqual(rejected.attempts, 1)
+        self.assertIn('550', rejected.last_error)
+        self.assertGreaterEqual(rejected.next_attempt_at, before + timedelta(seconds=outbox.retry_delay(1) * 10 / 11))
+
+        # backoff doubles after every failure
+        self.assertAlmostEqual(outbox.retry_delay(2), 2 * outbox.RETRY_DELAY, delta=outbox.RETRY_DELAY / 5)
+        self.assertLessEqual(outbox.retry_delay(50), outbox.MAX_RETRY_DELAY * 1.1)
+
+    @override_settings(EMAIL_BACKEND='cinema.tests.RejectingBackend')
+    def test_email_is_dead_after_max_attempts(self):
+        email = self.queue('rejected@example.com', attempts=outbox.MAX_ATTEMPTS - 1)
+
+        self.assertEqual(outbox.drain(), (0, 0, 1))
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, 'dead')
+        self.assertEqual(email.attempts, outbox.MAX_ATTEMPTS)
+        # dead emails are not claimed again
+        self.assertEqual(outbox.claim_batch(), [])
+
+        self.assertEqual(outbox.requeue_dead(), 1)
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('pending', 0))
+
+    @override_settings(EMAIL_BACKEND='cinema.tests.SMTPDownBackend')
+    def test_smtp_down_counts_as_failed_attempt(self):
+        email = self.queue()
+        dying = self.queue(attempts=outbox.MAX_ATTEMPTS - 1)
+
+        self.assertEqual(outbox.drain(), (0, 1, 1))
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, 'pending')
+        self.assertEqual(email.attempts, 1)
+        self.assertIn('Connection refused', email.last_error)
+        # backed off, not just leased until the next claim
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        self.assertLess(email.next_attempt_at, timezone.now() + timedelta(seconds=outbox.LEASE))
+
+        dying.refresh_from_db()
+        self.assertEqual(dying.status, 'dead')
+
+
+class ClientIpTests(SimpleTestCase):
+    """client address used by the rate limits and admission passes (cinema/ratelimit.py)"""
+
+    def request(self, forwarded=None):
+        extra = {'REMOTE_ADDR': '10.0.0.2'}
+        if forwarded is not None:
+            extra['HTTP_X_FORWARDED_FOR'] = forwarded
+        return RequestFactory().post('/api/auth/login/', **extra)
+
+    def test_forwarded_for_is_ignored_without_trusted_proxies(self):
+        with mock.patch.object(ratelimit, 'TRUSTED_PROXY_HOPS', 0):
+            self.assertEqual(ratelimit.client_ip(self.request('203.0.113.7')), '10.0.0.2')
+
+    def test_client_cannot_pick_its_address(self):
+        # the client sent "1.1.1.1", our proxy appended the address it saw
+        request = self.request('1.1.1.1, 203.0.113.7')
+        with mock.patch.object(ratelimit, 'TRUSTED_PROXY_HOPS', 1):
+            self.assertEqual(ratelimit.client_ip(request), '203.0.113.7')
+        # load balancer and nginx in front
+        request = self.request('1.1.1.1, 203.0.113.7, 10.0.0.5')
+        with mock.patch.object(ratelimit, 'TRUSTED_PROXY_HOPS', 2):
+            self.assertEqual(ratelimit.client_ip(request), '203.0.113.7')
+
+    def test_missing_forwarded_for_falls_back_to_remote_addr(self):
+        with mock.patch.object(ratelimit, 'TRUSTED_PROXY_HOPS', 1):
+            self.assertEqual(ratelimit.client_ip(self.request()), '10.0.0.2')
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class AdmissionControllerTests(SimpleTestCase):
+    """waiting room queue tickets and passes (cinema/admission.py)"""
+
+    alice = {'u': 1, 'a': '203.0.113.1'}
+    bob = {'u': 2, 'a': '203.0.113.2'}
+
+    def setUp(self):
+        cache.clear()
+        # one place called right away, then one per second
+        self.controller = AdmissionController(7, admits_per_minute=60, burst=1, pass_ttl_minutes=10)
+        self.clock = mock.patch('cinema.admission.time.time', return_value=1000.0)
+        self.now = self.clock.start()
+        self.addCleanup(self.clock.stop)
+
+    def queued_ticket(self, holder):
+        """first place goes to someone else, holder waits behind it"""
+        self.assertTrue(self.controller.admit((), {'u': 99, 'a': '198.51.100.9'}).admitted)
+        decision = self.controller.admit((), holder)
+        self.assertFalse(decision.admitted)
+        self.now.return_value += 5  # place called by now
+        return decision
+
+    def test_called_ticket_admits_its_holder(self):
+        decision = self.queued_ticket(self.alice)
+
+        admitted = self.controller.admit([decision.queue_ticket], self.alice)
+
+        self.assertTrue(admitted.admitted)
+        self.assertEqual(admitted.position, decision.position)
+        self.assertTrue(self.controller.has_valid_pass(admitted.admission_pass, self.alice))
+        self.assertFalse(self.controller.has_valid_pass(admitted.admission_pass, self.bob))
+
+    def test_ticket_of_another_holder_is_not_admitted(self):
+        decision = self.queued_ticket(self.alice)
+        # lots of places taken meanwhile, a new place isn't called yet
+        cache.set(self.controller._key('issued'), 50)
+
+        shared = self.controller.admit([decision.queue_ticket], self.bob)
+
+        self.assertFalse(shared.admitted)
+        self.assertNotEqual(shared.position, decision.position)
+
+    def test_called_place_is_exchanged_for_a_pass_once(self):
+        decision = self.queued_ticket(self.alice)
+        self.assertTrue(self.controller.admit([decision.queue_ticket], self.alice).admitted)
+        cache.set(self.controller._key('issued'), 50)
+
+        again = self.controller.admit([decision.queue_ticket], self.alice)
+
+        self.assertFalse(again.admitted)
+        self.assertEqual(again.position, 51)
+
+    def test_ticket_follows_the_user_to_another_address(self):
+        decision = self.queued_ticket(self.alice)
+
+        moved = self.controller.admit([decision.queue_ticket], {'u': 1, 'a': '192.0.2.50'})
+
+        self.assertTrue(moved.admitted)
+
+
+class PromotionRedemptionTests(BookingTestCase):
+    """max_uses / per_user_limit and giving uses back (cinema/redemptions.py)"""
+
+    def limit(self, **fields):
+        Promotion.objects.filter(pk=self.promotion.pk).update(**fields)
+        self.promotion.refresh_from_db()
+
+    def redeem(self, user):
+        # in a transaction like the booking, a refused use rolls back whatever it took
+        with transaction.atomic():
+            redemptions.redeem(self.promotion, user)
+
+    def test_max_uses_cannot_be_exceeded(self):
+        self.limit(max_uses=2)
+        self.redeem(self.alice)
+        self.redeem(self.bob)
+
+        with self.assertRaisesMessage(serializers.ValidationError, 'maximum number of uses'):
+            self.redeem(self.carol)
+
+        self.promotion.refresh_from_db()
+        self.assertEqual(self.promotion.times_redeemed, 2)
+
+    def test_per_user_limit(self):
+        self.limit(per_user_limit=1)
+        self.redeem(self.alice)
+
+        with self.assertRaisesMessage(serializers.ValidationError, 'maximum number of times (1)'):
+            self.redeem(self.alice)
+        # other users still can
+        self.redeem(self.bob)
+
+        self.promotion.refresh_from_db()
+        self.assertEqual(self.promotion.times_redeemed, 2)
+        self.assertEqual(
+            dict(PromotionUserUsage.objects.values_list('user_id', 'times_redeemed')),
+            {self.alice.pk: 1, self.bob.pk: 1}
+        )
+
+    def test_booking_over_the_limit_is_refused(self):
+        self.limit(max_uses=1)
+        self.book(self.alice, 0)
+
+        with self.assertRaises(serializers.ValidationError):
+            self.book(self.bob, 1)
+
+        self.assertFalse(Booking.objects.filter(user=self.bob).exists())
+        self.assertEqual(PromotionRedemption.objects.count(), 1)
+        # without the code the booking goes through
+        self.assertEqual(self.book(self.bob, 1, promo_code=None)['promotion_applied'], None)
+
+    def test_cancelling_the_booking_gives_the_use_back(self):
+        self.limit(max_uses=1, per_user_limit=1)
+        booking_id = self.book(self.alice, 0)['booking_id']
+
+        client = APIClient()
+        client.force_authenticate(self.alice)
+        self.assertEqual(client.delete(f'/api/user/bookings/{booking_id}/').status_code, 200)
+
+        self.promotion.refresh_from_db()
+        self.assertEqual(self.promotion.times_redeemed, 0)
+        self.assertIsNotNone(PromotionRedemption.objects.get().released_at)
+        # the code works again, for her too
+        self.assertEqual(self.book(self.alice, 1)['promotion_applied'], 'SUMMER20')
+
+    def test_release_only_counts_a_redemption_once(self):
+        self.limit(max_uses=1)
+        booking_id = self.book(self.alice, 0)['booking_id']
+
+        self.assertEqual(redemptions.release([booking_id]), 1)
+        self.assertEqual(redemptions.release([booking_id]), 0)
+
+        self.promotion.refresh_from_db()
+        self.assertEqual(self.promotion.times_redeemed, 0)
+
+
+class SavedCardPaymentTests(BookingTestCase):
+    """paying with a saved card (BookingFacade._simulate_payment)"""
+
+    def test_card_saved_before_last4_still_shows_its_digits(self):
+        card = PaymentCard(user=self.alice, brand='Visa', expiration='12/2099')
+        card.set_card_number('4532123456789012')
+        card.save()
+        # a row the last4 backfill couldn't fill
+        PaymentCard.objects.filter(pk=card.pk).update(last4='')
+
+        result = BookingFacade(
+            user=self.alice,
+            showing_id=self.showing.showing_id,
+            seats_data=self.seat_data(0),
+            payment_info={'payment_card_id': card.pk}
+        ).process_booking()
+
+        self.assertEqual(result['payment']['last4'], '9012')
+
+
+class TimeBandTests(SimpleTestCase):
+    """time-of-day price bands (cinema/pricing.py)"""
+
+    def at(self, hour, minute=0):
+        return timezone.make_aware(datetime(2026, 5, 1, hour, minute))
+
+    def test_bands(self):
+        self.assertEqual(pricing.time_band(self.at(14)), 'matinee')
+        self.assertEqual(pricing.time_band(self.at(17)), 'evening')
+        self.assertEqual(pricing.time_band(self.at(23)), 'late')
+
+    def test_late_band_runs_past_midnight(self):
+        self.assertEqual(pricing.time_band(self.at(0, 30)), 'late')
+        self.assertEqual(pricing.time_band(self.at(5, 59)), 'late')
+        self.assertEqual(pricing.time_band(self.at(6)), 'matinee')
+
+    def test_after_midnight_showing_pays_the_late_price(self):
+        matrix = pricing.PriceMatrix.compile('v1', [
+            (None, 'matinee', 'Adult', '9.00'),
+            (None, 'late', 'Adult', '15.00'),
+        ])
+
+        self.assertEqual(matrix.price(1, self.at(23), 'Adult'), Decimal('15.00'))
+        self.assertEqual(matrix.price(1, self.at(0, 30), 'Adult'), Decimal('15.00'))
+        self.assertEqual(matrix.price(1, self.at(14), 'Adult'), Decimal('9.00'))
+
+
+class CheckoutSessionTests(BookingTestCase):
+    """server-side checkout sessions and their seat holds (cinema/checkout.py)"""
+
+    def held_seat_ids(self, user):
+        return set(
+            SeatReservation.objects.filter(user=user, is_confirmed=False, expires_at__gt=timezone.now())
+            .values_list('seat_id', flat=True)
+        )
+
+    def test_open_session_holds_the_seats(self):
+        session = checkout.open_session(self.alice, self.showing.showing_id, self.seat_data(0, 1))
+
+        self.assertEqual(session.status, 'open')
+        self.assertEqual(self.held_seat_ids(self.alice), {self.seats[0].seat_id, self.seats[1].seat_id})
+        self.assertEqual(session.quote['final_price'], '24.00')
+
+    def test_seat_held_by_another_user_is_blocked(self):
+        checkout.open_session(self.alice, self.showing.showing_id, self.seat_data(0))
+
+        with self.assertRaises(serializers.ValidationError):
+            checkout.open_session(self.bob, self.showing.showing_id, self.seat_data(0))
+        # adding it to an existing checkout is checked too
+        session = checkout.open_session(self.bob, self.showing.showing_id, self.seat_data(1))
+        with self.assertRaises(serializers.ValidationError):
+            checkout.update_session(self.bob, session.session_id, add_seats=self.seat_data(0))
+
+        self.assertEqual(self.held_seat_ids(self.bob), {self.seats[1].seat_id})
+
+    def test_expired_hold_does_not_block(self):
+        checkout.open_session(self.alice, self.showing.showing_id, self.seat_data(0))
+        SeatReservation.objects.filter(user=self.alice).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        session = checkout.open_session(self.bob, self.showing.showing_id, self.seat_data(0))
+
+        self.assertEqual(self.held_seat_ids(self.bob), {self.seats[0].seat_id})
+        self.assertEqual(session.status, 'open')
+
+    def test_expired_session_is_rejected_on_confirm(self):
+        session = checkout.open_session(self.alice, self.showing.showing_id, self.seat_data(0))
+        CheckoutSession.objects.filter(pk=session.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        with self.assertRaises(checkout.CheckoutExpired):
+            checkout.confirm_session(self.alice, session.session_id, NEW_CARD)
+
+        self.assertFalse(Booking.objects.exists())
+        self.assertEqual(CheckoutSession.objects.get(pk=session.pk).status, 'open')
+
+    def test_changing_only_the_promo_keeps_the_holds(self):
+        session = checkout.open_session(self.alice, self.showing.showing_id, self.seat_data(0, 1))
+        holds = set(SeatReservation.objects.filter(user=self.alice).values_list('id', 'seat_id', 'expires_at'))
+
+        session = checkout.update_session(self.alice, session.session_id, promo_code='summer20', promo_changed=True)
+
+        self.assertEqual(session.promo_code, 'SUMMER20')
+        self.assertEqual(session.quote['final_price'], '19.20')
+        self.assertEqual(len(session.seats), 2)
+        # the same hold rows, not released and taken again
+        self.assertEqual(set(SeatReservation.objects.filter(user=self.alice).values_list('id', 'seat_id', 'expires_at')), holds)
+
+    def test_confirm_books_the_session_and_releases_the_holds(self):
+        session = checkout.open_session(self.alice, self.showing.showing_id, self.seat_data(0, 1), promo_code='SUMMER20')
+
+        result = checkout.confirm_session(self.alice, session.session_id, NEW_CARD)
+
+        self.assertEqual(result['final_price'], '$19.20')
+        self.assertEqual(
+            set(Ticket.objects.filter(booking_id=result['booking_id']).values_list('seat_id', flat=True)),
+            {self.seats[0].seat_id, self.seats[1].seat_id}
+        )
+        self.assertFalse(SeatReservation.objects.filter(user=self.alice).exists())
+        session.refresh_from_db()
+        self.assertEqual((session.status, session.booking_id), ('confirmed', result['booking_id']))
+        with self.assertRaises(serializers.ValidationError):
+            checkout.confirm_session(self.alice, session.session_id, NEW_CARD)
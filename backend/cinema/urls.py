@@ -14,6 +14,7 @@ URL Structure:
 #will only handle urls that config/urls.py sends to it
 from django.urls import path
 from django.views.decorators.csrf import csrf_exempt
+from rest_framework_simplejwt.views import TokenRefreshView
 from . import views, views_admin, views_auth
 
 urlpatterns = [
@@ -42,6 +43,8 @@ urlpatterns = [
     path('api/admin/promotions/create/', views_admin.AdminPromotionCreateView.as_view(), name='admin-promotions-create'),
     path('api/admin/promotions/<int:pk>/', views_admin.AdminPromotionDetailView.as_view(), name='admin-promotions-detail'),
     path('api/admin/promotions/<int:pk>/send-email/', views_admin.AdminPromotionEmailView.as_view(), name='admin-promotions-email'),
+    path('api/admin/promotions/<int:pk>/campaigns/', views_admin.AdminPromotionCampaignListView.as_view(), name='admin-promotions-campaigns'),
+    path('api/admin/campaigns/<int:pk>/', views_admin.AdminPromotionCampaignDetailView.as_view(), name='admin-campaign-detail'),
 
     # Admin Showroom Management
     path('api/admin/showrooms/', views_admin.AdminShowroomListView.as_view(), name='admin-showrooms'),
@@ -51,6 +54,18 @@ urlpatterns = [
     path('api/admin/showings/create/', views_admin.AdminShowingCreateView.as_view(), name='admin-showings-create'),
     path('api/admin/showings/availability/', views_admin.AdminShowingAvailabilityView.as_view(), name='admin-showings-availability'),
     path('api/admin/showings/<int:pk>/', views_admin.AdminShowingDetailView.as_view(), name='admin-showings-detail'),
+    path('api/admin/showings/<int:pk>/admission/', views_admin.AdminShowingAdmissionView.as_view(), name='admin-showings-admission'),
+    path('api/admin/showings/<int:pk>/bulk-change/', views_admin.AdminShowingBulkChangeView.as_view(), name='admin-showings-bulk-change'),
+
+    # Admin Ticket Pricing (price table by showroom, time band and age category)
+    path('api/admin/pricing/', views_admin.AdminTicketPriceListView.as_view(), name='admin-pricing-list'),
+    path('api/admin/pricing/<int:pk>/', views_admin.AdminTicketPriceDetailView.as_view(), name='admin-pricing-detail'),
+
+    # Admin Users (Manage Users page: cursor paged, prefix search, status / subscribed filters)
+    path('api/admin/users/', views_admin.AdminUserListView.as_view(), name='admin-users-list'),
+
+    # Admin Metrics
+    path('api/admin/metrics/rate-limits/', views_admin.AdminRateLimitMetricsView.as_view(), name='admin-metrics-rate-limits'),
 
     # PUBLIC MOVIE ENDPOINTS
     #basic movie endpoints, no parameters necessary
@@ -88,17 +103,25 @@ urlpatterns += [
     # User Logout - POST /api/auth/logout/
     # Blacklists refresh token to invalidate session
     path("api/auth/logout/", LogoutView.as_view(), name="logout"),
+
+    # Token Refresh - POST /api/auth/token/refresh/
+    # Swaps a refresh token for a new access token (and a new refresh token, the old one is blacklisted)
+    path("api/auth/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     #GET + auth token path to get user profile info
 
      # User Profile - GET/PUT /api/auth/profile/
     # GET: Retrieve user profile info | PUT: Update profile info
     path("api/auth/profile/", ProfileView.as_view(), name="profile"),
+
+    # Account - GET /api/auth/me/?include=address,cards,upcoming_bookings
+    # Profile plus address, payment cards and upcoming bookings in one request (cached)
+    path("api/auth/me/", views_auth.MeView.as_view(), name="me"),
     #We need an update profile path too
     #PUT + auth token path to update user profile info
     #GET then check token "?token=..."
 
     # Email Verification - POST /api/auth/verify/
-    # Verifies user email with 6-digit code (expires in 5 minutes)
+    # Verifies user email with 6-digit code (expires in 15 minutes)
     path('api/auth/verify/', verify_email, name='verify_email'),
     #POST then use the email the user inputs
 
@@ -140,6 +163,10 @@ from .views_user import (
     SeatAvailabilityView,
     BookingPreviewView,
     BookingCreateView,
+    CartCheckoutView,
+    CheckoutSessionCreateView,
+    CheckoutSessionDetailView,
+    CheckoutSessionConfirmView,
     BookingListView,
     BookingDetailView,
     MovieShowingsView,
@@ -158,8 +185,14 @@ urlpatterns += [
     path('api/user/bookings/', BookingListView.as_view(), name='user-booking-list'),
     path('api/user/bookings/preview/', BookingPreviewView.as_view(), name='booking-preview'),
     path('api/user/bookings/create/', BookingCreateView.as_view(), name='booking-create'),
+    path('api/user/bookings/cart/', CartCheckoutView.as_view(), name='booking-cart-checkout'),
     path('api/user/bookings/<int:pk>/', BookingDetailView.as_view(), name='user-booking-detail'),
 
+    # Checkout session - seats held server-side, steps send only what changed
+    path('api/user/checkout/', CheckoutSessionCreateView.as_view(), name='checkout-create'),
+    path('api/user/checkout/<uuid:session_id>/', CheckoutSessionDetailView.as_view(), name='checkout-detail'),
+    path('api/user/checkout/<uuid:session_id>/confirm/', CheckoutSessionConfirmView.as_view(), name='checkout-confirm'),
+
     # Browse by Movie - Public access
     path('api/user/movies/<int:movie_id>/showings/', MovieShowingsView.as_view(), name='movie-showings'),
 ]
@@ -198,8 +231,21 @@ urlpatterns += [
 # POST   /api/admin/showings/create/           → Schedule movie
 # GET    /api/admin/showings/<id>/             → Get showing details
 # PUT    /api/admin/showings/<id>/             → Update showing
-# DELETE /api/admin/showings/<id>/             → Delete showing
+# DELETE /api/admin/showings/<id>/             → Delete showing (cancels its bookings first)
 # GET    /api/admin/showings/availability/     → Check availability
+# GET    /api/admin/showings/<id>/admission/   → Waiting room settings + queue numbers
+# PUT    /api/admin/showings/<id>/admission/   → Turn waiting room on/off, set rate and burst
+# GET    /api/admin/showings/<id>/bulk-change/ → Bookings/revenue a bulk change would affect
+# POST   /api/admin/showings/<id>/bulk-change/ → Cancel or move all bookings (streams progress)
+# 
+# Ticket pricing:
+# GET    /api/admin/pricing/                   → Price table rows, time bands, standard prices
+# POST   /api/admin/pricing/                   → Add a price (showroom/all, time band, age category)
+# PUT    /api/admin/pricing/<id>/              → Change a price
+# DELETE /api/admin/pricing/<id>/              → Remove a price
+# 
+# Metrics:
+# GET    /api/admin/metrics/rate-limits/       → Auth rate limits and allowed / limited counters
 # 
 # Promotions:
 # GET    /api/admin/promotions/                → List all promotions
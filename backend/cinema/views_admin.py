@@ -7,19 +7,25 @@ from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework import generics
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import NotFound
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
 from rest_framework_simplejwt.tokens import RefreshToken
 from datetime import timedelta
-from django.db.models import Count
+from django.db.models import Count, Prefetch, Sum
 from django.db.models import Q
 from datetime import datetime, timedelta
-from django.core.mail import send_mail
 from django.conf import settings
-import os
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+import json
 
-from .models import Movie, Promotion, Profile, MovieShowtime, Genre, MovieGenre, Showroom, Showing
-from .serializers import MovieSerializer, PromotionSerializer, ShowingSerializer, ShowroomSerializer
+from .models import Booking, Movie, Promotion, Profile, MovieShowtime, Genre, MovieGenre, Showroom, Showing, ShowingAdmission, Ticket, TicketPrice, PromotionCampaign
+from .serializers import MovieSerializer, PromotionSerializer, ShowingSerializer, ShowroomSerializer, ShowingAdmissionSerializer, TicketPriceSerializer, PromotionCampaignSerializer, AdminUserSerializer
+from .pagination import AdminUserPagination
+from . import campaigns, dashboard, pricing, promotion_cache, ratelimit
+from .admission import AdmissionController
+from .bulk_changes import BulkShowingChange, BulkChangeError, booking_totals
 
 import logging
 
@@ -96,14 +102,8 @@ class AdminHomeView(APIView):
 
     def get(self, request):
         try:
-            # Get statistics
-            total_movies = Movie.objects.count()
-            currently_running = Movie.objects.filter(movie_status='Currently Running').count()
-            coming_soon = Movie.objects.filter(movie_status='Coming Soon').count()
-            active_promotions = Promotion.objects.count()
-            total_users = User.objects.count()
-            active_users = Profile.objects.filter(status='Active').count()
-            total_showtimes = MovieShowtime.objects.count()
+            # snapshot of the statistics, one cache read (cinema/dashboard.py)
+            statistics = dashboard.snapshot()
 
             # Build menu structure
             menu_items = [
@@ -113,7 +113,7 @@ class AdminHomeView(APIView):
                     "description": "Add, edit, or remove movies from the system",
                     "icon": "film",
                     "endpoint": "/admin/movies/",
-                    "count": total_movies
+                    "count": statistics["total_movies"]
                 },
                 {
                     "id": "manage_promotions",
@@ -121,7 +121,7 @@ class AdminHomeView(APIView):
                     "description": "Create and manage promotional offers",
                     "icon": "tag",
                     "endpoint": "/admin/promotions/",
-                    "count": active_promotions
+                    "count": statistics["total_promotions"]
                 },
                 {
                     "id": "manage_users",
@@ -129,7 +129,7 @@ class AdminHomeView(APIView):
                     "description": "View and manage user accounts",
                     "icon": "users",
                     "endpoint": "/admin/users/",
-                    "count": total_users
+                    "count": statistics["total_users"]
                 },
                 {
                     "id": "manage_showtimes",
@@ -137,7 +137,7 @@ class AdminHomeView(APIView):
                     "description": "Schedule and manage movie showtimes",
                     "icon": "clock",
                     "endpoint": "/admin/showtimes/",
-                    "count": total_showtimes
+                    "count": statistics["total_showtimes"]
                 }
             ]
 
@@ -147,15 +147,7 @@ class AdminHomeView(APIView):
                     "email": request.user.email
                 },
                 "menu_items": menu_items,
-                "statistics": {
-                    "total_movies": total_movies,
-                    "currently_running": currently_running,
-                    "coming_soon": coming_soon,
-                    "active_promotions": active_promotions,
-                    "total_users": total_users,
-                    "active_users": active_users,
-                    "total_showtimes": total_showtimes
-                }
+                "statistics": statistics
             }
 
             logger.info(f"Admin home page accessed by: {request.user.username}")
@@ -170,6 +162,29 @@ class AdminHomeView(APIView):
             )
         
 # MOVIE MANAGEMENT
+def _with_genres(movies):
+    """movies with their genres prefetched: one more query however many movies there are"""
+    return movies.prefetch_related(Prefetch(
+        'moviegenre_set',
+        queryset=MovieGenre.objects.select_related('genre').order_by('genre__genre_name'),
+        to_attr='movie_genres',
+    ))
+
+
+def _movie_data(movie):
+    """admin representation of a movie loaded with _with_genres()"""
+    return {
+        'movie_id': movie.movie_id,
+        'movie_title': movie.movie_title,
+        'movie_description': movie.movie_description,
+        'age_rating': movie.age_rating,
+        'poster_url': movie.poster_url,
+        'trailer_url': movie.trailer_url,
+        'movie_status': movie.movie_status,
+        'genres': [movie_genre.genre.genre_name for movie_genre in movie.movie_genres]
+    }
+
+
 class AdminMovieListView(APIView):
     """
     List all movies for admin
@@ -181,23 +196,9 @@ class AdminMovieListView(APIView):
     def get(self, request):
         """Get all movies with their genres"""
         try:
-            movies = Movie.objects.all().order_by('-movie_id')
-            movies_data = []
-            
-            for movie in movies:
-                # Get genres for this movie
-                genres = Genre.objects.filter(moviegenre__movie=movie).values_list('genre_name', flat=True)
-                
-                movies_data.append({
-                    'movie_id': movie.movie_id,
-                    'movie_title': movie.movie_title,
-                    'movie_description': movie.movie_description,
-                    'age_rating': movie.age_rating,
-                    'poster_url': movie.poster_url,
-                    'trailer_url': movie.trailer_url,
-                    'movie_status': movie.movie_status,
-                    'genres': list(genres)
-                })
+            # Two queries: the movies, then the genres of all of them
+            movies = _with_genres(Movie.objects.all().order_by('-movie_id'))
+            movies_data = [_movie_data(movie) for movie in movies]
             
             return Response({
                 'count': len(movies_data),
@@ -239,22 +240,13 @@ class AdminMovieCreateView(APIView):
                 movie = serializer.save()
                 
                 # Get the created movie with genres
-                genres = Genre.objects.filter(moviegenre__movie=movie).values_list('genre_name', flat=True)
+                movie = _with_genres(Movie.objects.filter(pk=movie.pk)).get()
                 
                 logger.info(f"Movie created: {movie.movie_title} by admin {request.user.username}")
                 
                 return Response({
                     'message': 'Movie created successfully',
-                    'movie': {
-                        'movie_id': movie.movie_id,
-                        'movie_title': movie.movie_title,
-                        'movie_description': movie.movie_description,
-                        'age_rating': movie.age_rating,
-                        'poster_url': movie.poster_url,
-                        'trailer_url': movie.trailer_url,
-                        'movie_status': movie.movie_status,
-                        'genres': list(genres)
-                    }
+                    'movie': _movie_data(movie)
                 }, status=status.HTTP_201_CREATED)
             
             # Return validation errors
@@ -284,19 +276,9 @@ class AdminMovieDetailView(APIView):
     def get(self, request, pk):
         """Get movie details"""
         try:
-            movie = Movie.objects.get(pk=pk)
-            genres = Genre.objects.filter(moviegenre__movie=movie).values_list('genre_name', flat=True)
+            movie = _with_genres(Movie.objects.all()).get(pk=pk)
             
-            return Response({
-                'movie_id': movie.movie_id,
-                'movie_title': movie.movie_title,
-                'movie_description': movie.movie_description,
-                'age_rating': movie.age_rating,
-                'poster_url': movie.poster_url,
-                'trailer_url': movie.trailer_url,
-                'movie_status': movie.movie_status,
-                'genres': list(genres)
-            }, status=status.HTTP_200_OK)
+            return Response(_movie_data(movie), status=status.HTTP_200_OK)
             
         except Movie.DoesNotExist:
             return Response(
@@ -318,22 +300,13 @@ class AdminMovieDetailView(APIView):
             
             if serializer.is_valid():
                 updated_movie = serializer.save()
-                genres = Genre.objects.filter(moviegenre__movie=updated_movie).values_list('genre_name', flat=True)
+                updated_movie = _with_genres(Movie.objects.filter(pk=updated_movie.pk)).get()
                 
                 logger.info(f"Movie updated: {updated_movie.movie_title} by admin {request.user.username}")
                 
                 return Response({
                     'message': 'Movie updated successfully',
-                    'movie': {
-                        'movie_id': updated_movie.movie_id,
-                        'movie_title': updated_movie.movie_title,
-                        'movie_description': updated_movie.movie_description,
-                        'age_rating': updated_movie.age_rating,
-                        'poster_url': updated_movie.poster_url,
-                        'trailer_url': updated_movie.trailer_url,
-                        'movie_status': updated_movie.movie_status,
-                        'genres': list(genres)
-                    }
+                    'movie': _movie_data(updated_movie)
                 }, status=status.HTTP_200_OK)
             
             return Response({
@@ -466,9 +439,11 @@ class AdminPromotionCreateView(APIView):
             "start_date": "2026-06-01",
             "end_date": "2026-08-31"
         },
-        "emails_sent": 45,
-        "email_message": "Promotion email sent to 45 subscribed users"
+        "campaign": {"campaign_id": 7, "status": "queued", "total_recipients": 45, ...},
+        "email_message": "Promotion email is being sent to 45 subscribed users"
     }
+
+    emails go out in the background, progress at GET /api/admin/campaigns/<campaign_id>/
     '''
     permission_classes = [IsAuthenticated, IsAdminUser]
     
@@ -482,6 +457,7 @@ class AdminPromotionCreateView(APIView):
             
             if serializer.is_valid():
                 promotion = serializer.save()
+                promotion_cache.invalidate()
                 
                 logger.info(
                     f"Promotion created: {promotion.promo_code} "
@@ -489,19 +465,18 @@ class AdminPromotionCreateView(APIView):
                     f"by admin {request.user.username}"
                 )
                 
-                # Send emails to subscribed users if requested
-                emails_sent = 0
-                if send_email_flag:
-                    emails_sent = self.send_promotion_emails(promotion)
-                
                 response_data = {
                     'message': 'Promotion created successfully',
                     'promotion': PromotionSerializer(promotion).data
                 }
                 
+                # Email subscribed users in the background if requested (cinema/campaigns.py)
                 if send_email_flag:
-                    response_data['emails_sent'] = emails_sent
-                    response_data['email_message'] = f'Promotion email sent to {emails_sent} subscribed users'
+                    campaign = campaigns.start_campaign(promotion, request.user)
+                    response_data['campaign'] = PromotionCampaignSerializer(campaign).data
+                    response_data['email_message'] = (
+                        f'Promotion email is being sent to {campaign.total_recipients} subscribed users'
+                    )
                 
                 return Response(response_data, status=status.HTTP_201_CREATED)
             
@@ -518,66 +493,6 @@ class AdminPromotionCreateView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
-    def send_promotion_emails(self, promotion):
-        """send promotion email to all subscribed users"""
-        # get all users who are subscribed to promotions
-        subscribed_users = User.objects.filter(
-            profile__subscribed=True,
-            is_active=True
-        ).exclude(email='')
-        
-        emails_sent = 0
-        
-        # build email based on discount type
-        if promotion.discount_type == 'percentage':
-            subject = f"🎉 special offer: {promotion.discount_value:.0f}% off!"
-            discount_text = f"{promotion.discount_value:.0f}% OFF"
-        else:
-            subject = f"🎉 special offer: ${promotion.discount_value:.2f} off!"
-            discount_text = f"${promotion.discount_value:.2f} OFF"
-        
-        message = f"""
-Hello!
-
-We have an exciting promotion for you!
-
-promo code: {promotion.promo_code}
-discount: {discount_text}
-valid from: {promotion.start_date.strftime('%B %d, %Y')}
-valid until: {promotion.end_date.strftime('%B %d, %Y')}
-
-Use code \"{promotion.promo_code}\" at checkout to save on your ticket purchase!
-
-Don't miss out on this limited-time offer!
-
-Best regards,
-Cinema e-booking team
-
----
-You're receiving this email because you subscribed to promotional offers
-to unsubscribe, please update your profile settings.
-        """
-        
-        for user in subscribed_users:
-            try:
-                send_mail(
-                    subject=subject,
-                    message=message,
-                    #from_email=settings.DEFAULT_FROM_EMAIL,
-                    from_email=os.getenv("GMAIL_EMAIL"),
-                    recipient_list=[user.email],
-                    fail_silently=False,
-                )
-                emails_sent += 1
-                logger.info(f"Promotion email sent to {user.email}")
-            except Exception as e:
-                logger.error(f"Failed to send email to {user.email}: {e}")
-                continue
-        
-        logger.info(f"Promotion emails sent: {emails_sent} out of {subscribed_users.count()} subscribed users")
-        
-        return emails_sent
-    
 class AdminPromotionDetailView(APIView):
     '''
     get, update, or delete a specific promotion
@@ -632,6 +547,7 @@ class AdminPromotionDetailView(APIView):
             
             if serializer.is_valid():
                 updated_promotion = serializer.save()
+                promotion_cache.invalidate()
                 
                 logger.info(
                     f"Promotion updated: {updated_promotion.promo_code} "
@@ -668,6 +584,7 @@ class AdminPromotionDetailView(APIView):
             promo_code = promotion.promo_code
             
             promotion.delete()
+            promotion_cache.invalidate()
             
             logger.info(f"Promotion deleted: {promo_code} by admin {request.user.username}")
             
@@ -695,99 +612,155 @@ class AdminPromotionEmailView(APIView):
     
     POST /api/admin/promotions/<id>/send-email/
     
-    Response:
+    Response (202, emails go out in the background, see cinema/campaigns.py):
     {
-        "message": "Promotion email sent to 45 subscribed users",
-        "emails_sent": 45,
-        "total_subscribed": 50
+        "message": "Promotion email is being sent to 50 subscribed users",
+        "campaign": {"campaign_id": 7, "status": "queued", "total_recipients": 50, ...}
     }
+
+    progress at GET /api/admin/campaigns/<campaign_id>/
     '''
     permission_classes = [IsAuthenticated, IsAdminUser]
     
     def post(self, request, pk):
-        """send promotion email to subscribed users"""
+        """queue the promotion email for subscribed users"""
         try:
             promotion = Promotion.objects.get(pk=pk)
-            
-            # get subscribed users
-            subscribed_users = User.objects.filter(
-                profile__subscribed=True,
-                is_active=True
-            ).exclude(email='')
-            
-            if subscribed_users.count() == 0:
+
+            if not campaigns.subscribers().exists():
                 return Response({
                     'message': 'no subscribed users to send email to',
                     'emails_sent': 0
                 }, status=status.HTTP_200_OK)
+
+            campaign = campaigns.start_campaign(promotion, request.user)
+
+            logger.info(
+                f"Promotion {promotion.promo_code} campaign #{campaign.campaign_id} "
+                f"({campaign.total_recipients} recipients) started by admin {request.user.username}"
+            )
             
-            # send emails
-            emails_sent = 0
-            
-            # build email based on discount type
-            if promotion.discount_type == 'percentage':
-                subject = f"🎉 special offer: {promotion.discount_value:.0f}% off!"
-                discount_text = f"{promotion.discount_value:.0f}% OFF"
-            else:
-                subject = f"🎉 special offer: ${promotion.discount_value:.2f} off!"
-                discount_text = f"${promotion.discount_value:.2f} OFF"
+            return Response({
+                'message': f'Promotion email is being sent to {campaign.total_recipients} subscribed users',
+                'campaign': PromotionCampaignSerializer(campaign).data
+            }, status=status.HTTP_202_ACCEPTED)
             
-            message = f"""
-Hello!
+        except Promotion.DoesNotExist:
+            return Response(
+                {"error": "Promotion not found"}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except Exception as e:
+            logger.error(f"Error starting promotion email campaign: {e}")
+            return Response(
+                {"error": f"Failed to send emails: {str(e)}"}, 
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
 
-We have an exciting promotion for you!
 
-promo code: {promotion.promo_code}
-discount: {discount_text}
-valid from: {promotion.start_date.strftime('%B %d, %Y')}
-valid until: {promotion.end_date.strftime('%B %d, %Y')}
+class AdminPromotionCampaignListView(APIView):
+    '''
+    email campaigns of a promotion, newest first
 
-Use code \"{promotion.promo_code}\" at checkout to save on your ticket purchase!
+    GET /api/admin/promotions/<id>/campaigns/
+    '''
+    permission_classes = [IsAuthenticated, IsAdminUser]
 
-Don't miss out on this limited-time offer!
+    def get(self, request, pk):
+        """list campaigns with their progress"""
+        try:
+            if not Promotion.objects.filter(pk=pk).exists():
+                raise Promotion.DoesNotExist
 
-Best regards,
-Cinema e-booking team
+            promotion_campaigns = PromotionCampaign.objects.select_related('promotion').filter(
+                promotion_id=pk
+            ).order_by('-campaign_id')
 
----
-You're receiving this email because you subscribed to promotional offers
-to unsubscribe, please update your profile settings.
-            """
-            
-            for user in subscribed_users:
-                try:
-                    send_mail(
-                        subject=subject,
-                        message=message,
-                        from_email=settings.DEFAULT_FROM_EMAIL,
-                        recipient_list=[user.email],
-                        fail_silently=False,
-                    )
-                    emails_sent += 1
-                except Exception as e:
-                    logger.error(f"Failed to send email to {user.email}: {e}")
-                    continue
-            
-            logger.info(
-                f"Promotion {promotion.promo_code} emailed to {emails_sent} users "
-                f"by admin {request.user.username}"
-            )
-            
             return Response({
-                'message': f'Promotion email sent to {emails_sent} subscribed users',
-                'emails_sent': emails_sent,
-                'total_subscribed': subscribed_users.count()
+                'campaigns': PromotionCampaignSerializer(promotion_campaigns, many=True).data
             }, status=status.HTTP_200_OK)
-            
+
         except Promotion.DoesNotExist:
             return Response(
-                {"error": "Promotion not found"}, 
+                {"error": "Promotion not found"},
                 status=status.HTTP_404_NOT_FOUND
             )
         except Exception as e:
-            logger.error(f"Error sending promotion emails: {e}")
+            logger.error(f"Error retrieving promotion campaigns: {e}")
             return Response(
-                {"error": f"Failed to send emails: {str(e)}"}, 
+                {"error": "Failed to retrieve campaigns"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class AdminPromotionCampaignDetailView(APIView):
+    '''
+    progress of a promotion email campaign, or cancel it
+
+    GET    /api/admin/campaigns/<id>/
+    DELETE /api/admin/campaigns/<id>/   (stops after the chunk being sent)
+
+    Response:
+    {
+        "campaign_id": 7,
+        "promo_code": "SUMMER2026",
+        "status": "running",        // queued, running, completed, cancelled, failed
+        "total_recipients": 50000,
+        "sent_count": 12000,
+        "failed_count": 3,
+        "processed": 12003,
+        "percent_complete": 24.0,
+        ...
+    }
+    '''
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request, pk):
+        """campaign status and progress"""
+        try:
+            campaign = PromotionCampaign.objects.select_related('promotion').get(pk=pk)
+            return Response(PromotionCampaignSerializer(campaign).data, status=status.HTTP_200_OK)
+
+        except PromotionCampaign.DoesNotExist:
+            return Response(
+                {"error": "Campaign not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except Exception as e:
+            logger.error(f"Error retrieving campaign: {e}")
+            return Response(
+                {"error": "Failed to retrieve campaign"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    def delete(self, request, pk):
+        """cancel a queued or running campaign"""
+        try:
+            campaign = PromotionCampaign.objects.select_related('promotion').get(pk=pk)
+
+            if not campaigns.cancel_campaign(campaign.campaign_id):
+                return Response(
+                    {"error": f"Campaign is already {campaign.status}"},
+                    status=status.HTTP_409_CONFLICT
+                )
+
+            logger.info(f"Campaign #{pk} cancelled by admin {request.user.username}")
+
+            campaign.refresh_from_db()
+            return Response({
+                'message': 'Campaign cancelled',
+                'campaign': PromotionCampaignSerializer(campaign).data
+            }, status=status.HTTP_200_OK)
+
+        except PromotionCampaign.DoesNotExist:
+            return Response(
+                {"error": "Campaign not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except Exception as e:
+            logger.error(f"Error cancelling campaign: {e}")
+            return Response(
+                {"error": "Failed to cancel campaign"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
@@ -962,6 +935,18 @@ class AdminShowingDetailView(APIView):
             serializer = ShowingSerializer(showing, data=request.data, partial=True)
             
             if serializer.is_valid():
+                # sold tickets point at seats of the current showroom
+                new_showroom_id = serializer.validated_data.get('showroom_id')
+                if (
+                    new_showroom_id is not None
+                    and new_showroom_id != showing.showroom_id
+                    and Ticket.objects.filter(showing_id=pk).exists()
+                ):
+                    return Response({
+                        'error': 'This showing has bookings. Create the new showing and move the '
+                                 'bookings with /api/admin/showings/<id>/bulk-change/ instead.'
+                    }, status=status.HTTP_409_CONFLICT)
+
                 updated_showing = serializer.save()
                 
                 logger.info(
@@ -992,17 +977,29 @@ class AdminShowingDetailView(APIView):
             )
     
     def delete(self, request, pk):
-        """Delete showing"""
+        """Delete showing, cancelling its bookings first"""
         try:
             showing = Showing.objects.select_related('movie', 'showroom').get(pk=pk)
             showing_info = f"{showing.movie.movie_title} in {showing.showroom.showroom_name} at {showing.start_time}"
             
+            # otherwise the tickets cascade away and leave empty, still paid bookings
+            result = BulkShowingChange(pk, 'cancel').run_all()
+            if result['failed']:
+                return Response({
+                    'error': 'Some bookings could not be cancelled, the showing was not deleted',
+                    'report': result['report']
+                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
             showing.delete()
             
-            logger.info(f"Showing deleted: {showing_info} by admin {request.user.username}")
+            logger.info(
+                f"Showing deleted: {showing_info} by admin {request.user.username} "
+                f"({result['cancelled']} bookings cancelled)"
+            )
             
             return Response({
-                'message': f'Showing deleted successfully'
+                'message': f'Showing deleted successfully',
+                'cancelled_bookings': result['report']
             }, status=status.HTTP_200_OK)
             
         except Showing.DoesNotExist:
@@ -1018,6 +1015,163 @@ class AdminShowingDetailView(APIView):
             )
 
 
+class AdminShowingBulkChangeView(APIView):
+    """
+    Cancel or move every booking of a showing (see cinema/bulk_changes.py)
+
+    GET  /api/admin/showings/<id>/bulk-change/   → bookings, tickets and revenue affected
+    POST /api/admin/showings/<id>/bulk-change/
+
+    Request body:
+    {
+        "action": "move",                   // "cancel" or "move"
+        "target_showing_id": 57,            // required for "move"
+        "seat_strategy": "best_available",  // or "same_seat"
+        "chunk_size": 50,                   // bookings per transaction (optional)
+        "stream": true                      // optional, default true
+    }
+
+    With stream=true the response is newline-delimited JSON, one progress event
+    per line, ending with {"event": "done", ..., "report": [...]}. With
+    stream=false only the final event is returned.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request, pk):
+        """What a bulk change would affect"""
+        if not Showing.objects.filter(pk=pk).exists():
+            return Response(
+                {"error": "Showing not found"}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(booking_totals(pk), status=status.HTTP_200_OK)
+
+    def post(self, request, pk):
+        """Run the bulk change"""
+        try:
+            target_showing_id = request.data.get('target_showing_id')
+            change = BulkShowingChange(
+                pk,
+                request.data.get('action'),
+                target_showing_id=int(target_showing_id) if target_showing_id else None,
+                seat_strategy=request.data.get('seat_strategy', 'best_available'),
+                chunk_size=request.data.get('chunk_size', 50)
+            )
+        except (BulkChangeError, TypeError, ValueError) as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        logger.info(
+            f"Bulk {change.action} of showing {pk} started by admin {request.user.username}"
+        )
+
+        if str(request.data.get('stream', True)).lower() in ('false', '0'):
+            result = change.run_all()
+            logger.info(f"Bulk {change.action} of showing {pk} finished: {result['cancelled']} cancelled, "
+                        f"{result['moved']} moved, {result['failed']} failed")
+            return Response(result, status=status.HTTP_200_OK)
+
+        def events():
+            for event in change.run():
+                if event['event'] == 'done':
+                    logger.info(f"Bulk {change.action} of showing {pk} finished: {event['cancelled']} cancelled, "
+                                f"{event['moved']} moved, {event['failed']} failed")
+                yield json.dumps(event, cls=DjangoJSONEncoder) + "\n"
+
+        response = StreamingHttpResponse(events(), content_type='application/x-ndjson')
+        # don't let proxies hold the progress back
+        response['X-Accel-Buffering'] = 'no'
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+
+class AdminShowingAdmissionView(APIView):
+    """
+    Get or change the waiting room settings of a showing
+    
+    GET /api/admin/showings/<id>/admission/
+    PUT /api/admin/showings/<id>/admission/
+    
+    Request body (all fields optional):
+    {
+        "enabled": true,
+        "admits_per_minute": 120,  // token bucket refill rate
+        "burst": 50,               // users let in right away
+        "pass_ttl_minutes": 10     // how long an admitted user can keep booking
+    }
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request, pk):
+        """Get admission settings and live queue numbers"""
+        try:
+            showing = Showing.objects.get(pk=pk)
+            admission = ShowingAdmission.objects.filter(showing=showing).first()
+            if admission is None:
+                # not configured yet, show the defaults
+                admission = ShowingAdmission(showing=showing)
+
+            data = ShowingAdmissionSerializer(admission).data
+            data['queue'] = AdmissionController(
+                showing.showing_id,
+                admission.admits_per_minute,
+                admission.burst,
+                admission.pass_ttl_minutes
+            ).stats()
+
+            return Response(data, status=status.HTTP_200_OK)
+
+        except Showing.DoesNotExist:
+            return Response(
+                {"error": "Showing not found"}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except Exception as e:
+            logger.error(f"Error retrieving admission settings: {e}")
+            return Response(
+                {"error": "Failed to retrieve admission settings"}, 
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    def put(self, request, pk):
+        """Create or update admission settings"""
+        try:
+            showing = Showing.objects.get(pk=pk)
+            admission = ShowingAdmission.objects.filter(showing=showing).first()
+            serializer = ShowingAdmissionSerializer(admission, data=request.data, partial=True)
+
+            if serializer.is_valid():
+                admission = serializer.save(showing=showing)
+                AdmissionController.invalidate_config(showing.showing_id)
+
+                logger.info(
+                    f"Admission settings for showing #{showing.showing_id} updated "
+                    f"(enabled={admission.enabled}, {admission.admits_per_minute}/min, "
+                    f"burst {admission.burst}) by admin {request.user.username}"
+                )
+
+                return Response({
+                    'message': 'Admission settings updated successfully',
+                    'admission': ShowingAdmissionSerializer(admission).data
+                }, status=status.HTTP_200_OK)
+
+            return Response({
+                'error': 'Validation failed',
+                'details': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        except Showing.DoesNotExist:
+            return Response(
+                {"error": "Showing not found"}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except Exception as e:
+            logger.error(f"Error updating admission settings: {e}")
+            return Response(
+                {"error": f"Failed to update admission settings: {str(e)}"}, 
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
 class AdminShowingAvailabilityView(APIView):
     """
     Check showroom availability for a given date/time
@@ -1084,4 +1238,281 @@ class AdminShowingAvailabilityView(APIView):
             return Response(
                 {"error": "Failed to check availability"}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+            )
+
+class AdminTicketPriceListView(APIView):
+    """
+    List or add rows of the ticket price table (see cinema/pricing.py)
+
+    GET  /api/admin/pricing/
+    POST /api/admin/pricing/
+
+    Request body:
+    {
+        "showroom_id": 2,          // null = every showroom
+        "time_band": "evening",    // "any", "matinee", "evening" or "late"
+        "age_category": "Adult",
+        "price": "14.50"
+    }
+
+    The most specific row wins (showroom + band, showroom, band, all), categories
+    without a row keep the standard price. Changes apply to new bookings right away.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        """Price rows plus the bands and standard prices they override"""
+        try:
+            prices = TicketPrice.objects.select_related('showroom').order_by(
+                'showroom_id', 'time_band', 'age_category'
+            )
+            return Response({
+                'prices': TicketPriceSerializer(prices, many=True).data,
+                'time_bands': pricing.band_hours(),
+                'standard_prices': {category: f"{price:.2f}" for category, price in pricing.STANDARD_PRICES.items()},
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            logger.error(f"Error retrieving ticket prices: {e}")
+            return Response(
+                {"error": "Failed to retrieve ticket prices"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    def post(self, request):
+        """Add a price row"""
+        try:
+            serializer = TicketPriceSerializer(data=request.data)
+
+            if serializer.is_valid():
+                price = serializer.save()
+                pricing.invalidate()
+
+                logger.info(f"Ticket price added: {price} by admin {request.user.username}")
+
+                return Response({
+                    'message': 'Ticket price added successfully',
+                    'price': TicketPriceSerializer(price).data
+                }, status=status.HTTP_201_CREATED)
+
+            return Response({
+                'error': 'Validation failed',
+                'details': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        except Exception as e:
+            logger.error(f"Error adding ticket price: {e}")
+            return Response(
+                {"error": f"Failed to add ticket price: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class AdminTicketPriceDetailView(APIView):
+    """
+    Change or remove a row of the ticket price table
+
+    PUT    /api/admin/pricing/<id>/   (fields as for POST /api/admin/pricing/, all optional)
+    DELETE /api/admin/pricing/<id>/   (the standard or a less specific price applies again)
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def put(self, request, pk):
+        """Update a price row"""
+        try:
+            price = TicketPrice.objects.get(pk=pk)
+            serializer = TicketPriceSerializer(price, data=request.data, partial=True)
+
+            if serializer.is_valid():
+                price = serializer.save()
+                pricing.invalidate()
+
+                logger.info(f"Ticket price #{pk} updated: {price} by admin {request.user.username}")
+
+                return Response({
+                    'message': 'Ticket price updated successfully',
+                    'price': TicketPriceSerializer(price).data
+                }, status=status.HTTP_200_OK)
+
+            return Response({
+                'error': 'Validation failed',
+                'details': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        except TicketPrice.DoesNotExist:
+            return Response(
+                {"error": "Ticket price not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except Exception as e:
+            logger.error(f"Error updating ticket price: {e}")
+            return Response(
+                {"error": f"Failed to update ticket price: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    def delete(self, request, pk):
+        """Remove a price row"""
+        try:
+            price = TicketPrice.objects.get(pk=pk)
+            price.delete()
+            pricing.invalidate()
+
+            logger.info(f"Ticket price #{pk} deleted by admin {request.user.username}")
+
+            return Response(
+                {"message": "Ticket price deleted successfully"},
+                status=status.HTTP_200_OK
+            )
+
+        except TicketPrice.DoesNotExist:
+            return Response(
+                {"error": "Ticket price not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except Exception as e:
+            logger.error(f"Error deleting ticket price: {e}")
+            return Response(
+                {"error": "Failed to delete ticket price"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+# USER MANAGEMENT
+class AdminUserListView(APIView):
+    """
+    List users for the Manage Users page, newest first.
+
+    GET /api/admin/users/
+    GET /api/admin/users/?search=jo                 (username or email starting with "jo")
+    GET /api/admin/users/?status=active             (or inactive, email not verified yet)
+    GET /api/admin/users/?subscribed=true           (or false, promotion emails)
+    GET /api/admin/users/?cursor=...                (follow "next" / "previous")
+    GET /api/admin/users/?page_size=50              (25 by default, at most 100)
+
+    Two queries whatever the number of users: the page (users with their
+    profiles, by cursor on the user id, prefix search on the username and
+    email indexes) and one grouped query on bookings for the booking count and
+    lifetime spend of the users on it.
+
+    Example response:
+    {
+        "next": "http://.../api/admin/users/?cursor=cD0xMjM0",
+        "previous": null,
+        "users": [
+            {
+                "id": 1234,
+                "username": "john",
+                "email": "john@example.com",
+                "first_name": "John",
+                "last_name": "Doe",
+                "is_active": true,
+                "is_staff": false,
+                "date_joined": "2025-11-02T18:20:00Z",
+                "last_login": "2025-12-01T09:12:00Z",
+                "phone": "4045551234",
+                "subscribed": true,
+                "booking_count": 3,
+                "lifetime_spend": "54.00"
+            },
+            ...
+        ]
+    }
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    BOOLEAN_VALUES = {'true': True, '1': True, 'false': False, '0': False}
+
+    def get(self, request):
+        try:
+            users = User.objects.select_related('profile')
+
+            search = request.query_params.get('search', '').strip()
+            if search:
+                # prefix matches only, so the username and email indexes are used
+                users = users.filter(Q(username__istartswith=search) | Q(email__istartswith=search))
+
+            user_status = request.query_params.get('status')
+            if user_status == 'active':
+                users = users.filter(is_active=True)
+            elif user_status == 'inactive':
+                users = users.filter(is_active=False)
+            elif user_status:
+                return Response(
+                    {"error": "status must be 'active' or 'inactive'"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            subscribed = request.query_params.get('subscribed')
+            if subscribed:
+                if subscribed.lower() not in self.BOOLEAN_VALUES:
+                    return Response(
+                        {"error": "subscribed must be 'true' or 'false'"},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                users = users.filter(profile__subscribed=self.BOOLEAN_VALUES[subscribed.lower()])
+
+            paginator = AdminUserPagination()
+            page = paginator.paginate_queryset(users, request, view=self)
+
+            # booking count and lifetime spend of the users on this page, one grouped query
+            totals = {
+                row['user_id']: row
+                for row in Booking.objects.filter(user_id__in=[user.id for user in page])
+                .order_by()
+                .values('user_id')
+                .annotate(booking_count=Count('booking_id'), lifetime_spend=Sum('total_price'))
+            }
+            for user in page:
+                row = totals.get(user.id)
+                if row:
+                    user.booking_count = row['booking_count']
+                    user.lifetime_spend = row['lifetime_spend']
+
+            return paginator.get_paginated_response(AdminUserSerializer(page, many=True).data)
+
+        except NotFound:
+            return Response({"error": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error(f"Error listing users: {e}")
+            return Response(
+                {"error": "Failed to retrieve users"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+# ADMIN METRICS
+class AdminRateLimitMetricsView(APIView):
+    """
+    Rate limiting of the auth endpoints (see cinema/ratelimit.py).
+
+    GET /api/admin/metrics/rate-limits/
+
+    Example response:
+    {
+        "store": "CacheCounterStore",
+        "endpoints": {
+            "login": {
+                "allowed": 1520,
+                "limited": {"ip": 37, "username": 212},
+                "limits": [
+                    {"key": "ip", "limit": 20, "window_seconds": 60},
+                    {"key": "username", "limit": 5, "window_seconds": 60},
+                    ...
+                ]
+            },
+            ...
+        }
+    }
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        try:
+            return Response(ratelimit.metrics(), status=status.HTTP_200_OK)
+        except Exception as e:
+            logger.error(f"Error reading rate limit metrics: {e}")
+            return Response(
+                {"error": "Failed to read rate limit metrics"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
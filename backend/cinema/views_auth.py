@@ -12,95 +12,50 @@ Includes:
 - Billing address management
 - Payment card management (encrypted storage)
 '''
-import os
-import smtplib
-import random
 from django.contrib.auth import authenticate
-from django.core.mail import send_mail
+from django.db import transaction
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import generics, status
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
 from datetime import timedelta
 from django.utils import timezone
 from rest_framework.decorators import api_view
 from django.contrib.auth.models import User
 from .models import Profile, PaymentCard, Address
+from . import account, emails, one_time_codes
+from .revocation import BloomRefreshToken
 from .serializers import RegisterSerializer, LoginSerializer, ProfileSerializer, PaymentCardSerializer, AddressSerializer, UserDetailSerializer
+import logging
+
+logger = logging.getLogger(__name__)
 
 # --- Registration ---
 class RegisterView(generics.CreateAPIView):
    
     serializer_class = RegisterSerializer
 
+    # one transaction: user, profile, address and verification code rows
+    # plus the queued verification email, nothing else is written
+    @transaction.atomic
     def perform_create(self, serializer):
+        # the user is created inactive (until the email is verified)
         user = serializer.save()
-        # prints for debugging
-        print("User registered successfully!:", user.username)
-        
-        # will be inactive until email verified
-        user.is_active = False
-        user.save()
-        print("User is inactive until email is verified.")
+        logger.info(f"User registered: {user.username}")
 
-        # generate random 6-digit verification code
-        verification_code = str(random.randint(100000, 999999))
-        print(f"Generated verification code: {verification_code}")
+        # 6-digit code, only its hash is stored (cinema/one_time_codes.py)
+        verification_code = one_time_codes.issue(user, one_time_codes.VERIFY_EMAIL)
 
-        # create/get profile and save verification code
-        try:
-            profile, created = Profile.objects.get_or_create(user=user)
-            profile.verification_code = verification_code
-            profile.verification_code_created_at = timezone.now()
-            profile.status = "Inactive"  # status set to Inactive
-            profile.save()
-            print(f"Verification code saved to database: {verification_code}")
-        except Exception as e:
-            print(f"Error saving verification code: {e}")
-            return
-        
         #link to verification
         verification_link = f"http://localhost:5173/verify?email={user.email}"
-        print(f"Verification link: {verification_link}")
-        
-        try:
-            #smtp session created
-            s = smtplib.SMTP('smtp.gmail.com', 587)
-            #start TLS for security
-            s.starttls()
-
-            # Get Gmail credentials from environment variables
-            gmail_email = os.getenv("GMAIL_EMAIL")
-            gmail_password = os.getenv("GMAIL_PASS")
-
-            #authentication
-            print(f"Gmail email: {gmail_email}")
-            print(f"Gmail password loaded: {'Yes' if gmail_password else 'No'}")
-
-            # login to gmail
-            s.login(gmail_email, gmail_password)
-
-            #message
-            message = (
-                f"Subject: CES Account Verification\n\n"
-                f"Hello {user.username},\n\n"
-                f"Thank you for registering with Cinema E-Booking System!\n\n"
-                f"Please verify your account by entering the following code:\n"
-                f"{verification_code}\n\n"
-                f"Go to: {verification_link}\n\n"
-                f"This code will expire in 15 minutes.\n\n"
-                f"Thank you,\nCES Team"
-            )
-
-            #sending the mail
-            s.sendmail(gmail_email, user.email, message)
-            s.quit()
-            print(f"Verification email sent to {user.email}")
 
-        except Exception as e:
-            print(f"Error sending email: {e}")
-            pass
+        # queued, the outbox worker sends it once registration has committed
+        emails.queue('verification', user.email, {
+            'username': user.username,
+            'code': verification_code,
+            'verification_link': verification_link,
+            'expires_minutes': one_time_codes.expires_minutes(),
+        })
 
 # --- Login ---
 class LoginView(APIView):
@@ -119,7 +74,7 @@ class LoginView(APIView):
                 "code": "EMAIL_NOT_VERIFIED"
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        refresh = RefreshToken.for_user(user)
+        refresh = BloomRefreshToken.for_user(user)
         #getting remember_me from data
         remember_me = s.validated_data.get("remember_me", False)
 
@@ -143,7 +98,8 @@ class LogoutView(APIView):
     def post(self, request):
         try:
             refresh_token = request.data["refresh"]
-            token = RefreshToken(refresh_token)
+            # blacklisted in the database and the Bloom filter (cinema/revocation.py)
+            token = BloomRefreshToken(refresh_token)
             token.blacklist()
             return Response({"message": "Logout successful"}, status=status.HTTP_200_OK)
         except Exception:
@@ -175,6 +131,44 @@ class ProfileView(APIView):
             return Response({"error": "Profile not found"}, status=status.HTTP_404_NOT_FOUND)
         
 
+# --- Account ("me") ---
+class MeView(APIView):
+    """
+    Profile of the logged in user plus, on request, their address, payment
+    cards and upcoming bookings, in one round trip.
+
+    **Endpoint:** GET /api/auth/me/?include=address,cards,upcoming_bookings
+
+    **Authentication:** Required (IsAuthenticated)
+
+    **Output (Success - 200 OK):**
+        {
+            "id": 7,
+            "is_staff": false,
+            "profile": {"username": "john", "email": "john@example.com", ...},
+            "address": {"id": 1, "street": "123 Main St", ...},        // include=address, null if none
+            "cards": [{"id": 3, "brand": "Visa", ...}],                // include=cards
+            "upcoming_bookings": [{"booking_id": 123, ...}]            // include=upcoming_bookings
+        }
+
+    **Output (Error - 400 Bad Request):**
+        {
+            "error": "include can only name address, cards, upcoming_bookings (got orders)"
+        }
+
+    One query, plus one per included list, and cached per user until their
+    profile, address, cards or bookings change (cinema/account.py).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            include = account.parse_include(request.query_params.get('include'))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(account.get(request.user.id, include))
+
+
 @api_view(['POST'])
 def verify_email(request):
     """
@@ -210,14 +204,14 @@ def verify_email(request):
         }
     
     **Behavior:**
-        1. Looks up user by email
-        2. Validates verification code
-        3. Checks if code expired (5-minute expiration)
+        1. Looks up the verification code of the email (one index lookup)
+        2. Validates the code (5 wrong codes and it is thrown away)
+        3. Checks if code expired (15-minute expiration)
         4. Activates user account (sets is_active=True)
-        5. Deletes verification token
+        5. Deletes the code
     
     **Code Expiration:**
-        - Codes expire 5 minutes after creation
+        - Codes expire 15 minutes after creation (ONE_TIME_CODE_TTL)
         - Expired codes return error
         - User must request new code via registration or forgot password
     
@@ -234,65 +228,41 @@ def verify_email(request):
                 'error': 'Email and verification code are required'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # find the most recent INACTIVE user with this email
-        user = User.objects.filter(
-            email=email, 
-            is_active=False
-        ).order_by('-date_joined').first()
-        
-        if not user:
-            # check if user already verified
-            active_user = User.objects.filter(email=email, is_active=True).first()
-            if active_user:
+        # the code row points at the user, no search of auth_user by email
+        try:
+            user_id = one_time_codes.consume(email, one_time_codes.VERIFY_EMAIL, verification_code)
+        except one_time_codes.CodeError as e:
+            if e.reason == 'expired':
+                return Response({
+                    'error': 'Verification code has expired'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            if e.reason == 'invalid':
+                return Response({
+                    'error': 'Invalid verification code'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            # no pending code: check if user already verified
+            if User.objects.filter(email=email, is_active=True).exists():
                 return Response({
                     'message': 'Account already verified'
                 }, status=status.HTTP_200_OK)
-            else:
-                return Response({
-                    'error': 'No pending verification found for this email'
-                }, status=status.HTTP_404_NOT_FOUND)
-        
-        # Get user profile and check code
-        try:
-            profile = Profile.objects.get(user=user)
-        except Profile.DoesNotExist:
             return Response({
-                'error': 'Profile not found'
+                'error': 'No pending verification found for this email'
             }, status=status.HTTP_404_NOT_FOUND)
+
+        # SUCCESS: Activate the user and update profile status
+        with transaction.atomic():
+            user = User.objects.select_related('profile').get(pk=user_id)
+            user.is_active = True
+            user.save(update_fields=['is_active'])
+            user.profile.status = "Active"
+            user.profile.save(update_fields=['status'])
         
-        #Check if code expired (5 minutes)
-        if profile.verification_code_created_at:
-            expiration_time = profile.verification_code_created_at + timedelta(minutes=5)
-            if timezone.now() > expiration_time:
-                return Response({
-                    'error': 'Verification code has expired'
-                }, status=status.HTTP_400_BAD_REQUEST)
+        logger.info(f"User {user.username} verified")
         
-        # Verify code matches
-        if profile.verification_code == verification_code:
-            # SUCCESS: Activate the user
-            profile.verification_code = None
-            profile.verification_code_created_at = None
-            profile.save()
-            user.is_active = True
-            user.save()
-            
-            # Update profile status and clear verification code
-            profile.status = "Active"
-            profile.verification_code = None
-            profile.verification_code_created_at = None
-            profile.save()
-            
-            print(f"User {user.username} verified successfully!")
-            
-            return Response({
-                'message': 'Email verified successfully! You can now login.',
-                'success': True
-            }, status=status.HTTP_200_OK)
-        else:
-            return Response({
-                'error': 'Invalid verification code'
-            }, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'message': 'Email verified successfully! You can now login.',
+            'success': True
+        }, status=status.HTTP_200_OK)
             
     except Exception as e:
         return Response({
@@ -316,44 +286,17 @@ class ForgotPasswordView(APIView):
                     'message': 'If an account with that email exists, a reset code has been sent.'
                 }, status=status.HTTP_200_OK)
             
-            reset_code = str(random.randint(100000, 999999))
-
-            try:
-                profile = Profile.objects.get(user=user)
-                #just reuses verification code field
-                profile.verification_code = reset_code
-                profile.verification_code_created_at = timezone.now()
-                profile.save()
-                print(f"Password reset code saved to database: {reset_code}")
-            except Profile.DoesNotExist:
-                return Response({'error': 'Profile not found'}, status=status.HTTP_404_NOT_FOUND)
-            
-            try:
-                s = smtplib.SMTP('smtp.gmail.com', 587)
-                s.starttls()
-                
-                gmail_email = os.getenv("GMAIL_EMAIL")
-                gmail_password = os.getenv("GMAIL_PASS")
-                
-                s.login(gmail_email, gmail_password)
-                
-                message = (
-                    f"Subject: CES Password Reset\n\n"
-                    f"Hello {user.username},\n\n"
-                    f"You requested to reset your password.\n\n"
-                    f"Your password reset code is:\n"
-                    f"{reset_code}\n\n"
-                    f"This code will expire in 15 minutes.\n\n"
-                    f"If you didn't request this, please ignore this email.\n\n"
-                    f"Thank you,\nCES Team"
-                )
-                
-                s.sendmail(gmail_email, user.email, message)
-                s.quit()
-                print(f"Reset email sent to {user.email}")
-                
-            except Exception as e:
-                print(f"Error sending reset email: {e}")
+            # the code and its email are saved together, a new code replaces
+            # the previous one (cinema/one_time_codes.py)
+            with transaction.atomic():
+                reset_code = one_time_codes.issue(user, one_time_codes.RESET_PASSWORD)
+                logger.info(f"Password reset code issued for {user.username}")
+
+                emails.queue('password_reset', user.email, {
+                    'username': user.username,
+                    'code': reset_code,
+                    'expires_minutes': one_time_codes.expires_minutes(),
+                })
             
             return Response({
                 'message': 'If an account exists with this email, a reset code has been sent'
@@ -376,35 +319,28 @@ class ResetPasswordView(APIView):
             if not email or not reset_code or not new_password:
                 return Response({'error': 'Email, reset code, and new password are required'}, status=status.HTTP_400_BAD_REQUEST)
 
-            #find user (has to be active)
-            user = User.objects.filter(email=email, is_active=True).first()
-
-            if not user:
-                return Response({'error': 'Invalid email or reset code'}, status=status.HTTP_400_BAD_REQUEST)
-
+            # the code row points at the user, one index lookup
             try:
-                profile = Profile.objects.get(user=user)
-            except Profile.DoesNotExist:
-                return Response({'error': 'Profile not found'}, status=status.HTTP_404_NOT_FOUND)
-
-            if profile.verification_code_created_at:
-                expiration_time = profile.verification_code_created_at + timedelta(minutes=5)
-                if timezone.now() > expiration_time:
+                user_id = one_time_codes.consume(email, one_time_codes.RESET_PASSWORD, reset_code)
+            except one_time_codes.CodeError as e:
+                if e.reason == 'expired':
                     return Response({
                         'error': 'Verification code has expired'
                     }, status=status.HTTP_400_BAD_REQUEST)
+                if e.reason == 'invalid':
+                    return Response({'error': 'Invalid reset code'}, status=status.HTTP_400_BAD_REQUEST)
+                return Response({'error': 'Invalid email or reset code'}, status=status.HTTP_400_BAD_REQUEST)
 
-            if profile.verification_code != reset_code:
-                return Response({'error': 'Invalid reset code'}, status=status.HTTP_400_BAD_REQUEST)
+            #user has to be active
+            user = User.objects.filter(pk=user_id, is_active=True).first()
+
+            if not user:
+                return Response({'error': 'Invalid email or reset code'}, status=status.HTTP_400_BAD_REQUEST)
 
             user.set_password(new_password)
             user.save()
 
-            #clear reset code
-            profile.verification_code = None
-            profile.save()
-
-            print(f"User {user.username} password reset successfully")
+            logger.info(f"User {user.username} password reset")
             return Response({'message': 'Password reset successful', 'success': True}, status=status.HTTP_200_OK)
         except Exception as e:
             return Response({
@@ -697,17 +633,15 @@ class PaymentCardView(APIView):
         serializer = PaymentCardSerializer(data=request.data, context={'request': request})
         # checks to see if the format of the new data is valid and raises error if not to frontend
         serializer.is_valid(raise_exception=True)
-        # save the new card to the database
-        card = serializer.save()
-        
-        # send email notification to user that a new card was added
-        send_mail(
-            "New Payment Card Added",
-            f"A new {card.brand} card ending in {card.card_number_enc[-4:]} was added to your account.",
-            "no-reply@ces.com",
-            [request.user.email],
-            fail_silently=True,
-        )
+        with transaction.atomic():
+            # save the new card to the database
+            card = serializer.save()
+
+            # email notification to user that a new card was added, sent by the outbox worker
+            emails.queue('card_added', request.user.email, {
+                'brand': card.brand,
+                'last4': card.last4,
+            })
         
         # return the created card data
         return Response(PaymentCardSerializer(card).data, status=201)
@@ -835,16 +769,11 @@ class PaymentCardDetailView(APIView):
         # update card with new data (partial=True allows updating only some fields)
         serializer = PaymentCardSerializer(card, data=request.data, partial=True, context={'request': request})
         serializer.is_valid(raise_exception=True)
-        updated_card = serializer.save()
-        
-        # send email notification about update
-        send_mail(
-            "Payment Card Updated",
-            f"Your {updated_card.brand} card was updated.",
-            "no-reply@ces.com",
-            [request.user.email],
-            fail_silently=True,
-        )
+        with transaction.atomic():
+            updated_card = serializer.save()
+
+            # email notification about update
+            emails.queue('card_updated', request.user.email, {'brand': updated_card.brand})
         
         return Response(PaymentCardSerializer(updated_card).data)
     
@@ -855,19 +784,14 @@ class PaymentCardDetailView(APIView):
             return Response({"error": "Payment card not found"}, status=404)
 
         # store card info for email notification before deletion
-        card_info = f"{card.brand} ending in {card.card_number_enc[-4:]}"
+        card_info = {'brand': card.brand, 'last4': card.get_last4()}
         
-        # actually delete the card from database (permanent removal)
-        card.delete()
-        
-        # send email notification about deletion
-        send_mail(
-            "Payment Card Removed",
-            f"Your {card_info} was removed from your account.",
-            "no-reply@ces.com",
-            [request.user.email],
-            fail_silently=True,
-        )
+        with transaction.atomic():
+            # actually delete the card from database (permanent removal)
+            card.delete()
+
+            # email notification about deletion
+            emails.queue('card_removed', request.user.email, card_info)
         
         # return success message (status 204 = No Content)
         return Response({"message": "Payment card deleted successfully"}, status=204)
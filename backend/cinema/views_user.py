@@ -5,27 +5,37 @@ takes care of the seat selection, booking creation, and booking history retrieva
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import status
+from rest_framework import serializers, status
+from rest_framework.exceptions import NotFound
 from rest_framework.permissions import IsAuthenticated
+from django.conf import settings
 from django.utils import timezone
+from django.db import transaction
 from django.db.models import Q, Count
 from collections import defaultdict
 import logging
-import smtplib
-import os
 from dotenv import load_dotenv
 from datetime import datetime
 
-from .models import Showing, Showroom, Seat, Booking, Ticket, Movie
+from .models import Showing, Showroom, Seat, Booking, Ticket, Movie, CheckoutSession, BookingSummary
 from .serializers import (
     ShowingDetailSerializer,
     SeatMapSerializer,
     SeatAvailabilitySerializer,
     BookingCreateSerializer,
-    BookingDetailSerializer,
+    CartCheckoutSerializer,
+    CheckoutSessionCreateSerializer,
+    CheckoutSessionUpdateSerializer,
+    CheckoutConfirmSerializer,
+    CheckoutSessionSerializer,
+    BookingSummarySerializer,
     TicketSerializer,
-    PromotionFactory
+    BookingFacade
 )
+from .quotes import issue_quote
+from . import checkout, redemptions
+from .pagination import BookingHistoryPagination
+from .receipts import get_receipt
 load_dotenv()
 logger = logging.getLogger(__name__)
 
@@ -360,7 +370,8 @@ class BookingPreviewView(APIView):
         "promotion_applied": "SUMMER20",
         "discount_display": "20% off",
         "discount_amount": "$4.00",
-        "final_price": "$16.00"
+        "final_price": "$16.00",
+        "quote_token": "..."  # pass to bookings/create/ to check out at this price
     }
     '''
     permission_classes = [IsAuthenticated]
@@ -368,134 +379,64 @@ class BookingPreviewView(APIView):
     def post(self, request):
         '''calculate booking total without creating booking'''
         try:
-            from decimal import Decimal
-            from .models import Promotion
-            
-            showing_id = request.data.get('showing_id')
-            seat_data = request.data.get('seats', [])
-            promo_code = request.data.get('promo_code')
-            
-            # validate showing exists
             try:
-                showing = Showing.objects.select_related('movie', 'showroom').get(showing_id=showing_id)
-            except Showing.DoesNotExist:
-                return Response(
-                    {'error': 'Showing not found'},
-                    status=status.HTTP_404_NOT_FOUND
-                )
-            
-            # validate seats exist and are available
-            seat_ids = [s['seat_id'] for s in seat_data]
-            seats = Seat.objects.filter(seat_id__in=seat_ids)
-            
-            if len(seats) != len(seat_ids):
-                return Response(
-                    {'error': 'One or more seats not found'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # verify all seats belong to the showing's showroom
-            for seat in seats:
-                if seat.showroom_id_id != showing.showroom_id:
-                    return Response(
-                        {'error': f'Seat {seat.seat_id} does not belong to this showroom'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-            
-            # check if seats are available (check if any tickets exist for these seats in this showing)
-            occupied_seat_ids = Ticket.objects.filter(
-                seat_id__in=seat_ids,
-                showing_id=showing.showing_id
-            ).values_list('seat_id', flat=True)
-            
-            if occupied_seat_ids:
+                showing_id = int(request.data.get('showing_id'))
+            except (TypeError, ValueError):
                 return Response(
-                    {'error': f'Seats already occupied: {list(occupied_seat_ids)}'},
+                    {'error': 'showing_id is required'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            
-            # calculate base price
-            base_price = Decimal('0.00')
-            seat_details = []
-            
-            for seat_info in seat_data:
-                seat = seats.get(seat_id=seat_info['seat_id'])
-                age_category = seat_info['age_category']
-                
-                # get ticket price based on age category
-                if age_category == 'Adult':
-                    price = Decimal('12.00')
-                elif age_category == 'Child':
-                    price = Decimal('8.00')
-                elif age_category == 'Senior':
-                    price = Decimal('10.00')
-                else:
-                    return Response(
-                        {'error': f'Invalid age category: {age_category}'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-                
-                base_price += price
-                seat_details.append({
-                    'seat_display': f"{seat.row_label}{seat.seat_number}",
-                    'age_category': age_category,
-                    'price': f"${price:.2f}"
-                })
-            
-            # apply promotion if provided
-            discount_amount = Decimal('0.00')
-            discount_display = None
-            promotion_applied = None
-            
-            if promo_code:
-                try:
-                    promotion = Promotion.objects.get(
-                        promo_code=promo_code,
-                        start_date__lte=timezone.now().date(),
-                        end_date__gte=timezone.now().date()
-                    )
-                    
-                    # use Factory Method to create promotion handler
-                    promo_handler = PromotionFactory.get_promotion(promo_code)
-                    
-                    # Convert Decimal to float for promotion calculation
-                    base_price_float = float(base_price)
-                    final_price_after_promo = promo_handler.apply(base_price_float)
-                    discount_amount = Decimal(str(base_price_float - final_price_after_promo))
-                    discount_display = promo_handler.get_discount_display(base_price_float)
-                    promotion_applied = promo_code
-                    
-                    logger.info(f"Preview: Applied promo '{promo_code}' - {discount_display}")
-                    
-                except Promotion.DoesNotExist:
-                    return Response(
-                        {'error': 'Invalid or expired promotion code'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-            
-            final_price = base_price - discount_amount
+            seat_data = request.data.get('seats', [])
+            promo_code = request.data.get('promo_code')
+
+            # same validation and pricing as checkout, without locking or booking anything
+            facade = BookingFacade(
+                user=request.user,
+                showing_id=showing_id,
+                seats_data=seat_data,
+                promo_code=promo_code or None
+            )
+            quote = facade.preview()
+
+            info = facade.showings[showing_id]
             
             # build response
             response_data = {
                 'showing': {
-                    'movie_title': showing.movie.movie_title,
-                    'showroom_name': showing.showroom.showroom_name,
-                    'start_time': showing.start_time.isoformat()
+                    'movie_title': info['movie_title'],
+                    'showroom_name': info['showroom_name'],
+                    'start_time': info['start_time'].isoformat()
                 },
-                'seats': seat_details,
-                'base_price': f"${base_price:.2f}",
-                'final_price': f"${final_price:.2f}"
+                'seats': [
+                    {
+                        'seat_display': seat_info['seat_display'],
+                        'age_category': seat_info['age_category'],
+                        'price': f"${seat_info['price']:.2f}"
+                    }
+                    for seat_info in facade.seats
+                ],
+                'base_price': f"${facade.base_price:.2f}",
+                'final_price': f"${facade.final_price:.2f}",
+                # send back with the booking so checkout doesn't price the order again
+                'quote_token': issue_quote(request.user, quote)
             }
             
             # add promotion details if applied
-            if promotion_applied:
-                response_data['promotion_applied'] = promotion_applied
-                response_data['discount_display'] = discount_display
-                response_data['discount_amount'] = f"${discount_amount:.2f}"
+            if facade.promotion_applied:
+                response_data['promotion_applied'] = facade.promotion_applied
+                response_data['discount_display'] = facade.discount_display
+                response_data['discount_amount'] = f"${facade.base_price - facade.final_price:.2f}"
+                logger.info(f"Preview: Applied promo '{facade.promotion_applied}' - {facade.discount_display}")
             
-            logger.info(f"Booking preview for user {request.user.username}: Base ${base_price}, Final ${final_price}")
+            logger.info(f"Booking preview for user {request.user.username}: Base ${facade.base_price:.2f}, Final ${facade.final_price:.2f}")
             
             return Response(response_data, status=status.HTTP_200_OK)
+
+        except serializers.ValidationError as e:
+            return Response(
+                {'error': e.detail[0] if isinstance(e.detail, list) else e.detail},
+                status=status.HTTP_400_BAD_REQUEST
+            )
             
         except Exception as e:
             logger.error(f"Booking preview error: {str(e)}")
@@ -504,6 +445,7 @@ class BookingPreviewView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+
 class BookingCreateView(APIView):
     '''
     creates a new booking with tickets.
@@ -583,88 +525,11 @@ class BookingCreateView(APIView):
             # which returns the complete formatted result
             result = serializer.save()
             
-            #get the actual booking and tickets from database
-            booking = Booking.objects.get(booking_id=result['booking_id'])
-            tickets = Ticket.objects.filter(booking=booking)
-            
             logger.info(
                 f"Booking created: #{result['booking_id']} "
                 f"by {request.user.username} "
                 f"for {result['final_price']}"
             )
-            #booking confirmation email logic
-            try:
-                user = request.user
-                
-                #get booking details from first ticket
-                movie_title = tickets[0].showing.movie.movie_title
-                showroom_name = tickets[0].showing.showroom.showroom_name
-                start_time = tickets[0].showing.start_time.strftime("%Y-%m-%d %H:%M")
-                #build ticket list with prices from age category
-                ticket_details = []
-                ticket_prices = {'Adult': 12.00, 'Child': 8.00, 'Senior': 10.00}
-                for ticket in tickets:
-                    price = ticket_prices.get(ticket.age_category, 12.00)
-                    ticket_details.append(
-                        f"Seat: {ticket.seat.__str__()}, Category: {ticket.age_category}, Price: ${price:.2f}"
-                    )
-                ticket_list = "\n".join(ticket_details)
-                
-                promo_info = ""
-                if result.get('promotion_applied'):
-                    promo_info = (
-                        f"\nPROMO CODE APPLIED: {result['promotion_applied']}\n"
-                        f"Discount: {result['discount_display']}\n"
-                    )
-                
-                #email sending
-                #smtp session created
-                s = smtplib.SMTP('smtp.gmail.com', 587)
-                #start TLS for security
-                s.starttls()
-
-                # Get Gmail credentials from environment variables
-                gmail_email = os.getenv("GMAIL_EMAIL")
-                gmail_password = os.getenv("GMAIL_PASS")
-
-                #authentication
-                print(f"Gmail email: {gmail_email}")
-                print(f"Gmail password loaded: {'Yes' if gmail_password else 'No'}")
-
-                # login to gmail
-                s.login(gmail_email, gmail_password)
-                #email message
-                message = (
-                    f"Subject: Booking Confirmation - {movie_title}\n\n"
-                    f"Hello {user.username},\n\n"
-                    f"Thank you for your booking with Cinema E-Booking System!\n\n"
-                    f"Your booking has been confirmed. Here are your details:\n\n"
-                    f"BOOKING CONFIRMATION\n"
-                    f"==========================================\n"
-                    f"Booking ID: #{booking.booking_id}\n"
-                    f"Movie: {movie_title}\n"
-                    f"Theater: {showroom_name}\n"
-                    f"Showtime: {start_time}\n\n"
-                    f"YOUR TICKETS:\n"
-                    f"{ticket_list}\n"
-                    f"\nBase Price: {result['base_price']}"
-                    f"{promo_info}"
-                    f"\nFINAL PRICE: {result['final_price']}\n"
-                    f"==========================================\n\n"
-                    f"Please arrive 15 minutes before showtime.\n"
-                    f"Present this confirmation email or your Booking ID at the theater.\n\n"
-                    f"Need to make changes? Log in to your account to view or cancel your booking.\n\n"
-                    f"Enjoy the show!\n\n"
-                    f"Cinema E-Booking System Team"
-                )
-                #sends the mail
-                s.sendmail(gmail_email, user.email, message.encode('utf-8'))
-                s.quit()
-                print(f"Booking email sent to {user.email}")
-            except Exception as e:
-                print(f"Failed to send booking confirmation email: {e}")
-                logger.error(f"Failed to send booking confirmation email: {e}")
-                pass  # continue even if email fails
             
             # return the formatted result from Facade (not BookingDetailSerializer!)
             return Response(
@@ -672,6 +537,13 @@ class BookingCreateView(APIView):
                 status=status.HTTP_201_CREATED
             )
         
+        except serializers.ValidationError as e:
+            # seat taken, bad promo, expired card... reported by the facade
+            logger.warning(f"Booking rejected: {e.detail}")
+            return Response(
+                {"error": e.detail[0] if isinstance(e.detail, list) else e.detail},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         except Exception as e:
             logger.error(f"Error creating booking: {e}")
             return Response(
@@ -679,6 +551,264 @@ class BookingCreateView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+class CartCheckoutView(APIView):
+    '''
+    books seats across several showings in one checkout.
+
+    purpose is double features / group outings: one booking, one payment,
+    one promotion and one confirmation email instead of one full checkout
+    per showing.
+
+    POST /api/user/bookings/cart/
+
+    Request body:
+    {
+        "items": [
+            {"showing_id": 42, "seats": [{"seat_id": 5, "age_category": "Adult"}]},
+            {"showing_id": 43, "seats": [{"seat_id": 5, "age_category": "Adult"},
+                                         {"seat_id": 6, "age_category": "Child"}]}
+        ],
+        "promo_code": "SUMMER20",  # Optional, applies to the whole cart
+        "payment_card_id": 3  # OR card_number / expiration / brand
+    }
+
+    Response: same as BookingCreateView plus
+    {
+        "showings": [
+            {"showing_id": 42, "movie_title": "...", "start_time": "...", "seats": [...]},
+            ...
+        ]
+    }
+    '''
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        """checkout every showing in the cart atomically (all or nothing)"""
+        try:
+            serializer = CartCheckoutSerializer(
+                data=request.data,
+                context={'request': request}
+            )
+
+            if not serializer.is_valid():
+                logger.warning(f"Cart checkout validation failed: {serializer.errors}")
+                return Response(
+                    serializer.errors,
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            result = serializer.save()
+
+            logger.info(
+                f"Cart booking created: #{result['booking_id']} "
+                f"({len(result['showings'])} showings) "
+                f"by {request.user.username} "
+                f"for {result['final_price']}"
+            )
+
+            return Response(result, status=status.HTTP_201_CREATED)
+
+        except serializers.ValidationError as e:
+            logger.warning(f"Cart checkout rejected: {e.detail}")
+            return Response(
+                {"error": e.detail[0] if isinstance(e.detail, list) else e.detail},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            logger.error(f"Error during cart checkout: {e}")
+            return Response(
+                {"error": "Failed to complete checkout. Please try again."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class CheckoutSessionCreateView(APIView):
+    '''
+    opens a server-side checkout session and holds the selected seats.
+
+    purpose is the booking pages keep the order on the server, later steps
+    only send what changed (see cinema/checkout.py)
+
+    POST /api/user/checkout/
+
+    Request body:
+    {
+        "showing_id": 42,
+        "seats": [{"seat_id": 5, "age_category": "Adult"}],
+        "promo_code": "SUMMER20"  # Optional
+    }
+
+    Response: the session (see CheckoutSessionSerializer), seats are held until expires_at
+    '''
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        """validate, price and hold the order"""
+        try:
+            serializer = CheckoutSessionCreateSerializer(data=request.data)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+            promo_code = serializer.validated_data.get('promo_code', '').strip()
+            session = checkout.open_session(
+                request.user,
+                serializer.validated_data['showing_id'],
+                serializer.validated_data['seats'],
+                promo_code or None
+            )
+
+            logger.info(f"Checkout {session.session_id} opened by {request.user.username}")
+            return Response(CheckoutSessionSerializer(session).data, status=status.HTTP_201_CREATED)
+
+        except serializers.ValidationError as e:
+            return Response(
+                {"error": e.detail[0] if isinstance(e.detail, list) else e.detail},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            logger.error(f"Error opening checkout: {e}")
+            return Response(
+                {"error": "Failed to start checkout"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class CheckoutSessionDetailView(APIView):
+    '''
+    read, change or cancel a checkout session.
+
+    GET    /api/user/checkout/<session_id>/
+    PATCH  /api/user/checkout/<session_id>/  (only the changes)
+    DELETE /api/user/checkout/<session_id>/  (releases the seats)
+
+    PATCH body, every field optional:
+    {
+        "add_seats": [{"seat_id": 7, "age_category": "Child"}],
+        "remove_seat_ids": [5],
+        "change_seats": [{"seat_id": 6, "age_category": "Senior"}],
+        "promo_code": "SUMMER20"  # "" removes it
+    }
+
+    Expired sessions answer PATCH with 410, the user has to start over.
+    '''
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, session_id):
+        """current seats, promo and price"""
+        try:
+            session = checkout.get_session(request.user, session_id)
+            return Response(CheckoutSessionSerializer(session).data, status=status.HTTP_200_OK)
+        except CheckoutSession.DoesNotExist:
+            return Response({"error": "Checkout not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    def patch(self, request, session_id):
+        """apply seat / category / promo changes"""
+        try:
+            serializer = CheckoutSessionUpdateSerializer(data=request.data)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+            data = serializer.validated_data
+            session = checkout.update_session(
+                request.user,
+                session_id,
+                add_seats=data.get('add_seats'),
+                remove_seat_ids=data.get('remove_seat_ids'),
+                change_seats=data.get('change_seats'),
+                promo_code=data.get('promo_code', '').strip() or None,
+                promo_changed='promo_code' in data
+            )
+            return Response(CheckoutSessionSerializer(session).data, status=status.HTTP_200_OK)
+
+        except CheckoutSession.DoesNotExist:
+            return Response({"error": "Checkout not found"}, status=status.HTTP_404_NOT_FOUND)
+        except checkout.CheckoutExpired:
+            return Response(
+                {"error": "Checkout has expired, please select your seats again"},
+                status=status.HTTP_410_GONE
+            )
+        except serializers.ValidationError as e:
+            return Response(
+                {"error": e.detail[0] if isinstance(e.detail, list) else e.detail},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            logger.error(f"Error updating checkout {session_id}: {e}")
+            return Response(
+                {"error": "Failed to update checkout"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    def delete(self, request, session_id):
+        """cancel the checkout and release the seats"""
+        try:
+            checkout.cancel_session(request.user, session_id)
+            return Response({"message": "Checkout cancelled"}, status=status.HTTP_200_OK)
+        except CheckoutSession.DoesNotExist:
+            return Response({"error": "Checkout not found"}, status=status.HTTP_404_NOT_FOUND)
+        except serializers.ValidationError as e:
+            return Response(
+                {"error": e.detail[0] if isinstance(e.detail, list) else e.detail},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+
+class CheckoutSessionConfirmView(APIView):
+    '''
+    pays for and books a checkout session.
+
+    POST /api/user/checkout/<session_id>/confirm/
+
+    Request body:
+    {
+        "payment_card_id": 3  # OR card_number / expiration / brand
+    }
+
+    Response: same as BookingCreateView
+    '''
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, session_id):
+        """book the session at its quoted price"""
+        try:
+            serializer = CheckoutConfirmSerializer(data=request.data)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+            result = checkout.confirm_session(
+                request.user,
+                session_id,
+                serializer.get_payment_info(serializer.validated_data)
+            )
+
+            logger.info(
+                f"Booking created from checkout {session_id}: #{result['booking_id']} "
+                f"by {request.user.username} for {result['final_price']}"
+            )
+
+            return Response(result, status=status.HTTP_201_CREATED)
+
+        except CheckoutSession.DoesNotExist:
+            return Response({"error": "Checkout not found"}, status=status.HTTP_404_NOT_FOUND)
+        except checkout.CheckoutExpired:
+            return Response(
+                {"error": "Checkout has expired, please select your seats again"},
+                status=status.HTTP_410_GONE
+            )
+        except serializers.ValidationError as e:
+            logger.warning(f"Checkout {session_id} rejected: {e.detail}")
+            return Response(
+                {"error": e.detail[0] if isinstance(e.detail, list) else e.detail},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            logger.error(f"Error confirming checkout {session_id}: {e}")
+            return Response(
+                {"error": "Failed to complete checkout. Please try again."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
 class BookingListView(APIView):
     '''
     List user's past and upcoming bookings.
@@ -686,21 +816,30 @@ class BookingListView(APIView):
     purpose is user view their booking history and details.
 
     GET /api/user/bookings/
+    GET /api/user/bookings/?status=upcoming   (showing hasn't started yet)
+    GET /api/user/bookings/?status=past
+    GET /api/user/bookings/?cursor=...        (follow "next" / "previous")
     
+    Served from booking_summaries: one indexed query per page, newest first.
+
     Example response:
     {
-        "count": 3,
+        "next": "http://.../api/user/bookings/?cursor=cD0yMDI1...",
+        "previous": null,
         "bookings": [
             {
                 "booking_id": 123,
+                "booking_time": "2025-12-03T10:30:00Z",
                 "movie_title": "Inception",
                 "showroom_name": "Theater 1",
                 "start_time": "2025-11-15T19:30:00Z",
+                "seat_labels": ["A5", "A6"],
                 "tickets": [
-                    {"seat_display": "A5", "age_category": "Adult", "price": 12.00},
-                    {"seat_display": "A6", "age_category": "Child", "price": 8.00}
+                    {"seat_display": "A5", "age_category": "Adult"},
+                    {"seat_display": "A6", "age_category": "Child"}
                 ],
-                "total_price": 20.00
+                "ticket_count": 2,
+                "total_price": "20.00"
             },
             ...
         ]
@@ -711,26 +850,29 @@ class BookingListView(APIView):
     def get(self, request):
         """List user's bookings"""
         try:
-            # gets all the bookings for the logged-in user
-            bookings = Booking.objects.filter(
-                user=request.user
-            ).prefetch_related(
-                'tickets',
-                'tickets__showing',
-                'tickets__showing__movie',
-                'tickets__showing__showroom',
-                'tickets__seat'
-            ).order_by('-booking_id')  # orders it by most recent first
-            
-            serializer = BookingDetailSerializer(bookings, many=True)
-            
-            logger.info(f"Retrieved {bookings.count()} bookings for {request.user.username}")
+            summaries = BookingSummary.objects.filter(user=request.user)
 
-            return Response({
-                'count': bookings.count(),
-                'bookings': serializer.data
-            }, status=status.HTTP_200_OK)
+            when = request.query_params.get('status')
+            if when == 'upcoming':
+                summaries = summaries.filter(start_time__gte=timezone.now())
+            elif when == 'past':
+                summaries = summaries.filter(start_time__lt=timezone.now())
+            elif when:
+                return Response(
+                    {"error": "status must be 'upcoming' or 'past'"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            paginator = BookingHistoryPagination()
+            page = paginator.paginate_queryset(summaries, request, view=self)
+            serializer = BookingSummarySerializer(page, many=True)
             
+            logger.info(f"Retrieved {len(page)} bookings for {request.user.username}")
+
+            return paginator.get_paginated_response(serializer.data)
+
+        except NotFound:
+            return Response({"error": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             logger.error(f"Error listing bookings: {e}")
             return Response(
@@ -759,6 +901,11 @@ class BookingDetailView(APIView):
         ],
         "total_price": 30.00
     }
+
+    served from the receipt snapshot stored with the booking (cinema/receipts.py),
+    so it shows what was paid at booking time. also carries the rest of the
+    booking result: showings, base_price, promotion_applied, final_price, payment,
+    and amendments for seats cancelled or moved by an admin after the sale
     '''
 
     permission_classes = [IsAuthenticated]
@@ -766,22 +913,12 @@ class BookingDetailView(APIView):
     def get(self, request, pk):
         """Get booking details"""
         try:
-            booking = Booking.objects.prefetch_related(
-                'tickets',
-                'tickets__showing',
-                'tickets__showing__movie',
-                'tickets__showing__showroom',
-                'tickets__seat'
-            ).get(
-                booking_id=pk,
-                user=request.user  # Security: only owner can view
-            )
-            
-            serializer = BookingDetailSerializer(booking)
-            
+            # Security: only owner can view
+            receipt = get_receipt(pk, request.user)
+
             logger.info(f"Retrieved booking details: #{pk} for {request.user.username}")
-            
-            return Response(serializer.data, status=status.HTTP_200_OK)
+
+            return Response(receipt, status=status.HTTP_200_OK)
             
         except Booking.DoesNotExist:
             return Response(
@@ -811,26 +948,32 @@ class BookingDetailView(APIView):
         """
         try:
             # gets bookings for authenticated users only
-            booking = Booking.objects.prefetch_related('tickets').get(
-                booking_id=pk,
-                user=request.user
+            if not Booking.objects.filter(booking_id=pk, user=request.user).exists():
+                raise Booking.DoesNotExist
+
+            # seats and start times of every ticket in one query
+            tickets = list(
+                Ticket.objects.filter(booking_id=pk)
+                .order_by('ticket_id')
+                .values_list('seat__row_label', 'seat__seat_number', 'showing__start_time')
             )
             
-            # Check if showing hasn't started yet
-            first_ticket = booking.tickets.first()
-            if first_ticket and first_ticket.showing.start_time < timezone.now():
+            # Check if no showing of the booking has started yet
+            if any(start_time < timezone.now() for _, _, start_time in tickets):
                 return Response(
                     {"error": "Cannot cancel booking for past showings"},
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
             # Get seat info before deletion (for response)
-            seat_info = [
-                ticket.seat.__str__() for ticket in booking.tickets.all()
-            ]
+            seat_info = [f"{row_label}{seat_number}" for row_label, seat_number, _ in tickets]
             
-            # delete the booking and the tickets will be cascade deleted automatically
-            booking.delete()
+            # one delete for the tickets, one for the booking
+            with transaction.atomic():
+                # give the promo code use back
+                redemptions.release([pk])
+                Ticket.objects.filter(booking_id=pk).delete()
+                Booking.objects.filter(booking_id=pk).delete()
             
             logger.info(
                 f"Booking cancelled: #{pk} by {request.user.username} "
@@ -19,6 +19,7 @@ pymysql.install_as_MySQLdb()
 from datetime import timedelta
 
 from cryptography.fernet import Fernet
+from corsheaders.defaults import default_headers
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -50,6 +51,7 @@ INSTALLED_APPS = [
     'corsheaders',
     'rest_framework',
     "rest_framework_simplejwt",
+    "rest_framework_simplejwt.token_blacklist",
     'django_filters'
 ]
 
@@ -58,6 +60,8 @@ MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'cinema.middleware.AuthRateLimitMiddleware',
+    'cinema.middleware.ShowingAdmissionMiddleware',
     'cinema.middleware.DisableCSRFForAdminAPI',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -70,10 +74,14 @@ CORS_ALLOWED_ORIGINS = [
     "http://127.0.0.1:5173",   # Adjust to your frontend dev serverd
 ]
 CORS_ALLOW_CREDENTIALS = True
+# waiting room headers (see cinema/admission.py)
+CORS_ALLOW_HEADERS = (*default_headers, "x-admission-pass", "x-queue-ticket")
+CORS_EXPOSE_HEADERS = ["X-Admission-Pass", "X-Queue-Ticket", "Retry-After"]
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        # JWTAuthentication with users (and profiles) cached, see cinema/authentication.py
+        "cinema.authentication.CachedJWTAuthentication",
     ],
     "DEFAULT_FILTER_BACKENDS": ["django_filters.rest_framework.DjangoFilterBackend"],
 }
@@ -86,16 +94,68 @@ SIMPLE_JWT = {
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
     'AUTH_HEADER_TYPES': ('Bearer',),
+    # checks the Bloom filter before the blacklist tables (cinema/revocation.py)
+    'TOKEN_REFRESH_SERIALIZER': 'cinema.serializers.BloomTokenRefreshSerializer',
 }
 
+# refresh token blacklist (cinema/revocation.py, prune_token_blacklist)
+TOKEN_BLACKLIST_BLOOM_ERROR_RATE = 0.001  # false positives that fall through to the database
+TOKEN_BLACKLIST_SYNC_INTERVAL = 30  # seconds between syncs of a process' filter with the database
+
 #Mailgun settings
-EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
-EMAIL_HOST = os.getenv("EMAIL_HOST")
-EMAIL_PORT = 587
-EMAIL_USE_TLS = True
-EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER")
-EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
-DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+# everything can be overridden from the environment, e.g. a local SMTP
+# stand-in for development and tests:
+#   python -m aiosmtpd -n -l localhost:1025
+#   EMAIL_HOST=localhost EMAIL_PORT=1025 EMAIL_USE_TLS=0
+EMAIL_BACKEND = os.getenv("EMAIL_BACKEND", "django.core.mail.backends.smtp.EmailBackend")
+EMAIL_HOST = os.getenv("EMAIL_HOST", "smtp.gmail.com")
+EMAIL_PORT = int(os.getenv("EMAIL_PORT", "587"))
+EMAIL_USE_TLS = os.getenv("EMAIL_USE_TLS", "1").lower() in ("1", "true", "yes")
+EMAIL_TIMEOUT = int(os.getenv("EMAIL_TIMEOUT", "30"))
+# the old GMAIL_* variables still work
+EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER", os.getenv("GMAIL_EMAIL", ""))
+EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD", os.getenv("GMAIL_PASS", ""))
+DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", EMAIL_HOST_USER or "no-reply@ces.com")
+
+# Rate limits of the auth endpoints (cinema/ratelimit.py), limits per endpoint in RATE_LIMITS
+RATE_LIMIT_ENABLED = True
+RATE_LIMIT_STORE = 'cinema.ratelimit.CacheCounterStore'  # or cinema.ratelimit.LocalCounterStore
+# proxies of ours in front of the app (load balancer, nginx), the client address is
+# taken that many entries from the right of X-Forwarded-For; 0 = use REMOTE_ADDR
+RATE_LIMIT_TRUSTED_PROXY_HOPS = int(os.getenv("RATE_LIMIT_TRUSTED_PROXY_HOPS", "0"))
+
+# Waiting room for high-demand showings (cinema/admission.py)
+ADMISSION_QUEUE_TICKET_MAX_AGE = 30 * 60  # seconds a queue ticket keeps its place
+ADMISSION_CONFIG_CACHE_TIMEOUT = 60  # seconds the per-showing config is cached
+
+CHECKOUT_SESSION_TTL = 10 * 60  # seconds seats stay on hold during checkout
+
+# email verification and password reset codes (cinema/one_time_codes.py, purge_one_time_codes)
+ONE_TIME_CODE_TTL = 15 * 60  # seconds a code can be used
+ONE_TIME_CODE_MAX_ATTEMPTS = 5  # wrong codes before a code is thrown away
+
+AUTH_USER_CACHE_TIMEOUT = 5 * 60  # seconds an authenticated user is served from cache (cinema/authentication.py)
+
+DASHBOARD_SNAPSHOT_TIMEOUT = 60  # seconds the admin dashboard statistics are reused at most (cinema/dashboard.py)
+
+PRICING_CACHE_TIMEOUT = 60 * 60  # seconds a compiled price matrix is reused (cinema/pricing.py)
+PROMOTION_CACHE_TIMEOUT = 10 * 60  # seconds the active promotion map is reused (cinema/promotion_cache.py)
+
+# promotion email campaigns (cinema/campaigns.py)
+PROMOTION_CAMPAIGN_BACKGROUND = False  # sent by run_promotion_campaigns from cron; True = thread of the web process (dev only)
+PROMOTION_CAMPAIGN_CHUNK_SIZE = 200  # emails per SMTP connection / checkpoint
+PROMOTION_EMAILS_PER_SECOND = 10  # every send is paced to this rate
+PROMOTION_CAMPAIGN_STALE_AFTER = 5 * 60  # seconds without a checkpoint before a campaign is resumed
+
+# booking confirmation emails (turned off for load tests)
+BOOKING_EMAILS_ENABLED = True
+
+# transactional email outbox (cinema/outbox.py)
+EMAIL_OUTBOX_BACKGROUND = True  # drain from a thread of the web process after commit, else drain_email_outbox
+EMAIL_OUTBOX_BATCH_SIZE = 50  # emails claimed (and sent over one SMTP connection) at a time
+EMAIL_OUTBOX_MAX_ATTEMPTS = 8  # failed sends before an email is marked dead
+EMAIL_OUTBOX_RETRY_DELAY = 30  # seconds before the first retry, doubled after every failure
+EMAIL_OUTBOX_MAX_RETRY_DELAY = 60 * 60
 
 ROOT_URLCONF = 'config.urls'
 
@@ -140,6 +200,21 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# shared by every process and server: the user cache (cinema/authentication.py),
+# waiting room positions (cinema/admission.py), rate limit counters
+# (cinema/ratelimit.py), recently blacklisted tokens (cinema/revocation.py) and
+# the dashboard snapshot (cinema/dashboard.py) all rely on that
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv("REDIS_URL", "redis://127.0.0.1:6379/1"),
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -188,4 +263,8 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 CARD_ENCRYPTION_KEY = os.environ.get(
     'CARD_ENCRYPTION_KEY', 
     'xFcbU7nR8wJ3tY6vA9sD2gK5hN8bE1mC4oP7qT0wZ3x='  # Default key for development
-)
\ No newline at end of file
+)
+# Several keys for key rotation, newest first, comma separated: the first one
+# encrypts, all of them decrypt (cinema/card_cipher.py). Falls back to
+# CARD_ENCRYPTION_KEY when not set.
+CARD_ENCRYPTION_KEYS = [key for key in os.environ.get('CARD_ENCRYPTION_KEYS', '').split(',') if key.strip()]
\ No newline at end of file
@@ -0,0 +1,54 @@
+"""
+Settings for the booking load test (python manage.py loadtest_booking).
+
+Same as config.settings but on a local database, so seeding and hammering the
+booking endpoints never touches the shared MySQL database, and without
+sending confirmation emails.
+
+By default a SQLite file is used. SQLite only allows one writer at a time and
+has no row locks, so for realistic contention numbers point it at a local
+MySQL instead:
+
+    LOADTEST_MYSQL_DB=cinema_loadtest LOADTEST_MYSQL_USER=root LOADTEST_MYSQL_PASSWORD=... \
+        python manage.py loadtest_booking --settings=config.settings_loadtest
+"""
+
+from .settings import *  # noqa: F401,F403
+
+if os.getenv('LOADTEST_MYSQL_DB'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.mysql',
+            'NAME': os.getenv('LOADTEST_MYSQL_DB'),
+            'USER': os.getenv('LOADTEST_MYSQL_USER', 'root'),
+            'PASSWORD': os.getenv('LOADTEST_MYSQL_PASSWORD', ''),
+            'HOST': os.getenv('LOADTEST_MYSQL_HOST', '127.0.0.1'),
+            'PORT': os.getenv('LOADTEST_MYSQL_PORT', '3306'),
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'loadtest.sqlite3',
+            # wait for the write lock instead of failing right away
+            'OPTIONS': {'timeout': 30},
+        }
+    }
+
+# the test client sends requests to "testserver"
+ALLOWED_HOSTS = ALLOWED_HOSTS + ['testserver']
+
+EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+BOOKING_EMAILS_ENABLED = False
+
+# the load test runs in one process, a local cache is shared by all its threads
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+SILENCED_SYSTEM_CHECKS = ['cinema.W001']
+
+# loadtest_booking refuses to run unless this is set
+LOADTEST_DATABASE = True
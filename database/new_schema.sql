@@ -77,7 +77,8 @@ CREATE TABLE IF NOT EXISTS `auth_user` (
   `is_active` tinyint(1) NOT NULL,
   `date_joined` datetime(6) NOT NULL,
   PRIMARY KEY (`id`),
-  UNIQUE KEY `username` (`username`)
+  UNIQUE KEY `username` (`username`),
+  KEY `auth_user_email_idx` (`email`)	-- admin user search by email prefix, lookups by email (migration 0007)
 );
 
 -- Table structure for table `auth_user_user_permissions`
@@ -116,6 +117,7 @@ CREATE TABLE IF NOT EXISTS `cinema_paymentcard` (
   `brand` varchar(20) NOT NULL,
   `expiration` varchar(7) NOT NULL,
   `card_number_enc` varchar(256) NOT NULL,
+  `last4` varchar(4) NOT NULL DEFAULT '',
   `user_id` int NOT NULL,
   PRIMARY KEY (`id`),
   KEY `cinema_paymentcard_user_id_aa84df0a_fk_auth_user_id` (`user_id`),
@@ -146,6 +148,9 @@ CREATE TABLE IF NOT EXISTS `cinema_promotions` (
   `start_date` date NOT NULL,
   `end_date` date NOT NULL,
   `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP,
+  `max_uses` int NULL,	-- redemption limits (cinema/redemptions.py), NULL = unlimited
+  `per_user_limit` int NULL,
+  `times_redeemed` int NOT NULL DEFAULT 0,
   PRIMARY KEY (`promo_id`),
   UNIQUE KEY `promo_code` (`promo_code`)
 ); 
@@ -297,4 +302,165 @@ CREATE TABLE IF NOT EXISTS seat_reservation (
     FOREIGN KEY (seat_id) REFERENCES seats(seat_id),
     FOREIGN KEY (user_id) REFERENCES auth_user(id),
     UNIQUE (showing_id, seat_id, user_id)	-- multiple users can't select the same seat for same time
-);
\ No newline at end of file
+);
+
+-- per-showing admission control for high-demand showings (virtual waiting room)
+CREATE TABLE IF NOT EXISTS showing_admission (
+    showing_id INT PRIMARY KEY,
+    enabled BOOLEAN NOT NULL DEFAULT FALSE,
+    admits_per_minute INT NOT NULL DEFAULT 60,	-- token bucket refill rate
+    burst INT NOT NULL DEFAULT 20,	-- token bucket size
+    pass_ttl_minutes INT NOT NULL DEFAULT 10,	-- how long an admission pass stays valid
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (showing_id) REFERENCES showings(showing_id) ON DELETE CASCADE
+);
+
+-- server-side checkout state, seats on hold are in seat_reservation
+CREATE TABLE IF NOT EXISTS checkout_sessions (
+    session_id CHAR(32) PRIMARY KEY,	-- uuid
+    user_id INT NOT NULL,
+    showing_id INT NOT NULL,
+    seats JSON NOT NULL,	-- [{seat_id, seat_display, age_category}]
+    promo_code VARCHAR(100),
+    quote JSON,	-- price quote for the current seats and promo code
+    status VARCHAR(10) NOT NULL DEFAULT 'open',	-- open, confirmed, cancelled
+    booking_id INT,
+    expires_at DATETIME NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES auth_user(id) ON DELETE CASCADE,
+    FOREIGN KEY (showing_id) REFERENCES showings(showing_id) ON DELETE CASCADE,
+    FOREIGN KEY (booking_id) REFERENCES bookings(booking_id) ON DELETE SET NULL,
+    INDEX idx_checkout_user_showing (user_id, showing_id, status)
+);
+
+-- finding active holds for a showing
+CREATE INDEX idx_seat_reservation_showing ON seat_reservation (showing_id, expires_at);
+-- purge_seat_holds
+CREATE INDEX idx_seat_reservation_expires ON seat_reservation (expires_at);
+
+-- one row per booking with what the order history shows (written at booking time)
+CREATE TABLE IF NOT EXISTS booking_summaries (
+    booking_id INT PRIMARY KEY,
+    user_id INT NOT NULL,
+    showing_id INT,	-- earliest showing of the booking
+    movie_title VARCHAR(255) NOT NULL,	-- "A + B" for cart bookings
+    showroom_name VARCHAR(50) NOT NULL,
+    start_time DATETIME NOT NULL,
+    seats JSON NOT NULL,	-- [{seat_display, age_category}]
+    ticket_count INT NOT NULL DEFAULT 0,
+    total_price DECIMAL(10,2) NOT NULL,
+    booking_time DATETIME NOT NULL,
+    FOREIGN KEY (booking_id) REFERENCES bookings(booking_id) ON DELETE CASCADE,
+    FOREIGN KEY (user_id) REFERENCES auth_user(id) ON DELETE CASCADE,
+    FOREIGN KEY (showing_id) REFERENCES showings(showing_id) ON DELETE SET NULL,
+    INDEX idx_summary_user_time (user_id, booking_time),	-- history, newest first
+    INDEX idx_summary_user_start (user_id, start_time),	-- upcoming / past filters
+    INDEX idx_summary_booking_time (booking_time)	-- today's sales on the admin dashboard
+);
+
+-- bookings of a user (admin views, backfill)
+CREATE INDEX idx_bookings_user_time ON bookings (user_id, booking_time);
+
+-- booking as it was sold, read back by booking detail / confirmation / email
+CREATE TABLE IF NOT EXISTS booking_receipts (
+    booking_id INT PRIMARY KEY,
+    user_id INT NOT NULL,
+    receipt JSON NOT NULL,
+    amendments JSON NOT NULL DEFAULT (JSON_ARRAY()),	-- bulk cancels / moves after the sale, appended
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (booking_id) REFERENCES bookings(booking_id) ON DELETE CASCADE,
+    FOREIGN KEY (user_id) REFERENCES auth_user(id) ON DELETE CASCADE
+);
+
+-- ticket price table, compiled into a price matrix by cinema/pricing.py
+-- showroom_id NULL = every showroom, time_band 'any' = all day
+CREATE TABLE IF NOT EXISTS ticket_prices (
+    price_id INT AUTO_INCREMENT PRIMARY KEY,
+    showroom_id INT NULL,
+    time_band ENUM('any', 'matinee', 'evening', 'late') NOT NULL DEFAULT 'any',
+    age_category ENUM('Child', 'Adult', 'Senior') NOT NULL,
+    price DECIMAL(6,2) NOT NULL,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    UNIQUE KEY uniq_ticket_price (showroom_id, time_band, age_category),
+    FOREIGN KEY (showroom_id) REFERENCES showrooms(showroom_id) ON DELETE CASCADE
+);
+
+-- promo codes are stored normalized (trimmed, upper case) so checkout can look
+-- them up with = on the unique promo_code index instead of a case-insensitive LIKE.
+-- codes that only differ by case or spaces (' summer10' and 'SUMMER10') would
+-- collide on the unique key: they are listed here, left as they are and have
+-- to be merged by hand
+SELECT UPPER(TRIM(promo_code)) AS normalized_code, GROUP_CONCAT(promo_code) AS colliding_codes
+FROM cinema_promotions
+GROUP BY UPPER(TRIM(promo_code))
+HAVING COUNT(*) > 1;
+
+UPDATE cinema_promotions p
+LEFT JOIN (
+    SELECT UPPER(TRIM(promo_code)) AS normalized_code
+    FROM cinema_promotions
+    GROUP BY UPPER(TRIM(promo_code))
+    HAVING COUNT(*) > 1
+) clash ON clash.normalized_code = UPPER(TRIM(p.promo_code))
+SET p.promo_code = UPPER(TRIM(p.promo_code))
+WHERE p.promo_id > 0 AND clash.normalized_code IS NULL;
+
+-- promotion redemption limits (cinema/redemptions.py) on a cinema_promotions
+-- table created before they were part of it; does nothing when they exist
+SET @add_redemption_limits = (
+    SELECT IF(COUNT(*) = 0,
+        'ALTER TABLE cinema_promotions ADD COLUMN max_uses INT NULL, ADD COLUMN per_user_limit INT NULL, ADD COLUMN times_redeemed INT NOT NULL DEFAULT 0',
+        'DO 0')
+    FROM information_schema.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'cinema_promotions' AND COLUMN_NAME = 'times_redeemed'
+);
+PREPARE add_redemption_limits FROM @add_redemption_limits;
+EXECUTE add_redemption_limits;
+DEALLOCATE PREPARE add_redemption_limits;
+
+-- per-user redemption counter, checked with a conditional UPDATE
+CREATE TABLE IF NOT EXISTS promotion_user_usage (
+    usage_id INT AUTO_INCREMENT PRIMARY KEY,
+    promo_id INT NOT NULL,
+    user_id INT NOT NULL,
+    times_redeemed INT NOT NULL DEFAULT 0,
+    UNIQUE KEY uniq_promotion_user (promo_id, user_id),
+    FOREIGN KEY (promo_id) REFERENCES cinema_promotions(promo_id) ON DELETE CASCADE,
+    FOREIGN KEY (user_id) REFERENCES auth_user(id) ON DELETE CASCADE
+);
+
+-- one row per booking that used a promo code, released when the booking is cancelled
+CREATE TABLE IF NOT EXISTS promotion_redemptions (
+    redemption_id INT AUTO_INCREMENT PRIMARY KEY,
+    promo_id INT NOT NULL,
+    user_id INT NOT NULL,
+    booking_id INT NULL,
+    redeemed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    released_at DATETIME NULL,
+    UNIQUE KEY uniq_redemption_booking (booking_id),
+    INDEX idx_redemptions_promo (promo_id, redeemed_at),
+    FOREIGN KEY (promo_id) REFERENCES cinema_promotions(promo_id) ON DELETE CASCADE,
+    FOREIGN KEY (user_id) REFERENCES auth_user(id) ON DELETE CASCADE,
+    FOREIGN KEY (booking_id) REFERENCES bookings(booking_id) ON DELETE SET NULL
+);
+
+-- background promotion email sends, checkpointed per chunk (cinema/campaigns.py)
+CREATE TABLE IF NOT EXISTS promotion_campaigns (
+    campaign_id INT AUTO_INCREMENT PRIMARY KEY,
+    promo_id INT NOT NULL,
+    created_by INT NULL,
+    status ENUM('queued', 'running', 'completed', 'cancelled', 'failed') NOT NULL DEFAULT 'queued',
+    total_recipients INT NOT NULL DEFAULT 0,
+    sent_count INT NOT NULL DEFAULT 0,
+    failed_count INT NOT NULL DEFAULT 0,
+    last_user_id INT NOT NULL DEFAULT 0,	-- checkpoint, subscribers are sent in user id order
+    last_error TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    started_at DATETIME NULL,
+    heartbeat_at DATETIME NULL,
+    finished_at DATETIME NULL,
+    INDEX idx_campaigns_status (status, heartbeat_at),
+    FOREIGN KEY (promo_id) REFERENCES cinema_promotions(promo_id) ON DELETE CASCADE,
+    FOREIGN KEY (created_by) REFERENCES auth_user(id) ON DELETE SET NULL
+);
@@ -2,6 +2,90 @@ import axios from "axios";
 
 const url = "http://127.0.0.1:8000/api";
 
+// Waiting room for high-demand showings (backend: cinema/admission.py).
+// Passes and queue tickets (one per showing) the server hands out are kept
+// for the tab and sent back on every /user/ request; a request that is
+// queued (429) is retried with its tickets, and onAdmissionQueue listeners
+// get the position.
+const ADMISSION_KEY = "admissionPasses";
+const QUEUE_TICKET_KEY = "queueTickets";
+const MAX_ADMISSION_PASSES = 10;
+const MAX_QUEUE_TICKETS = 10;
+const MAX_QUEUE_RETRY_SECONDS = 15;
+
+const queueListeners = new Set();
+
+// listener(queue) gets the 429 body while waiting and null once admitted
+export const onAdmissionQueue = (listener) => {
+  queueListeners.add(listener);
+  return () => queueListeners.delete(listener);
+};
+
+const notifyQueue = (queue) => {
+  queueListeners.forEach((listener) => listener(queue));
+};
+
+const getStoredList = (key) => JSON.parse(sessionStorage.getItem(key) || "[]");
+
+// newest last, the server ignores passes and tickets of other showings
+const storeList = (key, header, max) => {
+  const values = getStoredList(key).filter(
+    (value) => !header.split(",").includes(value)
+  );
+  header.split(",").forEach((value) => {
+    if (value) values.push(value);
+  });
+  sessionStorage.setItem(key, JSON.stringify(values.slice(-max)));
+};
+
+const isUserApi = (config) => (config.url || "").startsWith(`${url}/user/`);
+
+axios.interceptors.request.use((config) => {
+  if (isUserApi(config)) {
+    const passes = getStoredList(ADMISSION_KEY);
+    const tickets = getStoredList(QUEUE_TICKET_KEY);
+    if (passes.length) config.headers["X-Admission-Pass"] = passes.join(",");
+    if (tickets.length) config.headers["X-Queue-Ticket"] = tickets.join(",");
+  }
+  return config;
+});
+
+const storeAdmissionHeaders = (headers) => {
+  // a 429 can carry passes too, for the showings of a cart that were admitted
+  if (headers["x-admission-pass"]) {
+    storeList(ADMISSION_KEY, headers["x-admission-pass"], MAX_ADMISSION_PASSES);
+  }
+  if (headers["x-queue-ticket"]) {
+    storeList(QUEUE_TICKET_KEY, headers["x-queue-ticket"], MAX_QUEUE_TICKETS);
+  }
+};
+
+axios.interceptors.response.use(
+  (res) => {
+    if (res.headers["x-admission-pass"]) {
+      storeAdmissionHeaders(res.headers);
+      notifyQueue(null);
+    }
+    return res;
+  },
+  async (error) => {
+    const res = error.response;
+    if (res?.status !== 429 || res.data?.code !== "ADMISSION_QUEUED") {
+      return Promise.reject(error);
+    }
+    storeAdmissionHeaders(res.headers);
+    notifyQueue(res.data);
+
+    // keep the place in line: retry with the ticket once it is (nearly) called
+    const wait = Math.min(
+      Number(res.headers["retry-after"]) || 1,
+      MAX_QUEUE_RETRY_SECONDS
+    );
+    await new Promise((resolve) => setTimeout(resolve, wait * 1000));
+    return axios(error.config);
+  }
+);
+
 export const getCurrentMovies = async () => {
   const res = await axios.get(`${url}/movies/currently_running`);
   return res.data;
@@ -257,6 +341,14 @@ export const sendPromotionEmail = async (id) => {
   return res.data;
 };
 
+export const getPromotionCampaign = async (campaignId) => {
+  const token = localStorage.getItem("accessToken");
+  const res = await axios.get(`${url}/admin/campaigns/${campaignId}/`, {
+    headers: { Authorization: `Bearer ${token}` },
+  });
+  return res.data;
+};
+
 export const getUserMovieShowings = async (movieId) => {
   const res = await axios.get(`${url}/user/movies/${movieId}/showings/`);
   return res.data;
@@ -283,9 +375,59 @@ export const createBooking = async (bookingData) => {
   return res.data;
 };
 
-export const getBookings = async () => {
+export const checkoutCart = async (cartData) => {
+  const token = localStorage.getItem("accessToken");
+  const res = await axios.post(`${url}/user/bookings/cart/`, cartData, {
+    headers: { Authorization: `Bearer ${token}` },
+  });
+  return res.data;
+};
+
+// Checkout session: seats are held on the server, later steps send only the changes
+export const startCheckout = async (checkoutData) => {
+  const token = localStorage.getItem("accessToken");
+  const res = await axios.post(`${url}/user/checkout/`, checkoutData, {
+    headers: { Authorization: `Bearer ${token}` },
+  });
+  return res.data;
+};
+
+export const getCheckout = async (sessionId) => {
+  const token = localStorage.getItem("accessToken");
+  const res = await axios.get(`${url}/user/checkout/${sessionId}/`, {
+    headers: { Authorization: `Bearer ${token}` },
+  });
+  return res.data;
+};
+
+export const updateCheckout = async (sessionId, changes) => {
+  const token = localStorage.getItem("accessToken");
+  const res = await axios.patch(`${url}/user/checkout/${sessionId}/`, changes, {
+    headers: { Authorization: `Bearer ${token}` },
+  });
+  return res.data;
+};
+
+export const cancelCheckout = async (sessionId) => {
+  const token = localStorage.getItem("accessToken");
+  const res = await axios.delete(`${url}/user/checkout/${sessionId}/`, {
+    headers: { Authorization: `Bearer ${token}` },
+  });
+  return res.data;
+};
+
+export const confirmCheckout = async (sessionId, paymentData) => {
+  const token = localStorage.getItem("accessToken");
+  const res = await axios.post(`${url}/user/checkout/${sessionId}/confirm/`, paymentData, {
+    headers: { Authorization: `Bearer ${token}` },
+  });
+  return res.data;
+};
+
+// pageUrl: the "next" link of the previous page (cursor pagination)
+export const getBookings = async (pageUrl = null) => {
   const token = localStorage.getItem("accessToken");
-  const res = await axios.get(`${url}/user/bookings/`, {
+  const res = await axios.get(pageUrl || `${url}/user/bookings/`, {
     headers: { Authorization: `Bearer ${token}` },
   });
   return res.data;
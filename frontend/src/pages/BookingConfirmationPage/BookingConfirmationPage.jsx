@@ -114,7 +114,7 @@ const BookingConfirmationPage = () => {
               <div className="space-y-3 mb-8">
                 {booking.tickets.map((ticket) => (
                   <div
-                    key={ticket.ticket_id}
+                    key={`${ticket.showing_id}-${ticket.seat_id}`}
                     className="flex justify-between items-center bg-gray-700/30 p-3 rounded-lg border border-gray-700"
                   >
                     <div className="flex items-center gap-4">
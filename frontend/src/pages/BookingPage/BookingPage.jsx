@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useRef } from "react";
 import { useParams, useNavigate } from "react-router-dom";
 import Navbar from "../../components/Navbar/Navbar";
 import {
@@ -6,10 +6,48 @@ import {
   getUserMovieShowings,
   getShowingSeats,
   getPaymentCards,
-  previewBooking,
-  createBooking,
+  startCheckout,
+  updateCheckout,
+  cancelCheckout,
+  confirmCheckout,
+  onAdmissionQueue,
 } from "../../api";
 
+// Waiting room notice while a high-demand showing keeps us queued
+const QueueNotice = ({ queue }) => (
+  <div className="bg-yellow-500/10 border border-yellow-500/30 rounded-xl p-4 text-center text-yellow-300">
+    <p className="font-semibold">{queue.error}</p>
+    <p className="text-sm mt-1">
+      Your place in line: {queue.position} ({queue.people_ahead} ahead of you,
+      about {Math.max(1, Math.ceil(queue.estimated_wait_seconds / 60))} min).
+      Keep this page open, you will continue automatically.
+    </p>
+  </div>
+);
+
+// What changed between the checkout session on the server and the current
+// selection, in the shape PATCH /user/checkout/<id>/ takes
+const checkoutChanges = (checkout, seats) => {
+  const held = new Map(
+    checkout.seats.map((s) => [s.seat_id, s.age_category])
+  );
+  const wanted = new Set(seats.map((s) => s.seat_id));
+  const changes = {};
+
+  const addSeats = seats.filter((s) => !held.has(s.seat_id));
+  const removeSeatIds = [...held.keys()].filter(
+    (seatId) => !wanted.has(seatId)
+  );
+  const changeSeats = seats.filter(
+    (s) => held.has(s.seat_id) && held.get(s.seat_id) !== s.age_category
+  );
+
+  if (addSeats.length) changes.add_seats = addSeats;
+  if (removeSeatIds.length) changes.remove_seat_ids = removeSeatIds;
+  if (changeSeats.length) changes.change_seats = changeSeats;
+  return changes;
+};
+
 const BookingPage = () => {
   const { id, showtime } = useParams();
   const navigate = useNavigate();
@@ -19,6 +57,7 @@ const BookingPage = () => {
   const [seatMap, setSeatMap] = useState({});
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [queue, setQueue] = useState(null);
 
   // Ticket Selection States
   const [tickets, setTickets] = useState({
@@ -36,7 +75,10 @@ const BookingPage = () => {
   const [selectedCardId, setSelectedCardId] = useState("");
   const [useNewCard, setUseNewCard] = useState(false);
   const [promoCode, setPromoCode] = useState("");
-  const [previewData, setPreviewData] = useState(null);
+  // Server-side checkout session: held seats, promo and price
+  // (backend: cinema/checkout.py)
+  const [checkout, setCheckout] = useState(null);
+  const checkoutRef = useRef(null);
 
   // Updated to include CVV
   const [newCardData, setNewCardData] = useState({
@@ -50,6 +92,23 @@ const BookingPage = () => {
   const totalTickets = tickets.Adult + tickets.Child + tickets.Senior;
   const seatsRemaining = totalTickets - selectedSeats.length;
 
+  // Waiting room position, cleared once we are admitted
+  useEffect(() => onAdmissionQueue(setQueue), []);
+
+  // Release the held seats when leaving the page without booking
+  useEffect(() => {
+    checkoutRef.current = checkout;
+  }, [checkout]);
+  useEffect(
+    () => () => {
+      const open = checkoutRef.current;
+      if (open?.status === "open") {
+        cancelCheckout(open.session_id).catch(() => {});
+      }
+    },
+    []
+  );
+
   // Fetch Movie, Showing, and Seat Data
   useEffect(() => {
     const fetchData = async () => {
@@ -139,13 +198,48 @@ const BookingPage = () => {
     }));
   };
 
-  // Open Checkout Modal
+  // Open Checkout Modal: the first time the order is sent whole and its seats
+  // are held, after that only the seats that changed are sent
   const handleProceedToCheckout = async () => {
     if (selectedSeats.length !== totalTickets || totalTickets === 0) {
       alert("Please select seats for all your tickets.");
       return;
     }
 
+    const seats = constructSeatsPayload();
+    try {
+      let session = null;
+      const stillHeld =
+        checkout?.status === "open" &&
+        new Date(checkout.expires_at) > new Date();
+      if (stillHeld) {
+        const changes = checkoutChanges(checkout, seats);
+        try {
+          session = Object.keys(changes).length
+            ? await updateCheckout(checkout.session_id, changes)
+            : checkout;
+        } catch (err) {
+          // expired (410) or gone: start a new checkout below
+          if (![404, 410].includes(err.response?.status)) throw err;
+        }
+      }
+      if (!session) {
+        session = await startCheckout({
+          showing_id: showing.showing_id,
+          seats,
+          promo_code: promoCode,
+        });
+      }
+      setCheckout(session);
+    } catch (err) {
+      console.error("Checkout failed", err);
+      alert(
+        err.response?.data?.error ||
+          "Could not hold your seats. Please try again."
+      );
+      return;
+    }
+
     setShowCheckout(true);
     try {
       const cards = await getPaymentCards();
@@ -158,33 +252,33 @@ const BookingPage = () => {
     } catch (err) {
       console.error("Failed to fetch payment cards", err);
     }
+  };
 
-    await updatePreview();
+  const handleCheckoutExpired = () => {
+    alert("Your seat hold has expired, please check out again.");
+    setCheckout(null);
+    setShowCheckout(false);
   };
 
-  const updatePreview = async (code = "") => {
+  const handleApplyPromo = async () => {
     try {
-      const payload = {
-        showing_id: showing.showing_id,
-        seats: constructSeatsPayload(),
-        promo_code: code || promoCode,
-      };
-      const data = await previewBooking(payload);
-      setPreviewData(data);
+      const session = await updateCheckout(checkout.session_id, {
+        promo_code: promoCode,
+      });
+      setCheckout(session);
     } catch (err) {
-      console.error("Preview failed", err);
-      if (code) alert("Invalid or expired promo code");
+      if (err.response?.status === 410) {
+        handleCheckoutExpired();
+        return;
+      }
+      console.error("Promo code failed", err);
+      alert(err.response?.data?.error || "Invalid or expired promo code");
     }
   };
 
   const handleConfirmBooking = async () => {
     try {
-      const seatsPayload = constructSeatsPayload();
-      const bookingPayload = {
-        showing_id: showing.showing_id,
-        seats: seatsPayload,
-        promo_code: promoCode,
-      };
+      const paymentPayload = {};
 
       if (useNewCard) {
         // Updated validation to check for CVV
@@ -197,24 +291,30 @@ const BookingPage = () => {
           alert("Please fill in all card details, including CVV.");
           return;
         }
-        bookingPayload.card_number = newCardData.cardNumber;
-        bookingPayload.expiration = newCardData.expiration;
-        bookingPayload.brand = newCardData.brand;
-        bookingPayload.cvv = newCardData.cvv; // Passed to backend
+        paymentPayload.card_number = newCardData.cardNumber;
+        paymentPayload.expiration = newCardData.expiration;
+        paymentPayload.brand = newCardData.brand;
+        paymentPayload.cvv = newCardData.cvv; // Passed to backend
       } else {
         if (!selectedCardId) {
           alert("Please select a payment card.");
           return;
         }
-        bookingPayload.payment_card_id = selectedCardId;
+        paymentPayload.payment_card_id = selectedCardId;
       }
 
-      const res = await createBooking(bookingPayload);
+      // seats, categories and promo are already on the server
+      const res = await confirmCheckout(checkout.session_id, paymentPayload);
+      setCheckout(null);
       alert("Booking confirmed! Check your email.");
       if (res && res.booking_id) {
         navigate(`/booking-confirmation/${res.booking_id}`);
       }
     } catch (err) {
+      if (err.response?.status === 410) {
+        handleCheckoutExpired();
+        return;
+      }
       console.error("Booking failed", err);
       const msg =
         err.response?.data?.error || "Booking failed. Please try again.";
@@ -225,7 +325,7 @@ const BookingPage = () => {
   if (loading)
     return (
       <div className="min-h-screen bg-gray-900 text-white p-8 text-center">
-        Loading...
+        {queue ? <QueueNotice queue={queue} /> : "Loading..."}
       </div>
     );
   if (error)
@@ -240,6 +340,12 @@ const BookingPage = () => {
     <div className="min-h-screen bg-gray-900 text-white relative">
       <Navbar />
 
+      {queue && (
+        <div className="max-w-7xl mx-auto px-6 pt-6">
+          <QueueNotice queue={queue} />
+        </div>
+      )}
+
       <div className="max-w-7xl mx-auto p-6 grid grid-cols-1 lg:grid-cols-3 gap-8">
         {/* LEFT COLUMN */}
         <div className="lg:col-span-1 space-y-6">
@@ -452,26 +558,36 @@ const BookingPage = () => {
                   <div className="flex justify-between">
                     <span>Seats:</span>
                     <span className="text-white">
-                      {previewData?.seats
+                      {checkout?.seats
                         ?.map((s) => s.seat_display)
                         .join(", ") || "Loading..."}
                     </span>
                   </div>
                   <div className="pt-2 mt-2 border-t border-gray-600 flex justify-between">
                     <span>Base Price:</span>
-                    <span>{previewData?.base_price}</span>
+                    <span>{checkout?.base_price}</span>
                   </div>
-                  {previewData?.discount_amount && (
+                  {checkout?.discount_display && (
                     <div className="flex justify-between text-green-400">
-                      <span>Discount ({previewData.promotion_applied}):</span>
-                      <span>{previewData.discount_display}</span>
+                      <span>Discount ({checkout.promo_code}):</span>
+                      <span>{checkout.discount_display}</span>
                     </div>
                   )}
                   <div className="flex justify-between text-xl font-bold text-white pt-2">
                     <span>Total:</span>
-                    <span>{previewData?.final_price}</span>
+                    <span>{checkout?.final_price}</span>
                   </div>
                 </div>
+                {checkout?.expires_at && (
+                  <p className="text-xs text-gray-400 mt-2">
+                    Your seats are held until{" "}
+                    {new Date(checkout.expires_at).toLocaleTimeString([], {
+                      hour: "2-digit",
+                      minute: "2-digit",
+                    })}
+                    .
+                  </p>
+                )}
               </div>
 
               {/* Promo Code */}
@@ -488,7 +604,7 @@ const BookingPage = () => {
                     placeholder="Enter code"
                   />
                   <button
-                    onClick={() => updatePreview(promoCode)}
+                    onClick={handleApplyPromo}
                     className="bg-blue-600 hover:bg-blue-700 px-4 py-2 rounded-lg text-white transition-colors"
                   >
                     Apply
@@ -105,8 +105,8 @@ const ManagePromotionsPage = () => {
       const res = await createPromotion(payload);
 
       let successMsg = "Promotion created successfully!";
-      if (res.emails_sent > 0) {
-        successMsg += ` Email sent to ${res.emails_sent} subscribers.`;
+      if (res.campaign) {
+        successMsg += ` Emailing ${res.campaign.total_recipients} subscribers in the background.`;
       }
 
       setNotification({ type: "success", message: successMsg });
@@ -154,7 +154,9 @@ const ManagePromotionsPage = () => {
       const res = await sendPromotionEmail(id);
       setNotification({
         type: "success",
-        message: `Email sent successfully to ${res.emails_sent} users.`,
+        message: res.campaign
+          ? `Emailing ${res.campaign.total_recipients} subscribers in the background.`
+          : "No subscribed users to email.",
       });
     } catch (error) {
       console.error("Email error:", error);
@@ -4,6 +4,7 @@ import { getBookings } from "../../api";
 
 const OrderHistoryPage = () => {
   const [bookings, setBookings] = useState([]);
+  const [nextPage, setNextPage] = useState(null);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
@@ -11,6 +12,7 @@ const OrderHistoryPage = () => {
       try {
         const data = await getBookings();
         setBookings(data.bookings || []);
+        setNextPage(data.next);
       } catch (error) {
         console.error("Error fetching order history:", error);
       } finally {
@@ -20,6 +22,16 @@ const OrderHistoryPage = () => {
     fetchHistory();
   }, []);
 
+  const loadMore = async () => {
+    try {
+      const data = await getBookings(nextPage);
+      setBookings([...bookings, ...(data.bookings || [])]);
+      setNextPage(data.next);
+    } catch (error) {
+      console.error("Error fetching order history:", error);
+    }
+  };
+
   return (
     <>
       <Navbar />
@@ -95,7 +107,7 @@ const OrderHistoryPage = () => {
                         <div className="flex flex-wrap gap-2">
                           {booking.tickets.map((ticket) => (
                             <span
-                              key={ticket.ticket_id}
+                              key={ticket.seat_display}
                               className="px-3 py-1 bg-gray-700 rounded-full text-sm text-gray-300 border border-gray-600"
                             >
                               {ticket.seat_display} ({ticket.age_category})
@@ -113,6 +125,14 @@ const OrderHistoryPage = () => {
                   </div>
                 </div>
               ))}
+              {nextPage && (
+                <button
+                  onClick={loadMore}
+                  className="w-full py-3 bg-gray-800 hover:bg-gray-700 border border-gray-700 rounded-lg text-gray-300 transition-colors"
+                >
+                  Load more
+                </button>
+              )}
             </div>
           )}
         </div>